@@ -0,0 +1,245 @@
+"""ASR backends with health tracking, circuit breakers and failover"""
+
+import asyncio
+import time
+
+from llm_router import BackendStats
+
+
+# ============================
+# CIRCUIT BREAKER
+# ============================
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Opens when the rolling error rate reaches `max_error_rate` (after
+    `min_samples` requests) or the median latency exceeds `max_latency`.
+    After `cooldown` seconds one request is let through as a probe: success
+    closes the breaker, failure opens it again with a doubled cooldown (up
+    to `max_cooldown`).
+    """
+
+    def __init__(self, name, stats, max_error_rate=0.5, max_latency=4.0, min_samples=3,
+                 cooldown=15.0, max_cooldown=120.0):
+        self.name = name
+        self.stats = stats
+        self.max_error_rate = max_error_rate
+        self.max_latency = max_latency
+        self.min_samples = min_samples
+        self.base_cooldown = cooldown
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+
+        self.state = CLOSED
+        self.opened_at = None
+        self.probing = False
+        self.trips = 0
+
+    def allow(self):
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+            self.state = HALF_OPEN
+            self.probing = False
+        if self.state == HALF_OPEN and not self.probing:
+            self.probing = True
+            return True
+        return False
+
+    def record(self, latency, ok):
+        self.stats.record(latency, ok)
+
+        if self.state == HALF_OPEN:
+            if ok and latency <= self.max_latency:
+                print(f"[ASR] {self.name} probe succeeded, closing breaker")
+                self.state = CLOSED
+                self.cooldown = self.base_cooldown
+                # Start over so the old failures do not trip it again.
+                self.stats.latencies.clear()
+                self.stats.outcomes.clear()
+            else:
+                self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+                self._open()
+            return
+
+        if self.state == CLOSED and self._unhealthy():
+            self._open()
+
+    def _unhealthy(self):
+        if len(self.stats.outcomes) < self.min_samples:
+            return False
+        snapshot = self.stats.snapshot()
+        too_slow = snapshot["median_s"] is not None and snapshot["median_s"] > self.max_latency
+        return self.stats.error_rate() >= self.max_error_rate or too_slow
+
+    def release(self):
+        # A probe that was cancelled with its turn does not count.
+        self.probing = False
+
+    def _open(self):
+        if self.state != OPEN:
+            print(f"[ASR] {self.name} unhealthy, breaker open for {self.cooldown:.0f}s")
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.probing = False
+        self.trips += 1
+
+    def snapshot(self):
+        return {"state": self.state, "trips": self.trips, **self.stats.snapshot()}
+
+
+# ============================
+# ROUTER
+# ============================
+
+class ASRRouter:
+    """
+    Tries the ASR backends in order, skipping those whose breaker is open.
+    A backend fails when it raises, times out or returns None; an empty
+    string means it heard nothing and is returned as is.
+
+    Backends are async callables `fn(audio, event)` returning the text (or
+    None). Those in `event_backends` only read the hear.end event and are
+    left out, without counting as failures, when there is none (speculative
+    prefixes). If every breaker is open the first backend is tried anyway
+    rather than losing the turn.
+    """
+
+    def __init__(self, backends, order, timeout=5.0, window=20, event_backends=(), **breaker_args):
+        self.backends = backends
+        self.order = list(order)
+        self.event_backends = set(event_backends)
+        self.timeout = timeout
+        self.breakers = {
+            name: CircuitBreaker(name, BackendStats(window, prior_latency=1.0), **breaker_args)
+            for name in self.order
+        }
+
+    async def transcribe(self, audio, event=None, order=None):
+        # `order` overrides the backend order for this utterance only.
+        order = order or self.order
+        if event is None:
+            order = [name for name in order if name not in self.event_backends]
+        start = time.monotonic()
+        info = {
+            "primary": order[0] if order else None,
+            "backend": None,
+            "failed": [],
+            "skipped": [],
+            "latency_s": {},
+        }
+
+        text = None
+        for name in order:
+            if not self.breakers[name].allow():
+                info["skipped"].append(name)
+                continue
+            text = await self._attempt(name, audio, event, info)
+            if text is not None:
+                break
+
+        if order and len(info["skipped"]) == len(order):
+            text = await self._attempt(order[0], audio, event, info)
+
+        if info["failed"] and info["backend"]:
+            print(f"[ASR] Failed over to {info['backend']} (failed: {info['failed']})")
+
+        info["total_s"] = round(time.monotonic() - start, 3)
+        info["stats"] = {name: b.snapshot() for name, b in self.breakers.items()}
+        return text, info
+
+    async def _attempt(self, name, audio, event, info):
+        breaker = self.breakers[name]
+        t0 = time.monotonic()
+        try:
+            text = await asyncio.wait_for(self.backends[name](audio, event), self.timeout)
+        except asyncio.CancelledError:
+            breaker.release()
+            raise
+        except asyncio.TimeoutError:
+            print(f"[ASR] {name} timed out after {self.timeout}s")
+            text = None
+        except Exception as e:
+            print(f"[ASR] {name} failed:", e)
+            text = None
+
+        elapsed = time.monotonic() - t0
+        info["latency_s"][name] = round(elapsed, 3)
+        breaker.record(elapsed, text is not None)
+
+        if text is None:
+            info["failed"].append(name)
+        else:
+            info["backend"] = name
+        return text
+
+
+# ============================
+# LANGUAGE ROUTING
+# ============================
+
+# Spoken language -> backend that transcribes it best. LuxASR is trained
+# for Luxembourgish (German is often confused with it); local Whisper is
+# faster and good at English and French.
+LANGUAGE_ROUTES = {"lb": "luxasr", "de": "luxasr", "en": "whisper", "fr": "whisper"}
+
+
+class LanguageRouter:
+    """
+    Picks the ASR backend for an utterance from the language identified in
+    its first second. `detect` is an async callable `fn(audio)` returning
+    `(language, probability)` or None. Unknown languages, uncertain
+    detections and failures go to `default`.
+    """
+
+    def __init__(self, detect, routes=None, default="luxasr", min_probability=0.5,
+                 timeout=1.5, samplerate=16000, window_s=1.0, lead_s=0.25):
+        self.detect = detect
+        self.routes = routes or LANGUAGE_ROUTES
+        self.default = default
+        self.min_probability = min_probability
+        self.timeout = timeout
+        self.samplerate = samplerate
+        self.window = int(window_s * samplerate)
+        # hear.start arrives a little after speech onset
+        self.lead = int(lead_s * samplerate)
+
+    def segment(self, audio, start=0):
+        """The first `window_s` of speech, given where speech started in `audio`."""
+        begin = max(0, start - self.lead)
+        return audio[begin:start + self.window]
+
+    def ready(self, audio, start=0):
+        return audio is not None and len(audio) >= start + self.window
+
+    async def route(self, audio):
+        t0 = time.monotonic()
+        info = {"language": None, "probability": None, "backend": self.default,
+                "reason": None, "audio_s": round(len(audio) / self.samplerate, 2)}
+        try:
+            detected = await asyncio.wait_for(self.detect(audio), self.timeout)
+        except asyncio.TimeoutError:
+            detected, info["reason"] = None, "timeout"
+        except Exception as e:
+            print("[ASR] Language detection failed:", e)
+            detected, info["reason"] = None, "failed"
+
+        if detected is not None:
+            language, probability = detected
+            info["language"], info["probability"] = language, round(probability, 3)
+            if probability < self.min_probability:
+                info["reason"] = "uncertain"
+            elif language not in self.routes:
+                info["reason"] = "unrouted"
+            else:
+                info["backend"], info["reason"] = self.routes[language], "detected"
+        elif info["reason"] is None:
+            info["reason"] = "failed"
+
+        info["lid_ms"] = round((time.monotonic() - t0) * 1000, 1)
+        return info["backend"], info
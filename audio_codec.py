@@ -0,0 +1,66 @@
+"""In-memory audio encoding for ASR uploads (WAV, FLAC, Opus)"""
+
+import io
+import struct
+
+import numpy as np
+import soundfile as sf
+
+
+# ============================
+# WAV HELPERS
+# ============================
+
+WAV_HEADER_SIZE = 44
+
+# Placeholder sizes for a WAV that is still being written (patched on finish)
+STREAMING_SIZE = 0xFFFFFFFF
+
+
+def wav_header(sample_rate, data_size=None, channels=1, sample_width=2):
+    streaming = data_size is None
+    data_size = STREAMING_SIZE if streaming else data_size
+    riff_size = STREAMING_SIZE if streaming else 36 + data_size
+    byte_rate = sample_rate * channels * sample_width
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", riff_size, b"WAVE",
+        b"fmt ", 16, 1, channels, sample_rate, byte_rate, channels * sample_width, sample_width * 8,
+        b"data", data_size,
+    )
+
+
+# format -> (soundfile format, subtype, file extension, content type)
+UPLOAD_FORMATS = {
+    "wav": ("WAV", "PCM_16", "wav", "audio/wav"),
+    "flac": ("FLAC", "PCM_16", "flac", "audio/flac"),
+    "opus": ("OGG", "OPUS", "ogg", "audio/ogg"),
+}
+
+# soundfile's compression_level for Opus is 0 (highest bitrate) .. 1 (lowest)
+OPUS_COMPRESSION = 0.7
+
+
+def encode_audio(audio, samplerate, fmt="wav", compression_level=None):
+    """Mono float audio -> (bytes, filename, content type)."""
+    sf_format, subtype, ext, content_type = UPLOAD_FORMATS[fmt]
+    if compression_level is None and fmt == "opus":
+        compression_level = OPUS_COMPRESSION
+
+    buf = io.BytesIO()
+    kwargs = {}
+    if compression_level is not None:
+        kwargs["compression_level"] = compression_level
+    try:
+        sf.write(buf, audio, samplerate, format=sf_format, subtype=subtype, **kwargs)
+    except TypeError:
+        # soundfile < 0.12 has no compression_level
+        buf = io.BytesIO()
+        sf.write(buf, audio, samplerate, format=sf_format, subtype=subtype)
+    return buf.getvalue(), f"audio.{ext}", content_type
+
+
+def decode_audio(data):
+    """Encoded bytes (any format libsndfile reads) -> (mono float32, samplerate)."""
+    audio, samplerate = sf.read(io.BytesIO(data), dtype="float32", always_2d=True)
+    return np.ascontiguousarray(audio.mean(axis=1)), samplerate
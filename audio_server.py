@@ -0,0 +1,204 @@
+"""In-memory TTS audio store served over aiohttp on the client's event loop"""
+
+import asyncio
+import collections
+import re
+import struct
+import time
+
+from aiohttp import web
+
+from audio_codec import STREAMING_SIZE, WAV_HEADER_SIZE, wav_header
+
+
+# ============================
+# AUDIO STORE
+# ============================
+
+class AudioClip:
+    def __init__(self, name, content_type="audio/wav", pinned=False):
+        self.name = name
+        self.content_type = content_type
+        self.pinned = pinned
+        self.data = bytearray()
+        self.complete = False
+        self.failed = False
+        self.created = time.monotonic()
+        self.waiters = []
+
+    def __len__(self):
+        return len(self.data)
+
+    def _notify(self):
+        waiters, self.waiters = self.waiters, []
+        for fut in waiters:
+            if not fut.done():
+                fut.set_result(None)
+
+    def append(self, chunk):
+        self.data.extend(chunk)
+        self._notify()
+
+    def finish(self, failed=False):
+        if self.content_type == "audio/wav" and not failed and len(self.data) >= WAV_HEADER_SIZE:
+            _, _, _, _, _, _, channels, rate, _, _, width, _, size = struct.unpack(
+                "<4sI4s4sIHHIIHH4sI", bytes(self.data[:WAV_HEADER_SIZE])
+            )
+            if size == STREAMING_SIZE:
+                self.data[:WAV_HEADER_SIZE] = wav_header(
+                    rate, len(self.data) - WAV_HEADER_SIZE, channels, width // 8
+                )
+        self.complete = True
+        self.failed = failed
+        self._notify()
+
+    async def wait(self, min_size):
+        while not (self.complete or len(self.data) >= min_size):
+            fut = asyncio.get_running_loop().create_future()
+            self.waiters.append(fut)
+            await fut
+
+
+class AudioStore:
+    """
+    Named audio clips held in memory, evicted least-recently-used once the
+    total exceeds `max_bytes`. Clips that are still being written and pinned
+    clips (the phrase bank) are never evicted.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.clips = collections.OrderedDict()
+
+    @property
+    def total_bytes(self):
+        return sum(len(c) for c in self.clips.values())
+
+    def create(self, name, content_type="audio/wav", pinned=False):
+        clip = AudioClip(name, content_type, pinned)
+        self.clips[name] = clip
+        self.evict()
+        return clip
+
+    def put(self, name, data, content_type="audio/wav", pinned=False):
+        clip = AudioClip(name, content_type, pinned)
+        clip.data.extend(data)
+        clip.complete = True
+        self.clips[name] = clip
+        self.evict()
+        return clip
+
+    def get(self, name):
+        clip = self.clips.get(name)
+        if clip is not None:
+            self.clips.move_to_end(name)
+        return clip
+
+    def discard(self, name):
+        self.clips.pop(name, None)
+
+    def evict(self):
+        total = self.total_bytes
+        for name in list(self.clips):
+            if total <= self.max_bytes:
+                break
+            clip = self.clips[name]
+            if clip.pinned or not clip.complete:
+                continue
+            total -= len(clip)
+            del self.clips[name]
+
+
+# ============================
+# HTTP SERVER
+# ============================
+
+_RANGE = re.compile(r"bytes=(\d*)-(\d*)$")
+
+
+class AudioServer:
+    """
+    Serves `/audio/<name>` from an AudioStore with Content-Length, single
+    byte ranges and keep-alive. A clip that is still being synthesized is
+    streamed (chunked) as its bytes arrive.
+    """
+
+    def __init__(self, store, host="0.0.0.0", port=8080):
+        self.store = store
+        self.host = host
+        self.port = port
+        self.runner = None
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/audio/{name}", self.serve_audio)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+        print(f"[Audio] Serving TTS audio on {self.host}:{self.port}")
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
+
+    async def serve_audio(self, request):
+        clip = self.store.get(request.match_info["name"])
+        if clip is None or clip.failed:
+            raise web.HTTPNotFound()
+
+        range_header = request.headers.get("Range")
+        if not clip.complete and not range_header:
+            return await self._stream(request, clip)
+
+        if not clip.complete:
+            await clip.wait(float("inf"))
+            if clip.failed:
+                raise web.HTTPNotFound()
+
+        data = clip.data
+        headers = {"Accept-Ranges": "bytes"}
+        size = len(data)
+
+        if range_header:
+            m = _RANGE.match(range_header.strip())
+            if not m or not (m.group(1) or m.group(2)):
+                raise web.HTTPRequestRangeNotSatisfiable(headers={"Content-Range": f"bytes */{size}"})
+            if m.group(1):
+                start = int(m.group(1))
+                end = min(int(m.group(2)), size - 1) if m.group(2) else size - 1
+            else:
+                start = max(size - int(m.group(2)), 0)
+                end = size - 1
+            if start >= size or start > end:
+                raise web.HTTPRequestRangeNotSatisfiable(headers={"Content-Range": f"bytes */{size}"})
+
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            return web.Response(
+                status=206, body=bytes(data[start:end + 1]),
+                content_type=clip.content_type, headers=headers,
+            )
+
+        return web.Response(body=bytes(data), content_type=clip.content_type, headers=headers)
+
+    async def _stream(self, request, clip):
+        resp = web.StreamResponse(headers={"Content-Type": clip.content_type})
+        resp.enable_chunked_encoding()
+        await resp.prepare(request)
+
+        sent = 0
+        while True:
+            await clip.wait(sent + 1)
+            if clip.failed:
+                break
+            if len(clip.data) > sent:
+                chunk = bytes(clip.data[sent:])
+                sent += len(chunk)
+                await resp.write(chunk)
+            elif clip.complete:
+                break
+
+        # The WAV header went out with placeholder sizes; players treat
+        # that as "read until the end of the stream".
+        await resp.write_eof()
+        return resp
@@ -0,0 +1,103 @@
+"""Per-turn logging overhead: in-memory session dump vs streaming JSONL"""
+
+# python benchmarks/bench_logger.py --turns 500
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from interaction_logger import InteractionLogger
+from latency import percentile, summarize_turns
+
+
+def make_turn(i):
+    return {
+        "turn_id": str(uuid.uuid4()),
+        "timestamp": "2025-01-01T00:00:00",
+        "user": {"asr_text": "Moien, wou ass d'Post? " * 3, "emotion": "Calm"},
+        "assistant": {"response_text": "D'Post ass ganz no, e puer Minutten. " * 4, "emotion": "Happy"},
+        "llm": {"backend": "openai", "hedged": False, "latency_s": {"openai": 1.2}},
+        "audio": {"user_audio": f"temp_audio/user_{i}.wav"},
+        "latency": {"clock": "monotonic", "stages": {
+            s: {"start_ms": 0.0, "duration_ms": 100.0 + i % 50, "complete": True}
+            for s in ("get_user_text", "ask_llm", "make_tts", "speak", "total")
+        }},
+    }
+
+
+class InMemoryLogger:
+    """The previous logger: keep every turn, json.dump(indent=2) at the end."""
+
+    def __init__(self, base_dir):
+        self.base_dir = base_dir
+        self.session = None
+
+    def start_session(self, participant_id, task_id, config):
+        self.session = {"session_id": str(uuid.uuid4()), "participant_id": participant_id,
+                        "task_id": task_id, "config": config, "turns": [], "summary": {}}
+
+    def log_turn(self, turn_data):
+        self.session["turns"].append(turn_data)
+
+    def end_session(self, completed=True, notes=None):
+        self.session["summary"] = {"num_turns": len(self.session["turns"]),
+                                   "latency": summarize_turns(self.session["turns"])}
+        path = os.path.join(self.base_dir, f"{self.session['session_id']}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.session, f, indent=2, ensure_ascii=False)
+
+
+def run(logger, turns):
+    tracemalloc.start()
+    logger.start_session("P_BENCH", "T_BENCH", {"bench": True})
+
+    per_turn = []
+    for turn in turns:
+        t0 = time.perf_counter()
+        logger.log_turn(turn)
+        per_turn.append((time.perf_counter() - t0) * 1e6)
+
+    t0 = time.perf_counter()
+    logger.end_session()
+    end_ms = (time.perf_counter() - t0) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "log_turn_p50_us": round(percentile(per_turn, 50), 2),
+        "log_turn_p99_us": round(percentile(per_turn, 99), 2),
+        "log_turn_max_us": round(max(per_turn), 2),
+        "end_session_ms": round(end_ms, 2),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=500)
+    args = parser.parse_args()
+
+    turns = [make_turn(i) for i in range(args.turns)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {
+            "in_memory": run(InMemoryLogger(tmp), turns),
+            "streaming": run(InteractionLogger(os.path.join(tmp, "stream")), turns),
+            "streaming+compact": run(InteractionLogger(os.path.join(tmp, "compact"), compact_on_end=True), turns),
+        }
+
+    print(f"[Bench] {args.turns} turns")
+    cols = list(next(iter(results.values())))
+    print(f"{'logger':<20}" + "".join(f"{c:>18}" for c in cols))
+    for name, r in results.items():
+        print(f"{name:<20}" + "".join(f"{r[c]:>18}" for c in cols))
+
+
+if __name__ == "__main__":
+    main()
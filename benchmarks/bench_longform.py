@@ -0,0 +1,91 @@
+"""Long-form transcription latency against audio length (batched vs sequential windows)"""
+
+# python benchmarks/bench_longform.py temp_audio/ --whisper-url http://127.0.0.1:9000/transcribe --lengths 15,30,60,120
+import argparse
+import glob
+import os
+import sys
+import time
+
+import numpy as np
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_codec import encode_audio
+from bench_upload_formats import load, word_errors
+from longform import split_windows
+
+
+def build(clips, seconds, gap_s=0.4, samplerate=16000):
+    """Concatenate clips (with short pauses) up to `seconds`; also return which clips were used."""
+    gap = np.zeros(int(gap_s * samplerate), dtype=np.float32)
+    parts, used, total, i = [], [], 0, 0
+    while total < seconds * samplerate:
+        clip = clips[i % len(clips)]
+        parts += [clip, gap]
+        used.append(i % len(clips))
+        total += len(clip) + len(gap)
+        i += 1
+    return np.concatenate(parts)[:int(seconds * samplerate)], used
+
+
+def transcribe(url, audio, batch_size):
+    data, filename, content_type = encode_audio(audio, 16000, "flac")
+    t0 = time.perf_counter()
+    resp = requests.post(url, files={"audio": (filename, data, content_type)},
+                         data={"batch_size": batch_size}, timeout=600)
+    resp.raise_for_status()
+    return resp.json().get("text", ""), time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("audio", nargs="+", help="WAV files or directories with speech clips")
+    parser.add_argument("--whisper-url", required=True)
+    parser.add_argument("--lengths", default="15,30,60,120,300", help="Audio lengths in seconds")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--check", action="store_true",
+                        help="WER of the stitched transcript against the clips transcribed one by one")
+    args = parser.parse_args()
+
+    paths = []
+    for p in args.audio:
+        paths += sorted(glob.glob(os.path.join(p, "*.wav"))) if os.path.isdir(p) else [p]
+    clips = [load(p) for p in paths]
+    if not clips:
+        print("No audio files")
+        return
+
+    references = None
+    if args.check:
+        references = [transcribe(args.whisper_url, c, 1)[0] for c in clips]
+
+    print(f"{'length s':>9}{'windows':>9}{'batched s':>11}{'RTF':>7}{'sequential s':>14}{'RTF':>7}{'speedup':>9}"
+          + (f"{'WER':>8}" if references else ""))
+    for seconds in [float(x) for x in args.lengths.split(",")]:
+        audio, used = build(clips, seconds)
+        windows = len(split_windows(audio, 16000))
+
+        timings = {}
+        for batch_size in (args.batch_size, 1):
+            runs = [transcribe(args.whisper_url, audio, batch_size) for _ in range(args.repeat)]
+            timings[batch_size] = sorted(t for _, t in runs)[len(runs) // 2]
+            if batch_size == args.batch_size:
+                text = runs[0][0]
+
+        line = (f"{seconds:>9.0f}{windows:>9}"
+                f"{timings[args.batch_size]:>11.2f}{timings[args.batch_size] / seconds:>7.3f}"
+                f"{timings[1]:>14.2f}{timings[1] / seconds:>7.3f}"
+                f"{timings[1] / timings[args.batch_size]:>8.2f}x")
+        if references:
+            # The last clip may be cut off at the target length.
+            reference = " ".join(references[i] for i in used)
+            errors, words = word_errors(reference, text)
+            line += f"{errors / max(words, 1) * 100:>7.1f}%"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
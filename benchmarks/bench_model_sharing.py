@@ -0,0 +1,116 @@
+"""Per-worker memory and cold start of the speech models at 1/4/8 workers (copy vs mmap loading)"""
+
+# python benchmarks/bench_model_sharing.py --workers 1,4,8 --modes copy,mmap
+# python benchmarks/bench_model_sharing.py --whisper-dir /path/to/checkpoint --voices none
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+WHISPER_DIR = "models/whisper"
+VOICES = {
+    "en": "models/piper/en_US_lessac/en_US-lessac-medium.onnx",
+    "lb": "models/piper/lb_LU/lb_LU-marylux-medium.onnx",
+}
+
+
+def memory_kib():
+    """RSS, PSS (shared pages split between their users) and USS (private pages) of this process."""
+    values = {}
+    with open("/proc/self/smaps_rollup", encoding="ascii") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                values[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss": values.get("Rss", 0),
+        "pss": values.get("Pss", 0),
+        "uss": values.get("Private_Clean", 0) + values.get("Private_Dirty", 0),
+    }
+
+
+def worker(mode, whisper_dir, voice_paths, spawned_at, barrier, results):
+    started = time.time()
+    import numpy as np
+    import torch
+    from model_loading import load_piper_voice, load_whisper
+
+    torch.set_num_threads(1)
+    t0 = time.time()
+    processor, model = load_whisper(whisper_dir, torch.device("cpu"), mode)
+    voices = {lang: load_piper_voice(path, mode) for lang, path in voice_paths.items()}
+    loaded = time.time()
+
+    # Touch every weight once, as the first request would.
+    features = processor(np.zeros(16000, dtype=np.float32), sampling_rate=16000, return_tensors="pt")
+    with torch.no_grad():
+        model.generate(input_features=features.input_features.to(model.dtype), max_new_tokens=4)
+    for voice in voices.values():
+        for _ in voice.synthesize("Hello there."):
+            pass
+    ready = time.time()
+
+    # Measure while every worker is alive, so shared pages are split between them.
+    barrier.wait()
+    results.put({
+        "pid": os.getpid(),
+        "process_start_s": started - spawned_at,
+        "load_s": loaded - t0,
+        "first_inference_s": ready - loaded,
+        "cold_start_s": ready - spawned_at,
+        **memory_kib(),
+    })
+    barrier.wait()
+
+
+def run(mode, workers, whisper_dir, voice_paths):
+    ctx = mp.get_context("spawn")
+    barrier = ctx.Barrier(workers + 1)
+    results = ctx.Queue()
+    spawned_at = time.time()
+    procs = [
+        ctx.Process(target=worker, args=(mode, whisper_dir, voice_paths, spawned_at, barrier, results))
+        for _ in range(workers)
+    ]
+    for p in procs:
+        p.start()
+    barrier.wait()
+    rows = [results.get() for _ in range(workers)]
+    barrier.wait()
+    for p in procs:
+        p.join()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", default="1,4,8")
+    parser.add_argument("--modes", default="copy,mmap")
+    parser.add_argument("--whisper-dir", default=WHISPER_DIR)
+    parser.add_argument("--voices", default=",".join(VOICES), help="Piper voices to load ('none' for Whisper only)")
+    args = parser.parse_args()
+    voice_paths = {lang: VOICES[lang] for lang in args.voices.split(",") if lang in VOICES}
+
+    os.chdir(ROOT)   # model paths are relative to the repository
+    print(f"{'mode':<6}{'workers':>8}{'cold s':>9}{'load s':>9}{'1st inf s':>11}"
+          f"{'RSS MiB':>10}{'PSS MiB':>10}{'USS MiB':>10}{'total PSS MiB':>15}")
+    for mode in args.modes.split(","):
+        # Conversion to external data happens once; keep it out of the timings.
+        run(mode, 1, args.whisper_dir, voice_paths)
+        for n in [int(x) for x in args.workers.split(",")]:
+            rows = run(mode, n, args.whisper_dir, voice_paths)
+
+            def mean(key):
+                return sum(r[key] for r in rows) / len(rows)
+
+            print(f"{mode:<6}{n:>8}{mean('cold_start_s'):>9.2f}{mean('load_s'):>9.2f}"
+                  f"{mean('first_inference_s'):>11.2f}{mean('rss') / 1024:>10.0f}{mean('pss') / 1024:>10.0f}"
+                  f"{mean('uss') / 1024:>10.0f}{sum(r['pss'] for r in rows) / 1024:>15.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Input tokens per turn: legacy prompt assembly vs PromptAssembler"""
+
+# python benchmarks/bench_prompt_tokens.py --turns 12 --history-tokens 150
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prompting import OPENAI_BASE_PROMPT, MESSAGE_OVERHEAD, PromptAssembler, TokenCounter
+
+
+TASK_PROMPTS = {"5": "Context:\nThe user has just finished work and is looking for a relaxed evening."}
+
+USER_TURNS = [
+    "Moien! Wat kann ech den Owend an der Stad maachen?",
+    "Ech hätt gär eppes Rouegs.",
+    "Wou ass dat genee?",
+    "An ass et laang op?",
+    "Okay, merci.",
+    "Gëtt et och eppes fir z'iessen do an der Géigend?",
+]
+
+REPLY = "lb: " + "Du kéints an de Park goen oder e Kaffi drénken, dat ass ganz no. " * 3
+
+
+def legacy_messages(task_id, history, text):
+    # Before: history already contains the user message (appended in
+    # handle_turn) and ask_gpt appended it again; trimmed to 4 messages.
+    system = OPENAI_BASE_PROMPT + "\n\n" + TASK_PROMPTS[task_id].strip()
+    return [{"role": "system", "content": system}] + history + [{"role": "user", "content": text}]
+
+
+def count_messages(counter, messages):
+    return sum(counter.count(m["content"]) + MESSAGE_OVERHEAD for m in messages)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=12)
+    parser.add_argument("--history-tokens", type=int, default=150)
+    parser.add_argument("--model", default="gpt-4o-mini")
+    args = parser.parse_args()
+
+    counter = TokenCounter.for_openai(args.model)
+    assembler = PromptAssembler(TASK_PROMPTS, history_budget=args.history_tokens, openai_counter=counter)
+
+    legacy_history, history = [], []
+    legacy_build = new_build = 0.0
+    print(f"[Bench] tokenizer={counter.name}")
+    print(f"{'turn':>4}{'legacy':>10}{'new':>10}{'new untrimmed':>16}")
+
+    for i in range(args.turns):
+        text = USER_TURNS[i % len(USER_TURNS)]
+
+        legacy_history.append({"role": "user", "content": text})
+        t0 = time.perf_counter()
+        legacy = legacy_messages("5", legacy_history, text)
+        legacy_build += time.perf_counter() - t0
+        legacy_history.append({"role": "assistant", "content": REPLY})
+        legacy_history = legacy_history[-4:]
+
+        t0 = time.perf_counter()
+        messages, stats = assembler.openai_messages("5", history, text)
+        new_build += time.perf_counter() - t0
+        history += [{"role": "user", "content": text}, {"role": "assistant", "content": REPLY}]
+
+        print(f"{i + 1:>4}{count_messages(counter, legacy):>10}"
+              f"{stats['input_tokens_after']:>10}{stats['input_tokens_before']:>16}")
+
+    print(f"[Bench] build time per turn: legacy {legacy_build / args.turns * 1e6:.1f} us, "
+          f"new {new_build / args.turns * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""ResponseParser throughput, with a streamed/complete consistency check on random replies"""
+
+# python benchmarks/bench_response_parser.py --replies 2000 --check 500
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from response_parser import EMOTIONS, ResponseParser, parse_response
+
+
+WORDS = ["Moien", "Wéi", "geet", "et", "dir?", "D'Post", "ass", "ganz", "no.", "10:30",
+         "Hello!", "a<b", "c>d", "x", "lb:", "en:", "Bonjour", "!", "merci,", "Gare"]
+PREFIXES = ["lb: ", "en: ", "fr: ", "", "  lb:", "<assistant>\nlb: ", "Oh: "]
+NOISE = ["<user>\nNee\n</user>", "</assistant>", "<b>", "<unclosed", "\n", "  "]
+
+
+def random_reply(rng):
+    parts = [rng.choice(PREFIXES)]
+    for _ in range(rng.randint(0, 25)):
+        parts.append(rng.choice(WORDS))
+        parts.append(rng.choice([" ", " ", " ", "\n"]))
+        if rng.random() < 0.05:
+            parts.append(rng.choice(NOISE))
+    if rng.random() < 0.9:
+        parts.append(f"\n<user_emotion={rng.choice(EMOTIONS + ('happy', 'Bored'))}>")
+    if rng.random() < 0.9:
+        parts.append(f"\n<response_emotion={rng.choice(EMOTIONS)}>")
+    if rng.random() < 0.1:
+        parts.append(rng.choice(NOISE) + " trailing")
+    return "".join(parts)
+
+
+def parse_streamed(text, rng):
+    parser = ResponseParser()
+    i = 0
+    emitted = []
+    while i < len(text):
+        n = rng.randint(1, 8)
+        emitted.append(parser.feed(text[i:i + n]))
+        i += n
+    emitted.append(parser.close())
+    return parser.result(), "".join(emitted)
+
+
+def legacy_parse(text):
+    # extract_emotions + make_tts language split, as used before the parser.
+    user_match = re.search(r"<user_emotion\s*=\s*(Happy|Sad|Angry|Calm)>", text, re.I)
+    resp_match = re.search(r"<response_emotion\s*=\s*(Happy|Sad|Angry|Calm)>", text, re.I)
+    user_emotion = user_match.group(1) if user_match else "Calm"
+    response_emotion = resp_match.group(1) if resp_match else "Calm"
+    clean_text = re.sub(r"<.*?>", "", text).strip()
+    parts = clean_text.split(":", 1)
+    lang, content = parts if len(parts) == 2 else ("en", clean_text)
+    return lang, content, user_emotion, response_emotion
+
+
+def check(n, seed):
+    rng = random.Random(seed)
+    for i in range(n):
+        reply = random_reply(rng)
+        whole = parse_response(reply)
+        streamed, emitted = parse_streamed(reply, rng)
+
+        problems = []
+        if streamed != whole:
+            problems.append(f"streamed {streamed} != whole {whole}")
+        if emitted.strip() != whole.text:
+            problems.append(f"emitted {emitted!r} != text {whole.text!r}")
+        if "<user_emotion" in whole.text or "<response_emotion" in whole.text:
+            problems.append("emotion tag leaked into text")
+        if whole.user_emotion not in EMOTIONS or whole.response_emotion not in EMOTIONS:
+            problems.append("invalid emotion")
+        if problems:
+            print(f"[Check] FAILED on case {i}: {reply!r}")
+            for p in problems:
+                print("   ", p)
+            return False
+    print(f"[Check] {n} random replies: streamed == complete")
+    return True
+
+
+def throughput(replies, fn):
+    t0 = time.perf_counter()
+    for r in replies:
+        fn(r)
+    dt = time.perf_counter() - t0
+    chars = sum(len(r) for r in replies)
+    return len(replies) / dt, chars / dt / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--replies", type=int, default=2000)
+    parser.add_argument("--check", type=int, default=500, help="Random replies for the consistency check")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.check and not check(args.check, args.seed):
+        sys.exit(1)
+
+    rng = random.Random(args.seed)
+    replies = [random_reply(rng) for _ in range(args.replies)]
+    stream_rng = random.Random(args.seed)
+
+    results = {
+        "legacy regex": throughput(replies, legacy_parse),
+        "parser (complete)": throughput(replies, parse_response),
+        "parser (streamed)": throughput(replies, lambda r: parse_streamed(r, stream_rng)),
+    }
+    print(f"{'':<20}{'replies/s':>12}{'MB/s':>8}")
+    for name, (rps, mbps) in results.items():
+        print(f"{name:<20}{rps:>12.0f}{mbps:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Semantic reply cache on recorded sessions: hit rate and ask_llm latency with and without it"""
+
+# python benchmarks/bench_semantic_cache.py logs/ --models sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2,hash
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from interaction_logger import read_session
+from latency import find_logs, percentile
+from semantic_cache import DEFAULT_MODEL, SemanticCache, context_key, load_embedder, utterance_language
+
+
+def load_sessions(paths):
+    """
+    [(task_id, [(user text, reply, ask_llm ms)])] in recorded order; turns
+    answered from the cache have no LLM time (None).
+    """
+    sessions = []
+    for path in paths:
+        if path.endswith(".jsonl"):
+            session = read_session(path)
+        else:
+            with open(path, encoding="utf-8") as f:
+                session = json.load(f)
+
+        turns = []
+        for turn in session.get("turns", []):
+            if turn.get("status", "completed") != "completed":
+                continue
+            assistant = turn.get("assistant") or {}
+            text = ((turn.get("user") or {}).get("asr_text") or "").strip()
+            reply = assistant.get("response_text")
+            if not (text and reply):
+                continue
+            span = ((turn.get("latency") or {}).get("stages") or {}).get("ask_llm")
+            cached = (turn.get("llm") or {}).get("backend") == "cache"
+            llm_ms = span["duration_ms"] if span and not cached else None
+            turns.append((text, reply, llm_ms))
+        sessions.append((session.get("task_id", "T_UNKNOWN"), turns))
+    return sessions
+
+
+def simulate(sessions, cache):
+    """
+    Replay the sessions in order through the cache, keyed like the client;
+    a miss costs the recorded LLM time.
+    """
+    baseline, cached, hits = [], [], []
+    for task_id, turns in sessions:
+        for text, reply, llm_ms in turns:
+            if llm_ms is None:
+                continue
+            key = context_key(task_id, utterance_language(text))
+            answer, info = cache.lookup(key, text)
+            lookup_ms = info.get("lookup_ms", 0.0)
+            baseline.append(llm_ms)
+            if answer is not None:
+                cached.append(lookup_ms)
+                hits.append((info["similarity"], text, info["matched"]))
+            else:
+                cached.append(lookup_ms + llm_ms)
+                cache.store(key, text, reply)
+    return baseline, cached, hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("logs", nargs="+", help="Session logs or log directories")
+    parser.add_argument("--models", default=DEFAULT_MODEL,
+                        help="Comma-separated embedders (sentence-transformers names or 'hash')")
+    parser.add_argument("--threshold", type=float, default=None)
+    parser.add_argument("--ttl", type=float, default=1800.0)
+    parser.add_argument("--show-hits", type=int, default=10, help="Print this many hits to check them by eye")
+    args = parser.parse_args()
+
+    paths = []
+    for p in args.logs:
+        paths += find_logs(p) if os.path.isdir(p) else [p]
+    sessions = load_sessions(paths)
+    turns = sum(1 for _, t in sessions for turn in t if turn[2] is not None)
+    if not turns:
+        print("No completed turns with ask_llm latency")
+        return
+    print(f"[Cache] {len(sessions)} sessions, {turns} turns")
+
+    for model in args.models.split(","):
+        embedder = load_embedder(model)
+        if embedder is None:
+            continue
+        cache = SemanticCache(embedder, threshold=args.threshold, ttl=args.ttl)
+        baseline, cached, hits = simulate(sessions, cache)
+        stats = cache.stats()
+
+        print(f"\n[{stats['embedder']}] threshold {cache.threshold}, hit rate {(stats['hit_rate'] or 0) * 100:.1f}% "
+              f"({stats['hits']} of {stats['hits'] + stats['misses']} lookups, "
+              f"{turns - stats['hits'] - stats['misses']} too short to cache)")
+        print(f"{'ask_llm':<10}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+        for label, ms in (("no cache", baseline), ("cache", cached)):
+            print(f"{label:<10}{sum(ms) / len(ms):>10.1f}{percentile(ms, 50):>10.1f}{percentile(ms, 95):>10.1f}")
+
+        for similarity, text, matched in hits[:args.show_hits]:
+            print(f"  {similarity:.3f}  {text!r}  ->  {matched!r}")
+
+
+if __name__ == "__main__":
+    main()
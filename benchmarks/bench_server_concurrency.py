@@ -0,0 +1,131 @@
+"""Speech server under mixed ASR / TTS / static / health load (Flask vs ASGI)"""
+
+# PORT=9000 python server.py   &   PORT=9001 python server_asgi.py
+# python benchmarks/bench_server_concurrency.py --target flask=http://127.0.0.1:9000 \
+#     --target asgi=http://127.0.0.1:9001 --audio temp_audio/ --concurrency 16 --duration 30
+import argparse
+import asyncio
+import glob
+import os
+import random
+import sys
+import time
+from urllib.parse import urlparse
+
+import aiohttp
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_codec import encode_audio
+from latency import percentile
+
+
+TEXTS = [
+    "en: The post office is about five minutes from here.",
+    "lb: D'Post ass vun hei ongeféier fënnef Minutten ewech.",
+    "en: Walk past the station and turn left at the bakery.",
+]
+
+
+def load_clips(paths, limit=20):
+    files = []
+    for p in paths:
+        files += sorted(glob.glob(os.path.join(p, "*.wav"))) if os.path.isdir(p) else [p]
+    clips = []
+    for path in files[:limit]:
+        with open(path, "rb") as f:
+            clips.append(f.read())
+    if not clips:
+        # 3 s of quiet noise: the timing is what matters here
+        noise = (np.random.default_rng(0).standard_normal(48000) * 0.01).astype(np.float32)
+        clips.append(encode_audio(noise, 16000, "wav")[0])
+    return clips
+
+
+class Load:
+    def __init__(self, base_url, clips, mix):
+        self.base_url = base_url.rstrip("/")
+        self.clips = clips
+        self.kinds, self.weights = zip(*mix.items())
+        self.latencies = {kind: [] for kind in self.kinds}
+        self.errors = {kind: 0 for kind in self.kinds}
+        self.static_path = None
+
+    async def prepare(self, session):
+        # One TTS file to fetch repeatedly for the static load; the URL's host
+        # is the server's LAN address, so only its path is used.
+        async with session.post(f"{self.base_url}/tts", json={"text": TEXTS[0]}) as resp:
+            resp.raise_for_status()
+            self.static_path = urlparse((await resp.json())["url"]).path
+
+    async def request(self, session, kind):
+        if kind == "asr":
+            form = aiohttp.FormData()
+            form.add_field("audio", random.choice(self.clips), filename="audio.wav", content_type="audio/wav")
+            return session.post(f"{self.base_url}/transcribe", data=form)
+        if kind == "tts":
+            return session.post(f"{self.base_url}/tts", json={"text": random.choice(TEXTS)})
+        if kind == "static":
+            return session.get(f"{self.base_url}{self.static_path}")
+        return session.get(f"{self.base_url}/")
+
+    async def worker(self, session, deadline):
+        while time.monotonic() < deadline:
+            kind = random.choices(self.kinds, self.weights)[0]
+            t0 = time.perf_counter()
+            try:
+                async with await self.request(session, kind) as resp:
+                    await resp.read()
+                    ok = resp.status == 200
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                ok = False
+            if ok:
+                self.latencies[kind].append((time.perf_counter() - t0) * 1000)
+            else:
+                self.errors[kind] += 1
+
+    async def run(self, concurrency, duration):
+        timeout = aiohttp.ClientTimeout(total=120)
+        connector = aiohttp.TCPConnector(limit=concurrency)
+        async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+            await self.prepare(session)
+            deadline = time.monotonic() + duration
+            await asyncio.gather(*(self.worker(session, deadline) for _ in range(concurrency)))
+
+
+def report(name, load, duration):
+    total = sum(len(v) for v in load.latencies.values())
+    print(f"\n[{name}] {load.base_url}  {total / duration:.1f} req/s")
+    print(f"{'kind':<8}{'n':>7}{'err':>6}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for kind in load.kinds:
+        ms = load.latencies[kind]
+        if not ms:
+            print(f"{kind:<8}{0:>7}{load.errors[kind]:>6}")
+            continue
+        print(f"{kind:<8}{len(ms):>7}{load.errors[kind]:>6}"
+              f"{percentile(ms, 50):>10.1f}{percentile(ms, 95):>10.1f}{max(ms):>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--target", action="append", required=True, metavar="NAME=URL",
+                        help="Server to load (repeatable); targets are run one after another")
+    parser.add_argument("--audio", nargs="*", default=[], help="WAV files or directories for /transcribe")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--mix", default="asr=2,tts=3,static=10,health=5",
+                        help="Relative request weights")
+    args = parser.parse_args()
+
+    mix = {k: float(v) for k, v in (part.split("=") for part in args.mix.split(","))}
+    clips = load_clips(args.audio)
+    for target in args.target:
+        name, url = target.split("=", 1)
+        load = Load(url, clips, mix)
+        asyncio.run(load.run(args.concurrency, args.duration))
+        report(name, load, args.duration)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""Micro-benchmarks for the speech server's audio and synthesis paths (CPU)"""
+
+# python benchmarks/bench_speech_server.py --models stub --save benchmarks/baselines/speech_server.json
+# python benchmarks/bench_speech_server.py --models stub --compare benchmarks/baselines/speech_server.json
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import soundfile as sf
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from latency import percentile
+
+
+LENGTHS_S = [1, 5, 15, 30, 60]
+SAMPLE_RATES = [8000, 16000, 22050, 44100, 48000]
+TEXTS = {
+    "short": "The post office is open until six.",
+    "medium": "Walk past the station, turn left at the bakery and the post office is on your right, "
+              "just after the pharmacy.",
+    "long": " ".join(["Opening hours may vary on public holidays, so it is worth checking before you go."] * 6),
+}
+
+
+# ============================
+# STUB MODELS
+# ============================
+
+class StubWhisperModel:
+    """generate() returns a fixed number of token ids per input, without any compute."""
+
+    def __init__(self, tokens=24):
+        import torch
+        self.tokens = tokens
+        self.dtype = torch.float32
+
+    def generate(self, input_features=None, **kwargs):
+        import torch
+        return torch.full((input_features.shape[0], self.tokens), 50257, dtype=torch.long)
+
+
+class StubWhisperProcessor:
+    """Real log-mel feature extraction (default Whisper config); decoding returns placeholders."""
+
+    def __init__(self):
+        from transformers import WhisperFeatureExtractor
+        self.feature_extractor = WhisperFeatureExtractor()
+
+    def __call__(self, audio, sampling_rate=16000, return_tensors="pt"):
+        return self.feature_extractor(audio, sampling_rate=sampling_rate, return_tensors=return_tensors)
+
+    def decode(self, ids, skip_special_tokens=True):
+        return "stub " * len(ids)
+
+    def batch_decode(self, ids, skip_special_tokens=True):
+        return [self.decode(row) for row in ids]
+
+
+class _Chunk:
+    def __init__(self, audio_int16_bytes):
+        self.audio_int16_bytes = audio_int16_bytes
+
+
+class _Config:
+    def __init__(self, sample_rate):
+        self.sample_rate = sample_rate
+
+
+class StubVoice:
+    """Piper stand-in: one chunk of tone per sentence, ~65 ms of audio per character."""
+
+    def __init__(self, sample_rate=22050):
+        self.config = _Config(sample_rate)
+
+    def synthesize(self, text):
+        for sentence in [s for s in text.split(".") if s.strip()]:
+            n = int(len(sentence) * 0.065 * self.config.sample_rate)
+            t = np.arange(n, dtype=np.float32) / self.config.sample_rate
+            yield _Chunk((np.sin(2 * np.pi * 220 * t) * 8000).astype(np.int16).tobytes())
+
+
+def load_server(models):
+    if models == "stub":
+        os.environ["SPEECH_SERVER_MODELS"] = "none"
+    cwd = os.getcwd()
+    os.chdir(ROOT)   # model paths are relative to the repository
+    try:
+        import server
+    finally:
+        os.chdir(cwd)
+    if models == "stub":
+        server.use_models(StubWhisperProcessor(), StubWhisperModel(),
+                          {"en": StubVoice(22050), "lb": StubVoice(22050)})
+    server.UPLOAD_FOLDER = tempfile.mkdtemp(prefix="bench_tts_")
+    return server
+
+
+# ============================
+# INPUTS
+# ============================
+
+def speech_like(seconds, samplerate, channels=1, seed=0):
+    """Noise bursts with pauses, roughly like speech in level and structure."""
+    rng = np.random.default_rng(seed)
+    n = int(seconds * samplerate)
+    envelope = (np.sin(np.arange(n) / samplerate * 2 * np.pi * 0.7) > -0.3).astype(np.float32)
+    audio = rng.standard_normal((n, channels)).astype(np.float32) * 0.1 * envelope[:, None]
+    return audio if channels > 1 else audio[:, 0]
+
+
+def wav_bytes(audio, samplerate):
+    buf = io.BytesIO()
+    sf.write(buf, audio, samplerate, format="WAV", subtype="PCM_16")
+    return buf.getvalue()
+
+
+# ============================
+# MEASUREMENT
+# ============================
+
+def measure(fn, repeat, warmup=1):
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+
+    # Separate run so tracing does not distort the timings. Counts Python and
+    # NumPy allocations; torch's allocator is not traced.
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "min_ms": round(min(times), 3),
+        "p50_ms": round(percentile(times, 50), 3),
+        "p95_ms": round(percentile(times, 95), 3),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def cases(server, lengths, rates):
+    """(name, zero-argument callable) for every benchmarked path."""
+    for seconds in lengths:
+        for rate in rates:
+            for channels in (1, 2):
+                data = wav_bytes(speech_like(seconds, rate, channels), rate)
+                tag = f"{seconds}s/{rate}Hz/{channels}ch"
+                yield f"load_audio_whisper/{tag}", lambda d=data: server.load_audio_whisper(io.BytesIO(d))
+                yield f"decode_upload/{tag}", lambda d=data: server.decode_upload(d)
+
+    for seconds in lengths:
+        audio = speech_like(seconds, 16000)
+        if seconds <= 30:
+            yield f"feature_extraction/{seconds}s", lambda a=audio: server.whisper_processor(
+                a, sampling_rate=16000, return_tensors="pt")
+        yield f"transcribe_whisper/{seconds}s", lambda a=audio: server.transcribe_whisper(a)
+
+    for name, text in TEXTS.items():
+        yield f"tts_synthesize_wav/{name}", lambda t=text: server.synthesize_to_file(t)
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    print(f"{'case':<44}{'base p50':>10}{'p50':>10}{'change':>9}{'peak KiB':>11}")
+    for name, r in results.items():
+        base = baseline.get(name)
+        if not base:
+            print(f"{name:<44}{'-':>10}{r['p50_ms']:>10.2f}{'new':>9}{r['peak_kib']:>11.1f}")
+            continue
+        change = r["p50_ms"] / base["p50_ms"] - 1 if base["p50_ms"] else 0.0
+        flag = ""
+        if change > tolerance or r["peak_kib"] > base["peak_kib"] * (1 + tolerance) + 64:
+            regressions.append(name)
+            flag = "  <-- regression"
+        print(f"{name:<44}{base['p50_ms']:>10.2f}{r['p50_ms']:>10.2f}{change * 100:>8.1f}%"
+              f"{r['peak_kib']:>11.1f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--models", choices=["stub", "real"], default="stub",
+                        help="stub: no model files needed (feature extraction stays real); real: models/")
+    parser.add_argument("--lengths", default=",".join(map(str, LENGTHS_S)), help="Clip lengths in seconds")
+    parser.add_argument("--rates", default=",".join(map(str, SAMPLE_RATES)), help="Input sample rates")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--filter", default=None, help="Only run cases whose name contains this")
+    parser.add_argument("--save", default=None, help="Write the results as a baseline JSON")
+    parser.add_argument("--compare", default=None, help="Baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Relative p50 / peak memory increase that counts as a regression")
+    args = parser.parse_args()
+
+    import torch
+    torch.set_num_threads(1)   # steadier numbers; the server shares the CPU anyway
+
+    server = load_server(args.models)
+    lengths = [float(x) if "." in x else int(x) for x in args.lengths.split(",")]
+    rates = [int(x) for x in args.rates.split(",")]
+
+    results = {}
+    if not args.compare:
+        print(f"{'case':<44}{'min ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'peak KiB':>11}")
+    for name, fn in cases(server, lengths, rates):
+        if args.filter and args.filter not in name:
+            continue
+        results[name] = measure(fn, args.repeat)
+        if not args.compare:
+            r = results[name]
+            print(f"{name:<44}{r['min_ms']:>10.2f}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['peak_kib']:>11.1f}")
+
+    regressions = []
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("note"):
+            print("[Bench] Baseline note:", baseline["note"])
+        regressions = compare(results, baseline["results"], args.tolerance)
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or ".", exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({
+                "models": args.models,
+                "machine": {"platform": platform.platform(), "processor": platform.processor(),
+                            "python": platform.python_version(), "torch": torch.__version__},
+                "repeat": args.repeat,
+                "results": results,
+            }, f, indent=2)
+        print(f"[Bench] Baseline written to {args.save}")
+
+    if regressions:
+        print(f"[Bench] {len(regressions)} regression(s)")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""ASR upload encodings: bytes on the wire, encode/decode CPU and WER"""
+
+# python benchmarks/bench_upload_formats.py temp_audio/ --mbps 5 --whisper-url http://127.0.0.1:9000/transcribe
+import argparse
+import glob
+import os
+import sys
+import time
+
+import numpy as np
+import requests
+import soundfile as sf
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_codec import UPLOAD_FORMATS, decode_audio, encode_audio
+from latency import percentile
+
+
+def word_errors(ref, hyp):
+    ref, hyp = ref.lower().split(), hyp.lower().split()
+    row = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        prev, row[0] = row[0], i
+        for j, h in enumerate(hyp, 1):
+            prev, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, prev + (r != h))
+    return row[-1], len(ref)
+
+
+def load(path, samplerate=16000):
+    audio, sr = sf.read(path, dtype="float32", always_2d=True)
+    audio = audio.mean(axis=1)
+    if sr != samplerate:
+        n = int(len(audio) * samplerate / sr)
+        audio = np.interp(np.linspace(0, len(audio) - 1, n), np.arange(len(audio)), audio)
+    return audio.astype(np.float32)
+
+
+def transcribe(url, data, filename, content_type):
+    resp = requests.post(url, files={"audio": (filename, data, content_type)}, timeout=60)
+    resp.raise_for_status()
+    return resp.json().get("text", "").strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("audio", nargs="+", help="WAV files or directories (e.g. temp_audio/)")
+    parser.add_argument("--formats", default="wav,flac,opus")
+    parser.add_argument("--repeat", type=int, default=5, help="Encode/decode repetitions per file")
+    parser.add_argument("--mbps", type=float, default=5.0, help="Uplink bandwidth for the transfer estimate")
+    parser.add_argument("--whisper-url", default=None,
+                        help="Whisper server /transcribe; WER is measured against the WAV transcript")
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    paths = []
+    for p in args.audio:
+        paths += sorted(glob.glob(os.path.join(p, "*.wav"))) if os.path.isdir(p) else [p]
+    paths = paths[:args.limit]
+    if not paths:
+        print("No audio files")
+        return
+
+    formats = args.formats.split(",")
+    unknown = [f for f in formats if f not in UPLOAD_FORMATS]
+    if unknown:
+        print("Unknown formats:", ", ".join(unknown))
+        return
+
+    clips = [load(p) for p in paths]
+    seconds = sum(len(c) for c in clips) / 16000
+    print(f"[Upload] {len(clips)} clips, {seconds:.1f}s of audio, uplink {args.mbps} Mbit/s")
+
+    results = {}
+    references = {}
+    for fmt in formats:
+        sizes, enc_ms, dec_ms, errors, words = [], [], [], 0, 0
+        for i, audio in enumerate(clips):
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                data, filename, content_type = encode_audio(audio, 16000, fmt)
+                enc_ms.append((time.perf_counter() - t0) * 1000)
+
+                t0 = time.perf_counter()
+                decode_audio(data)
+                dec_ms.append((time.perf_counter() - t0) * 1000)
+            sizes.append(len(data))
+
+            if args.whisper_url:
+                text = transcribe(args.whisper_url, data, filename, content_type)
+                if fmt == formats[0]:
+                    references[i] = text
+                else:
+                    e, n = word_errors(references[i], text)
+                    errors, words = errors + e, words + n
+
+        total = sum(sizes)
+        results[fmt] = {
+            "bytes": total,
+            "kbps": total * 8 / seconds / 1000,
+            "transfer_ms": total * 8 / (args.mbps * 1e6) * 1000 / len(clips),
+            "enc_p50": percentile(enc_ms, 50),
+            "dec_p50": percentile(dec_ms, 50),
+            "wer": errors / words if words else None,
+        }
+
+    base = results[formats[0]]["bytes"]
+    print(f"{'format':<8}{'bytes':>12}{'ratio':>8}{'kbit/s':>9}{'xfer ms':>9}"
+          f"{'enc ms':>9}{'dec ms':>9}{'WER vs ' + formats[0]:>14}")
+    for fmt, r in results.items():
+        wer = "-" if r["wer"] is None else f"{r['wer'] * 100:.1f}%"
+        print(f"{fmt:<8}{r['bytes']:>12}{r['bytes'] / base:>8.2f}{r['kbps']:>9.1f}{r['transfer_ms']:>9.1f}"
+              f"{r['enc_p50']:>9.2f}{r['dec_p50']:>9.2f}{wer:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""Load test: N simulated robots sharing one client process"""
+
+# python benchmarks/load_multi_robot.py --robots 4 --turns 10 --speed 4 --stub-voice
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import client as furhat_client
+from fake_furhat import FakeFurhat, Utterance
+from interaction_logger import read_session
+from latency import percentile, summarize_turns
+from llm_router import LLMRouter
+from replay_sessions import StubLLM
+
+
+SENTENCES = [
+    "The post office is about five minutes from here.",
+    "It closes at six in the evening.",
+    "Walk past the station and turn left at the bakery.",
+    "There is a pharmacy right next to the main square, and another one near the bus stop.",
+    "If you are in a hurry, the tram is usually the quickest option.",
+    "Opening hours may vary on public holidays, so it is worth checking before you go.",
+]
+
+
+# ============================
+# STUB VOICE
+# ============================
+
+class StubVoice:
+    """
+    Piper stand-in: one chunk per sentence after `rtf` seconds of work per
+    second of audio (sleeping, like onnxruntime outside the GIL).
+    """
+
+    class config:
+        sample_rate = 22050
+
+    def __init__(self, rtf=0.1, words_per_second=2.5):
+        self.rtf = rtf
+        self.words_per_second = words_per_second
+
+    def synthesize(self, text):
+        for sentence in text.replace("!", ".").replace("?", ".").split("."):
+            words = len(sentence.split())
+            if not words:
+                continue
+            seconds = words / self.words_per_second
+            time.sleep(seconds * self.rtf)
+            yield _Chunk(bytes(int(seconds * self.config.sample_rate) * 2))
+
+
+class _Chunk:
+    def __init__(self, data):
+        self.audio_int16_bytes = data
+
+
+# ============================
+# LOAD TEST
+# ============================
+
+def make_script(turns, rng, gap):
+    script = []
+    for i in range(turns):
+        reply = " ".join(rng.sample(SENTENCES, rng.randint(1, 4)))
+        text = f"Question {i}: where can I find a post office?"
+        script.append(Utterance(text, None, f"en: {reply} <user_emotion=Calm><response_emotion=Happy>", {}, gap))
+    return script
+
+
+def jain(values):
+    # 1.0 = every robot got the same service, 1/n = one robot got all of it
+    values = [v for v in values if v is not None]
+    if not values or not any(values):
+        return None
+    return round(sum(values) ** 2 / (len(values) * sum(v * v for v in values)), 3)
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    log_dir = tempfile.mkdtemp(prefix="furhat_load_")
+
+    voices = None
+    if args.stub_voice:
+        voice = StubVoice(args.stub_rtf)
+        voices = {lang: voice for lang in furhat_client.PIPER_VOICE_PATHS}
+    shared = furhat_client.SharedServices(
+        file_port=args.port,
+        tts_workers=args.tts_workers,
+        voices=voices,
+        phrase_cache_dir=os.path.join(log_dir, "tts_cache") if args.stub_voice else furhat_client.PHRASE_CACHE_DIR,
+    )
+
+    robots = []
+    for i in range(args.robots):
+        fake = FakeFurhat(make_script(args.turns, rng, args.gap), speed=args.speed, name=f"robot{i}")
+        bot = furhat_client.SimpleFurhatClient(
+            f"robot{i}",
+            asr_mode="furhat",
+            stream_tts=args.stream_tts,
+            furhat=fake,
+            log_dir=log_dir,
+            shared=shared,
+        )
+        stub = StubLLM(fake, args.speed, args.llm_first_token, args.llm_total)
+        bot.llm_router = LLMRouter({"stub": stub}, ["stub"], hedge_deadline=None)
+        robots.append((fake, bot))
+
+    t0 = time.monotonic()
+    runners = [asyncio.create_task(bot.run(install_signals=False)) for _, bot in robots]
+    await asyncio.gather(*(fake.finished.wait() for fake, _ in robots))
+
+    quiet = 0
+    while quiet < 2:
+        await asyncio.sleep(0.05)
+        busy = any(bot.turns.busy or bot.pending_turn for _, bot in robots)
+        quiet = 0 if busy else quiet + 1
+    for _, bot in robots:
+        await bot.shutdown()
+    await asyncio.gather(*runners)
+    await shared.stop()
+    wall = time.monotonic() - t0
+
+    print(f"[Load] {args.robots} robots x {args.turns} turns in {wall:.1f}s "
+          f"(tts workers {args.tts_workers}, speed {args.speed or 'max'})")
+    print(f"{'robot':<10}{'turns':>6}{'tts p50':>10}{'tts p95':>10}{'1st byte p95':>14}{'total p95':>11}")
+
+    tts_means, totals = [], []
+    all_turns = []
+    for fake, bot in robots:
+        turns = read_session(bot.logger.path)["turns"]
+        all_turns.extend(turns)
+        summary = summarize_turns(turns)
+        tts = summary.get("make_tts", {})
+        total = summary.get("total", {})
+        first = [f["first_byte_s"] * 1000 for f in fake.fetches]
+        tts_durations = [t["latency"]["stages"]["make_tts"]["duration_ms"]
+                         for t in turns if "make_tts" in (t.get("latency") or {}).get("stages", {})]
+        tts_means.append(sum(tts_durations) / len(tts_durations) if tts_durations else None)
+        totals.append(total.get("p95_ms"))
+        print(f"{fake.name:<10}{len(turns):>6}{tts.get('p50_ms', '-'):>10}{tts.get('p95_ms', '-'):>10}"
+              f"{round(percentile(first, 95), 1) if first else '-':>14}{total.get('p95_ms', '-'):>11}")
+
+    overall = summarize_turns(all_turns)
+    print(f"[Load] make_tts p50/p95 over all robots: "
+          f"{overall.get('make_tts', {}).get('p50_ms')} / {overall.get('make_tts', {}).get('p95_ms')} ms")
+    print(f"[Load] Fairness (Jain) of mean make_tts: {jain(tts_means)}, of total p95: {jain(totals)}")
+    print(f"[Load] TTS chunks per robot: {dict(shared.tts.stats)}")
+    print(f"[Load] Logs in {log_dir}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate several robots against one shared client process")
+    parser.add_argument("--robots", type=int, default=4)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--speed", type=float, default=4.0,
+                        help="Simulated time factor for speech, playback and the stub LLM (0 = no waits)")
+    parser.add_argument("--gap", type=float, default=1.0)
+    parser.add_argument("--tts-workers", type=int, default=furhat_client.TTS_WORKERS)
+    parser.add_argument("--stream-tts", action="store_true")
+    parser.add_argument("--stub-voice", action="store_true",
+                        help="Use a synthetic voice instead of the Piper models")
+    parser.add_argument("--stub-rtf", type=float, default=0.1,
+                        help="Synthetic voice: seconds of work per second of audio")
+    parser.add_argument("--llm-first-token", type=float, default=0.5)
+    parser.add_argument("--llm-total", type=float, default=1.0)
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    os.environ.setdefault("LOCAL_IP", "127.0.0.1")
+    os.environ.setdefault("PARTICIPANT_ID", "LOAD")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""Replay recorded sessions through the client's ASR -> LLM -> TTS path"""
+
+# python benchmarks/replay_sessions.py run logs/ --asr whisper --whisper-url http://127.0.0.1:9000/transcribe --speed 4 --out runs/base.json
+# python benchmarks/replay_sessions.py diff runs/base.json runs/new.json
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import soundfile as sf
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import client as furhat_client
+from fake_furhat import FakeFurhat, ReplayMic, Utterance
+from interaction_logger import read_session
+from latency import find_logs, load_turns, percentile, print_summary, summarize_turns
+from llm_router import LLMRouter
+from response_parser import ParsedResponse, format_response
+
+
+# ============================
+# SCRIPT
+# ============================
+
+def load_audio(path, samplerate=16000):
+    audio, sr = sf.read(path, dtype="float32")
+    if audio.ndim > 1:
+        audio = audio.mean(axis=1)
+    if sr != samplerate:
+        n = int(len(audio) * samplerate / sr)
+        audio = np.interp(np.linspace(0, len(audio) - 1, n), np.arange(len(audio)), audio)
+    return audio.astype(np.float32)
+
+
+def load_script(paths, gap=1.0, max_turns=None):
+    """Completed turns from session logs -> utterances with their recorded reply."""
+    script = []
+    for path in paths:
+        for turn in load_turns(path):
+            if turn.get("status", "completed") != "completed":
+                continue
+            user = turn.get("user") or {}
+            assistant = turn.get("assistant") or {}
+            text = (user.get("asr_text") or "").strip()
+            if not text:
+                continue
+
+            audio = None
+            wav = (turn.get("audio") or {}).get("user_audio")
+            if wav and os.path.exists(wav):
+                audio = load_audio(wav)
+
+            reply = format_response(ParsedResponse(
+                assistant.get("language"),
+                assistant.get("response_text", ""),
+                user.get("emotion") or "Calm",
+                assistant.get("emotion") or "Calm",
+            ), default_lang="en")
+            script.append(Utterance(text, audio, reply, turn.get("llm") or {}, gap))
+
+            if max_turns and len(script) >= max_turns:
+                return script
+    return script
+
+
+# ============================
+# STUB LLM
+# ============================
+
+class StubLLM:
+    """
+    Answers with the reply recorded for the utterance being replayed, after
+    the recorded first-token / total latency (or fixed ones), scaled by speed.
+    """
+
+    def __init__(self, furhat, speed=1.0, first_token_s=None, total_s=None):
+        self.furhat = furhat
+        self.speed = speed
+        self.first_token_s = first_token_s
+        self.total_s = total_s
+
+    def _recorded(self, llm, key, default):
+        backend = llm.get("backend")
+        return (llm.get(key) or {}).get(backend, default)
+
+    async def __call__(self, text, first_token):
+        utt = self.furhat.current
+        first = self.first_token_s
+        if first is None:
+            first = self._recorded(utt.llm, "first_token_s", 0.5)
+        total = self.total_s
+        if total is None:
+            total = self._recorded(utt.llm, "latency_s", first + 0.5)
+
+        scale = 1.0 / self.speed if self.speed else 0.0
+        await asyncio.sleep(first * scale)
+        first_token.set()
+        await asyncio.sleep(max(total - first, 0.0) * scale)
+        return utt.reply
+
+
+# ============================
+# RUN
+# ============================
+
+async def replay(args, script):
+    mic = ReplayMic(furhat_client.SAMPLE_RATE, args.speed) if args.asr != "furhat" else None
+    fake = FakeFurhat(script, speed=args.speed, mic=mic)
+
+    bot = furhat_client.SimpleFurhatClient(
+        "replay",
+        asr_mode=args.asr,
+        llm_backend="openai" if args.llm == "stub" else args.llm,
+        speculative_asr=args.speculative_asr,
+        stream_tts=args.stream_tts,
+        barge_in=args.barge_in,
+        furhat=fake,
+        mic=mic,
+        log_dir=args.log_dir,
+    )
+    if args.llm == "stub":
+        stub = StubLLM(fake, args.speed, args.llm_first_token, args.llm_total)
+        bot.llm_router = LLMRouter({"stub": stub}, ["stub"], hedge_deadline=None)
+
+    t0 = time.monotonic()
+    runner = asyncio.create_task(bot.run())
+    finished = asyncio.create_task(fake.finished.wait())
+    await asyncio.wait([runner, finished], return_when=asyncio.FIRST_COMPLETED)
+    if runner.done():
+        finished.cancel()
+        runner.result()
+
+    # Let the last turn be answered and played; idle twice in a row so a
+    # hear.end that was just emitted has been picked up.
+    quiet = 0
+    while quiet < 2:
+        await asyncio.sleep(0.05)
+        quiet = 0 if bot.turns.busy or bot.pending_turn else quiet + 1
+    await bot.shutdown()
+    await runner
+    wall = time.monotonic() - t0
+
+    session = read_session(bot.logger.path)
+    first_bytes = [f["first_byte_s"] * 1000 for f in fake.fetches]
+    return {
+        "config": {
+            "asr": args.asr, "llm": args.llm, "speed": args.speed,
+            "stream_tts": args.stream_tts, "speculative_asr": args.speculative_asr,
+            "barge_in": args.barge_in, "logs": args.logs,
+        },
+        "session_log": bot.logger.path,
+        "utterances": len(script),
+        "turns": session["summary"]["num_turns"],
+        "cancelled_turns": session["summary"]["cancelled_turns"],
+        "wall_s": round(wall, 2),
+        "startup": session.get("config", {}).get("startup"),
+        "audio_first_byte": {
+            "p50_ms": round(percentile(first_bytes, 50), 1) if first_bytes else None,
+            "p95_ms": round(percentile(first_bytes, 95), 1) if first_bytes else None,
+        },
+        "summary": summarize_turns(session["turns"]),
+    }
+
+
+def cmd_run(args):
+    paths = find_logs(args.logs) if os.path.isdir(args.logs) else [args.logs]
+    script = load_script(paths, gap=args.gap, max_turns=args.max_turns)
+    if not script:
+        print(f"[Replay] No completed turns in {args.logs}")
+        return 1
+
+    if args.asr != "furhat" and any(u.audio is None for u in script):
+        missing = sum(u.audio is None for u in script)
+        print(f"[Replay] {missing} utterance(s) have no recording; they are replayed as empty audio")
+        script = [u._replace(audio=u.audio if u.audio is not None else np.zeros(0, np.float32))
+                  for u in script]
+
+    if args.whisper_url:
+        furhat_client.WHISPER_SERVER = args.whisper_url
+    if args.luxllama_url:
+        furhat_client.LUXLLAMA_URL = args.luxllama_url
+    os.environ.setdefault("LOCAL_IP", "127.0.0.1")
+    os.environ.setdefault("PARTICIPANT_ID", "REPLAY")
+
+    print(f"[Replay] {len(script)} utterances from {len(paths)} session(s), speed {args.speed or 'max'}")
+    result = asyncio.run(replay(args, script))
+
+    print(f"[Replay] {result['turns']} turns ({result['cancelled_turns']} cancelled) in {result['wall_s']}s")
+    print_summary(result["summary"])
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"[Replay] Written to {args.out}")
+    return 0
+
+
+# ============================
+# DIFF
+# ============================
+
+def cmd_diff(args):
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)["summary"]
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)["summary"]
+
+    regressions = 0
+    print(f"{'stage':<20}{'p50 base':>10}{'p50 new':>10}{'p95 base':>10}{'p95 new':>10}{'p95 %':>9}")
+    for stage in list(base) + [s for s in new if s not in base]:
+        a, b = base.get(stage), new.get(stage)
+        if not a or not b:
+            print(f"{stage:<20}{'only in ' + ('base' if a else 'new'):>49}")
+            continue
+        change = (b["p95_ms"] - a["p95_ms"]) / a["p95_ms"] * 100 if a["p95_ms"] else 0.0
+        worse = (b["p95_ms"] - a["p95_ms"] > args.min_ms and change > args.threshold
+                 or b["p50_ms"] - a["p50_ms"] > args.min_ms
+                 and b["p50_ms"] > a["p50_ms"] * (1 + args.threshold / 100))
+        regressions += worse
+        print(f"{stage:<20}{a['p50_ms']:>10}{b['p50_ms']:>10}{a['p95_ms']:>10}{b['p95_ms']:>10}"
+              f"{change:>+8.1f}%{'  REGRESSION' if worse else ''}")
+
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded sessions and compare latency")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("run", help="Replay session logs through the client")
+    p.add_argument("logs", help="Log directory or session file (.json/.jsonl)")
+    p.add_argument("--asr", choices=["furhat", "whisper", "luxasr", "auto"], default="furhat",
+                   help="furhat replays the recorded transcript; whisper/luxasr/auto re-transcribe the recording")
+    p.add_argument("--whisper-url", default=None, help="Local Whisper server /transcribe URL")
+    p.add_argument("--llm", choices=["stub", "openai", "luxllama"], default="stub")
+    p.add_argument("--luxllama-url", default=None, help="LuxLLaMA /generate URL (e.g. a small local model)")
+    p.add_argument("--llm-first-token", type=float, default=None,
+                   help="Stub first-token latency in seconds (default: recorded)")
+    p.add_argument("--llm-total", type=float, default=None,
+                   help="Stub total latency in seconds (default: recorded)")
+    p.add_argument("--speed", type=float, default=1.0,
+                   help="Simulated time factor for speech, playback and the stub (0 = no waits)")
+    p.add_argument("--gap", type=float, default=1.0, help="Seconds between listen.start and the user speaking")
+    p.add_argument("--max-turns", type=int, default=None)
+    p.add_argument("--stream-tts", action="store_true")
+    p.add_argument("--speculative-asr", action="store_true")
+    p.add_argument("--barge-in", action="store_true")
+    p.add_argument("--log-dir", default=os.path.join(tempfile.gettempdir(), "furhat_replay_logs"))
+    p.add_argument("--out", default=None, help="Write the run summary as JSON")
+
+    p = sub.add_parser("diff", help="Compare the per-stage latency of two runs")
+    p.add_argument("base")
+    p.add_argument("new")
+    p.add_argument("--threshold", type=float, default=10.0, help="Percent increase counted as a regression")
+    p.add_argument("--min-ms", type=float, default=20.0, help="Ignore changes smaller than this")
+
+    args = parser.parse_args()
+    sys.exit(cmd_run(args) if args.cmd == "run" else cmd_diff(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,47 @@
 # python client.py --luxasr --host 127.0.0.1
+import time
+
+_IMPORT_START = time.monotonic()
+
 import asyncio
 import argparse
 import signal
 import os
 import uuid
-import wave
 import threading
-import queue
 import collections
 import re
+import functools
 
 import numpy as np
-import sounddevice as sd
 import soundfile as sf
 
-from flask import Flask, send_from_directory
-
 from openai import AsyncOpenAI
 from furhat_realtime_api import AsyncFurhatClient, Events
-from piper.voice import PiperVoice
 import aiohttp
-import json
 from datetime import datetime
 
+from llm_router import LLMRouter
+from asr_backends import ASRRouter, LanguageRouter
+from audio_codec import WAV_HEADER_SIZE, encode_audio, wav_header
+from latency import TurnTimer
+from interaction_logger import InteractionLogger
+from prompting import PromptAssembler, TokenCounter
+from response_parser import ResponseParser, parse_response, format_response
+from turn_scheduler import TurnScheduler
+from audio_server import AudioServer, AudioStore
+from phrase_bank import PhraseBank
+from tts_scheduler import FairTTSScheduler
+from semantic_cache import (
+    DEFAULT_MODEL as DEFAULT_CACHE_MODEL, SemanticCache, context_key, load_embedder, utterance_language,
+)
+from model_loading import load_piper_voice
+from piper_synthesis import synthesize_chunks
+
+# sounddevice and piper are imported when a microphone / the voices are
+# actually needed, so importing this module stays cheap.
+IMPORT_SECONDS = time.monotonic() - _IMPORT_START
+
 
 # ============================
 # CONFIG
@@ -37,7 +56,10 @@ SAMPLE_RATE = 16000
 WHISPER_SERVER = "<WHISPER SERVER PORT>/transcribe"
 
 AUDIO_DIR = "temp_audio"
-os.makedirs(AUDIO_DIR, exist_ok=True)
+
+# ASR modes that record with the local microphone; "auto" picks LuxASR or
+# Whisper per utterance from the spoken language.
+EXTERNAL_ASR_MODES = ("whisper", "luxasr", "auto")
 
 FILE_PORT = 8080
 
@@ -124,103 +146,63 @@ Your goal is to explore the request respectfully without overstepping.
 # ============================
 
 LUXLLAMA_URL = "<LUXLLAMA SERVER PORT>/generate"
+LUXLLAMA_TOKENIZER = "aiplanet/LuxLlama"
+# Seconds the client waits for a reply; the server stops generating after that.
+LUXLLAMA_DEADLINE = 15.0
 
 
 
 # ============================
-# LOCAL HTTP SERVER (TTS FILES)
+# LOCAL HTTP SERVER (TTS AUDIO)
 # ============================
 
 def get_local_ip():
+    """
+    Address Furhat should fetch audio from. LOCAL_IP overrides discovery;
+    otherwise the outbound interface is looked up (a UDP connect sends no
+    packets), then the hostname, and loopback as a last resort so offline
+    hosts still start.
+    """
     import socket
-    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    s.connect(("8.8.8.8", 80))
-    ip = s.getsockname()[0]
-    s.close()
-    return ip
 
+    override = os.environ.get("LOCAL_IP")
+    if override:
+        return override
 
-LOCAL_IP = get_local_ip()
-BASE_URL = f"http://{LOCAL_IP}:{FILE_PORT}"
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            s.connect(("8.8.8.8", 80))
+            return s.getsockname()[0]
+    except OSError:
+        pass
 
-app = Flask(__name__)
-
-
-@app.route("/audio/<name>")
-def serve_audio(name):
-    return send_from_directory(AUDIO_DIR, name)
-
-
-def run_server():
-    app.run("0.0.0.0", FILE_PORT, debug=False, use_reloader=False)
-
-
-threading.Thread(target=run_server, daemon=True).start()
-
-# ============================
-# INTERACTION LOGGER
-# ============================
-
-class InteractionLogger:
-    def __init__(self, base_dir="logs"):
-        self.base_dir = base_dir
-        os.makedirs(self.base_dir, exist_ok=True)
-        self.session = None
-
-    def start_session(self, participant_id, task_id, config):
-        self.session = {
-            "session_id": str(uuid.uuid4()),
-            "participant_id": participant_id,
-            "task_id": task_id,
-            "config": config,
-            "start_time": datetime.utcnow().isoformat(),
-            "end_time": None,
-            "turns": [],
-            "summary": {}
-        }
-
-    def log_turn(self, turn_data):
-        if self.session:
-            self.session["turns"].append(turn_data)
-
-    def end_session(self, completed=True, notes=None):
-        if not self.session:
-            return
-
-        self.session["end_time"] = datetime.utcnow().isoformat()
-        self.session["summary"] = {
-            "num_turns": len(self.session["turns"]),
-            "completed": completed,
-            "notes": notes
-        }
-
-        fname = (
-            f"{self.session['participant_id']}_"
-            f"task{self.session['task_id']}_"
-            f"{self.session['session_id']}.json"
-        )
-
-        path = os.path.join(self.base_dir, fname)
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(self.session, f, indent=2, ensure_ascii=False)
-
-        print(f"[LOG] Interaction saved to {path}")
+    try:
+        return socket.gethostbyname(socket.gethostname())
+    except OSError:
+        pass
 
+    print("[Net] Could not determine local IP, using 127.0.0.1 (set LOCAL_IP)")
+    return "127.0.0.1"
 
+# TTS audio is kept in memory and served from the client's event loop.
+AUDIO_CACHE_BYTES = 64 * 1024 * 1024
 
 # ============================
 # LOCAL MICROPHONE RECORDER
 # ============================
 
 class LocalMicRecorder:
-    def __init__(self, samplerate=16000, preroll_ms=500):
+    def __init__(self, samplerate=16000, preroll_ms=500, device=None):
         self.samplerate = samplerate
         self.preroll_chunks = int(preroll_ms / 10)
         self.buffer = collections.deque(maxlen=self.preroll_chunks)
+        self.preroll = []
         self.frames = []
         self.recording = False
 
+        import sounddevice as sd
         self.stream = sd.InputStream(
+            device=device,
             samplerate=self.samplerate,
             channels=1,
             dtype="float32",
@@ -233,71 +215,395 @@ class LocalMicRecorder:
             print(status)
 
         chunk = indata.copy()
-        self.buffer.append(chunk)
 
         if self.recording:
             self.frames.append(chunk)
+        else:
+            self.buffer.append(chunk)
 
     def start_stream(self):
         if not self.stream.active:
             self.stream.start()
 
     def start_recording(self):
+        # Freeze the pre-roll now so the start of the recording stays stable
+        # while it grows (speculative ASR caches hypotheses per prefix).
+        self.preroll = list(self.buffer)
         self.frames = []
         self.recording = True
 
-    def stop_and_save(self, path):
+    def snapshot(self):
+        frames = list(self.frames)
+        if not frames:
+            return None
+        return np.concatenate(self.preroll + frames, axis=0)
+
+    def stop(self):
+        audio = self.snapshot()
         self.recording = False
+        self.buffer.clear()
+        return audio
 
-        if not self.frames:
-            return None
+    def stop_and_save(self, path):
+        audio = self.stop()
 
-        audio = np.concatenate(
-            list(self.buffer) + self.frames,
-            axis=0
-        )
+        if audio is None:
+            return None
 
         sf.write(path, audio, self.samplerate)
         return path
 
 
+# ============================
+# SPECULATIVE ASR
+# ============================
+
+class SpeculativeASR:
+    """
+    Transcribes the audio captured so far while the user is still speaking,
+    so that at hear.end only the tail needs ASR (or nothing at all).
+
+    Hypotheses are cached per prefix length. Prefixes taken at a pause end on
+    a word boundary and can be extended with a tail transcription; prefixes
+    taken on the timer are only reused if nothing was said after them.
+    """
+
+    def __init__(self, mic, transcribe, interval=0.8, min_new_audio=0.4,
+                 pause_ms=250, silence_rms=0.01, poll=0.05):
+        self.mic = mic
+        self.transcribe = transcribe  # async (audio) -> text or None
+        self.samplerate = mic.samplerate
+        self.interval = int(interval * self.samplerate)
+        self.min_new_audio = int(min_new_audio * self.samplerate)
+        self.pause_samples = int(pause_ms / 1000 * self.samplerate)
+        self.silence_rms = silence_rms
+        self.poll = poll
+
+        self.active = False
+        self.task = None
+        self.hypotheses = []
+        self.stats = {}
+
+    def rms(self, audio):
+        if audio is None or len(audio) == 0:
+            return 0.0
+        return float(np.sqrt(np.mean(np.square(audio))))
+
+    def start(self):
+        self.stop_nowait()
+        self.stats = {"prefix_requests": 0, "prefix_errors": 0}
+        self.active = True
+        self.task = asyncio.create_task(self._loop())
+
+    def stop_nowait(self):
+        self.active = False
+        if self.task and not self.task.done():
+            self.task.cancel()
+        self.task = None
+        self.hypotheses = []
+
+    def freeze(self):
+        # No new prefixes: the microphone now records the next utterance.
+        # A request in flight still lands for finish().
+        self.active = False
+
+    async def _loop(self):
+        last_len = 0
+        while self.active:
+            await asyncio.sleep(self.poll)
+            if not self.active:
+                break
+            audio = self.mic.snapshot()
+            if audio is None:
+                continue
+
+            new = len(audio) - last_len
+            if new < self.min_new_audio:
+                continue
+
+            tail = audio[-self.pause_samples:]
+            at_pause = self.rms(tail) < self.silence_rms
+            if not at_pause and new < self.interval:
+                continue
+
+            last_len = len(audio)
+            self.stats["prefix_requests"] += 1
+            try:
+                text = await self.transcribe(audio)
+            except Exception as e:
+                print("[SpecASR] Prefix request failed:", e)
+                text = None
+
+            if text is None:
+                self.stats["prefix_errors"] += 1
+                continue
+
+            self.hypotheses.append((len(audio), text.strip(), at_pause))
+            print(f"[SpecASR] {len(audio) / self.samplerate:.2f}s ->", text.strip())
+
+    async def finish(self, audio):
+        # Let an in-flight prefix request land instead of throwing it away.
+        self.active = False
+        if self.task:
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+        hypotheses, self.hypotheses = self.hypotheses, []
+        if audio is None:
+            return ""
+
+        if hypotheses:
+            n, text, _ = hypotheses[-1]
+            if self.rms(audio[n:]) < self.silence_rms:
+                self.stats["result"] = "confirmed"
+                self.stats["prefix_seconds"] = n / self.samplerate
+                return text
+
+            for n, text, at_pause in reversed(hypotheses):
+                if not at_pause:
+                    continue
+                tail_text = await self.transcribe(audio[n:])
+                if tail_text is None:
+                    break
+                self.stats["result"] = "tail"
+                self.stats["prefix_seconds"] = n / self.samplerate
+                self.stats["tail_seconds"] = (len(audio) - n) / self.samplerate
+                return f"{text} {tail_text.strip()}".strip()
+
+        self.stats["result"] = "full"
+        text = await self.transcribe(audio)
+        return (text or "").strip()
+
+
+class UtteranceASR:
+    """
+    ASR state of one utterance from hear.start to its transcript: the
+    speculative prefixes, early language ID and the routing and ASR info
+    logged with its turn. With barge-in the next utterance starts while this
+    one is still being answered, so none of it lives on the client.
+    """
+
+    def __init__(self, speculative=None):
+        self.speculative = speculative
+        self.recording = True
+        self.lid_task = None
+        self.lid_start = 0
+        self.asr_route = None
+        self.route_info = None
+        self.asr_info = None
+
+    def end_of_audio(self):
+        self.recording = False
+        if self.speculative:
+            self.speculative.freeze()
+
+    def cancel(self):
+        self.recording = False
+        if self.speculative:
+            self.speculative.stop_nowait()
+        if self.lid_task and not self.lid_task.done():
+            self.lid_task.cancel()
+
+
 # ============================
 # PIPER TTS
 # ============================
 
-PIPER_VOICES = {
-    "en": PiperVoice.load("tts_models/en_US_lessac/en_US-lessac-medium.onnx"),
-    "lb": PiperVoice.load("tts_models/lb_LU/lb_LU-marylux-medium.onnx"),
+PIPER_VOICE_PATHS = {
+    "en": "tts_models/en_US_lessac/en_US-lessac-medium.onnx",
+    "lb": "tts_models/lb_LU/lb_LU-marylux-medium.onnx",
 }
 
 
+# copy or mmap (share the voice weights with other processes, see model_loading.py)
+MODEL_LOADING = os.getenv("MODEL_LOADING", "copy")
+
+
+@functools.lru_cache(maxsize=None)
+def load_piper_voices():
+    """Load every Piper voice once per process."""
+    return {lang: load_piper_voice(path, MODEL_LOADING) for lang, path in PIPER_VOICE_PATHS.items()}
+
+
+# Pre-rendered greetings / fillers, persisted across sessions
+PHRASE_CACHE_DIR = "tts_cache"
+
+# Worker threads for Piper synthesis, shared by all robots
+TTS_WORKERS = 2
+
+
+# ============================
+# SHARED SERVICES
+# ============================
+
+class SharedServices:
+    """
+    Process-wide resources used by every robot session: the Piper voices and
+    phrase bank, the audio store and its HTTP server, one aiohttp session
+    (connection pool) and OpenAI client, and the fair TTS scheduler.
+    A single-robot client creates its own.
+    """
+
+    def __init__(self, file_port=FILE_PORT, tts_workers=TTS_WORKERS, startup=None,
+                 voices=None, phrase_cache_dir=PHRASE_CACHE_DIR, semantic_cache=None):
+        self.startup = startup or TurnTimer()
+        self.audio_store = AudioStore(AUDIO_CACHE_BYTES)
+        self.audio_server = AudioServer(self.audio_store, "0.0.0.0", file_port)
+        with self.startup.span("local_ip"):
+            self.base_url = f"http://{get_local_ip()}:{file_port}"
+        self.openai = AsyncOpenAI(api_key=OPENAI_API_KEY)
+        self.tts = FairTTSScheduler(tts_workers)
+        self.http = None
+        self.voices = voices
+        self.phrase_cache_dir = phrase_cache_dir
+        self.phrase_bank = None
+        # Optional SemanticCache of replies, shared by robots on the same task
+        self.semantic_cache = semantic_cache
+        self.started = None
+
+    def load_tts(self):
+        # Blocking; runs in an executor while the robots connect.
+        if self.voices is None:
+            with self.startup.span("voices"):
+                self.voices = load_piper_voices()
+        with self.startup.span("phrase_bank"):
+            phrase_bank = PhraseBank(self.voices, PIPER_VOICE_PATHS, self.phrase_cache_dir)
+            phrase_bank.build()
+        return phrase_bank
+
+    def start(self):
+        # Every robot awaits the same start-up.
+        if self.started is None:
+            self.started = asyncio.ensure_future(self._start())
+        return self.started
+
+    async def _start(self):
+        loop = asyncio.get_running_loop()
+        tts = loop.run_in_executor(None, self.load_tts)
+
+        self.http = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=32, keepalive_timeout=30)
+        )
+        with self.startup.span("audio_server"):
+            await self.audio_server.start()
+
+        self.phrase_bank = await tts
+        self.phrase_bank.load_into(self.audio_store)
+
+    async def stop(self):
+        await self.audio_server.stop()
+        if self.http:
+            await self.http.close()
+            self.http = None
+        self.tts.close()
+
+
 # ============================
 # CLIENT
 # ============================
 
 class SimpleFurhatClient:
 
-    def __init__(self, host, asr_mode="whisper", llm_backend="openai"):
-
-        self.furhat = AsyncFurhatClient(host)
-        self.openai = AsyncOpenAI(api_key=OPENAI_API_KEY)
+    def __init__(self, host, asr_mode="whisper", llm_backend="openai",
+                 speculative_asr=False, speculative_interval=0.8,
+                 hedge_deadline=None, history_tokens=150, barge_in=False,
+                 stream_tts=False, filler_after=None,
+                 furhat=None, mic=None, log_dir="logs",
+                 shared=None, mic_device=None, asr_fallback=None, asr_timeout=5.0,
+                 upload_format="wav", semantic_cache=None):
+
+        self.startup = TurnTimer()
+        self.host = host
+        # furhat/mic can be replaced by stand-ins (see fake_furhat.py)
+        self.furhat = furhat or AsyncFurhatClient(host)
+        self.owns_shared = shared is None
+        self.shared = shared or SharedServices(startup=self.startup, semantic_cache=semantic_cache)
+        self.openai = self.shared.openai
+        self.cache = self.shared.semantic_cache
+        self.cache_info = None
 
         self.asr_mode = asr_mode
         self.running = True
         self.dialogue_history = []
-        self.MAX_TURNS = 4 
+        self.pending_turn = None
+        self.turns = TurnScheduler()
+        self.filler_after = filler_after
+        self.filler_playing = False
+        self.filler_done = asyncio.Event()
+        self.filler_ends_at = 0.0
+        self.last_lang = "lb" if llm_backend == "luxllama" else "en"
+        self.stream_tts = stream_tts
+        self.audio_store = self.shared.audio_store
+        self.base_url = self.shared.base_url
+        self.barge_in = barge_in
+        # Prompts are trimmed to history_tokens; this only bounds memory.
+        self.MAX_HISTORY = 40
         self.llm_backend = llm_backend
 
+        uses_luxllama = llm_backend == "luxllama" or hedge_deadline is not None
+        with self.startup.span("tokenizers"):
+            self.prompts = PromptAssembler(
+                TASK_PROMPTS,
+                history_budget=history_tokens,
+                openai_counter=TokenCounter.for_openai(MODEL_NAME),
+                luxllama_counter=(
+                    TokenCounter.for_hf(LUXLLAMA_TOKENIZER) if uses_luxllama else None
+                ),
+            )
+        self.prompt_stats = {}
+
+        backends = {"openai": self.ask_gpt, "luxllama": self.ask_luxllama}
+        order = [llm_backend]
+        if hedge_deadline is not None:
+            order += [name for name in backends if name != llm_backend]
+            print(f"[LLM] Hedged routing {order} (deadline {hedge_deadline}s)")
+        self.llm_router = LLMRouter(
+            {name: backends[name] for name in order},
+            order,
+            hedge_deadline=hedge_deadline,
+        )
 
-        if self.asr_mode in ("whisper", "luxasr"):
+        if self.asr_mode in EXTERNAL_ASR_MODES:
             print("[Mic] External microphone ENABLED for", self.asr_mode, "ASR.")
-            self.mic = LocalMicRecorder(SAMPLE_RATE)
-            self.mic.start_stream()
+            os.makedirs(AUDIO_DIR, exist_ok=True)
+            with self.startup.span("microphone"):
+                self.mic = mic or LocalMicRecorder(SAMPLE_RATE, device=mic_device)
+                self.mic.start_stream()
         else:
             print("[Mic] External microphone DISABLED (using Furhat ASR)")
             self.mic = None
 
-        print(f"[ASR] Mode set to: {self.asr_mode}")
+        self.speculative_interval = None
+        if speculative_asr and self.mic:
+            print("[SpecASR] Speculative transcription ENABLED")
+            self.speculative_interval = speculative_interval
+        # ASR state of the utterance being spoken (see UtteranceASR)
+        self.utterance = None
+
+        # External ASR fails over to the other service, then to the text
+        # Furhat's own recognizer put in hear.end.
+        primary = [asr_mode] if asr_mode != "auto" else ["luxasr", "whisper"]
+        if asr_fallback is None:
+            asr_fallback = [b for b in ("luxasr", "whisper") if b != asr_mode] + ["furhat"]
+        asr_order = primary + [b for b in asr_fallback if b not in primary]
+        self.upload_format = upload_format
+        self.asr = ASRRouter(
+            {"luxasr": self.asr_luxasr, "whisper": self.asr_whisper, "furhat": self.asr_furhat},
+            asr_order if asr_mode != "furhat" else ["furhat"],
+            timeout=asr_timeout,
+            event_backends=["furhat"],
+        )
+
+        # Auto mode: the language of the first second of speech picks the
+        # backend; it is identified while the user is still speaking.
+        self.language_router = None
+        if asr_mode == "auto":
+            self.language_router = LanguageRouter(self.detect_language, samplerate=SAMPLE_RATE)
+
+        print(f"[ASR] Mode set to: {self.asr_mode} (order {self.asr.order})")
 
         # ========================
         # EXPERIMENT METADATA
@@ -306,16 +612,26 @@ class SimpleFurhatClient:
         self.participant_id = os.environ.get("PARTICIPANT_ID", "P_UNKNOWN")
         self.task_id = os.environ.get("TASK_ID", "T_UNKNOWN")
 
-        self.logger = InteractionLogger()
-        self.logger.start_session(
-            participant_id=self.participant_id,
-            task_id=self.task_id,
-            config={
-                "asr_mode": self.asr_mode,
-                "llm_backend": self.llm_backend,
-                "model": MODEL_NAME
-            }
-        )
+        self.logger = InteractionLogger(log_dir)
+        # The session is started in run() so the config can carry startup timings.
+        self.session_config = {
+            "robot": host,
+            "asr_mode": self.asr_mode,
+            "llm_backend": self.llm_backend,
+            "hedge_deadline": hedge_deadline,
+            "history_tokens": history_tokens,
+            "barge_in": barge_in,
+            "stream_tts": stream_tts,
+            "filler_after": filler_after,
+            "model": MODEL_NAME,
+            "speculative_asr": self.speculative_interval is not None,
+            "asr_order": self.asr.order,
+            "upload_format": upload_format,
+            "semantic_cache": (
+                {"embedder": self.cache.embedder.name, "threshold": self.cache.threshold}
+                if self.cache else None
+            ),
+        }
 
 
     # ========================
@@ -329,9 +645,18 @@ class SimpleFurhatClient:
 
     async def shutdown(self):
         print("Shutting down...")
-        self.logger.end_session(
-            completed=True,
-            notes="Session ended by experimenter or system"
+        if self.utterance:
+            self.utterance.cancel()
+        await self.turns.shutdown()
+        self.finish_pending_turn()
+        # Waits for the log writer thread; keep that off the event loop.
+        await asyncio.get_running_loop().run_in_executor(
+            None,
+            functools.partial(
+                self.logger.end_session,
+                completed=True,
+                notes="Session ended by experimenter or system",
+            ),
         )
 
         self.running = False
@@ -343,6 +668,8 @@ class SimpleFurhatClient:
             await self.furhat.disconnect()
         except:
             pass
+        if self.owns_shared:
+            await self.shared.stop()
 
     # ========================
     # TURN EVENTS
@@ -350,38 +677,67 @@ class SimpleFurhatClient:
 
     async def on_listen_start(self, event):
         print("[Listen] Furhat started listening")
-        if self.asr_mode in ("whisper", "luxasr"):
+        if self.asr_mode in EXTERNAL_ASR_MODES:
             self.mic.start_recording()
 
+    def new_utterance(self):
+        utterance = UtteranceASR()
+        if self.speculative_interval is not None:
+            utterance.speculative = SpeculativeASR(
+                self.mic, functools.partial(self.transcribe_audio, utterance=utterance),
+                interval=self.speculative_interval,
+            )
+        return utterance
+
     async def on_hear_start(self, event):
         print("[Turn] User started speaking")
+        if self.utterance:
+            # hear.end was missed; that utterance never gets a turn.
+            self.utterance.cancel()
+        self.utterance = self.new_utterance()
+        if self.language_router:
+            self.start_language_id(self.utterance)
+        if self.utterance.speculative:
+            self.utterance.speculative.start()
 
     async def on_hear_end(self, event):
         print("[Turn] User stopped speaking")
-        asyncio.create_task(self.handle_turn(event))
+        # Take the audio now: with barge-in the next listen.start may
+        # restart the recording before the turn task runs.
+        audio = self.mic.stop() if self.mic else None
+        # A missed hear.start leaves no early state: plain ASR on the audio.
+        utterance, self.utterance = self.utterance or self.new_utterance(), None
+        utterance.end_of_audio()
+        # With barge-in the turn in progress is only cancelled once this
+        # utterance turns out to contain words (see handle_turn).
+        self.turns.submit(self.handle_turn(event, audio, utterance), claim=not self.barge_in)
+        if self.barge_in:
+            await self.start_listening()
 
     async def on_speak_end(self, event):
+        if self.filler_playing:
+            # End of a thinking filler: the turn is still in progress, so do
+            # not start listening yet.
+            self.filler_playing = False
+            self.filler_done.set()
+            return
         print("[Furhat] Ready")
+        self.finish_pending_turn()
         await self.start_listening()
 
+    def finish_pending_turn(self):
+        if not self.pending_turn:
+            return
+        turn_data, timer = self.pending_turn
+        self.pending_turn = None
+        timer.end("speak")
+        turn_data["latency"] = timer.to_dict()
+        self.logger.log_turn(turn_data)
+
     # ========================
     # EMOTION HANDLING (NEW)
     # ========================
 
-    def extract_emotions(self, text):
-        user_match = re.search(r"<user_emotion\s*=\s*(Happy|Sad|Angry|Calm)>", text, re.I)
-        resp_match = re.search(r"<response_emotion\s*=\s*(Happy|Sad|Angry|Calm)>", text, re.I)
-
-
-        user_emotion = user_match.group(1) if user_match else "Calm"
-        response_emotion = resp_match.group(1) if resp_match else "Calm"
-
-        clean_text = re.sub(r"<.*?>", "", text).strip()
-
-        return user_emotion, response_emotion, clean_text
-
-
-    
     async def set_furhat_emotion(self, emotion):
 
         gesture_map = {
@@ -431,344 +787,354 @@ class SimpleFurhatClient:
     # TURN HANDLER
     # ========================
 
-    async def handle_turn(self, event):
+    async def handle_turn(self, event, audio=None, utterance=None):
         turn_id = str(uuid.uuid4())
         turn_start = datetime.utcnow().isoformat()
+        timer = TurnTimer()
+        text = None
+        cancel_tts = threading.Event()
 
         try:
-            text, wav_path = await self.get_user_text(event)
+            with timer.span("get_user_text"):
+                text, wav_path = await self.get_user_text(event, audio, utterance)
+            asr_info, route_info = utterance.asr_info, utterance.route_info
+            speculative = utterance.speculative
+            speculative_stats = dict(speculative.stats) if speculative and wav_path else None
             if not text or not text.strip():
                 print("[ASR] Empty transcription")
                 await self.start_listening()
                 return
+            if not self.turns.claim("barge_in"):
+                print("[Turn] A newer utterance was already answered, dropping:", text)
+                return
 
             print(f"User ({self.asr_mode}):", text)
-            self.dialogue_history.append({
-                "role": "user",
-                "content": text
-            })
-            await self.show_thinking()
-            reply = await self.ask_llm(text)
+            with timer.span("show_thinking"):
+                await self.show_thinking()
+            with timer.span("ask_llm"):
+                reply, llm_info, filler = await self.ask_llm_with_filler(text, timer)
+            if not reply:
+                print("[LLM] No backend produced a reply:", llm_info)
+                await self.start_listening()
+                return
 
-            user_emotion, response_emotion, spoken_text = self.extract_emotions(reply)
+            parsed = parse_response(reply)
+            # A cached reply was written for another utterance: no emotion for this one.
+            user_emotion = parsed.user_emotion if llm_info["backend"] != "cache" else None
+            response_emotion = parsed.response_emotion
+            spoken_text = parsed.text
+            lang = parsed.lang or "en"
 
             print(
-                "Assistant:", spoken_text,
+                "Assistant:", f"[{lang}]", spoken_text,
                 "| UserEmotion:", user_emotion,
                 "| ResponseEmotion:", response_emotion
             )
 
+            # The user message is only committed together with the reply;
+            # the backends add it to the prompt themselves.
+            self.dialogue_history.append({
+                "role": "user",
+                "content": text
+            })
             self.dialogue_history.append({
                 "role": "assistant",
-                "content": spoken_text
+                "content": f"{lang}: {spoken_text}"
             })
-            self.dialogue_history = self.dialogue_history[-self.MAX_TURNS:]
+            self.dialogue_history = self.dialogue_history[-self.MAX_HISTORY:]
+            self.last_lang = lang
             # =====================================================
             # LOGGING
             # =====================================================
             turn_data = {
                 "turn_id": turn_id,
                 "timestamp": turn_start,
+                "status": "completed",
                 "user": {
                     "asr_text": text,
                     "emotion": user_emotion
                 },
                 "assistant": {
                     "response_text": spoken_text,
+                    "language": lang,
                     "emotion": response_emotion
                 },
+                "llm": llm_info,
+                "filler": filler,
+                "prompt_tokens": self.prompt_stats.get(llm_info["backend"]),
                 "audio": {
                     "user_audio": wav_path
                 }
             }
+            if asr_info:
+                turn_data["asr"] = asr_info
+            if route_info:
+                turn_data["asr_routing"] = route_info
+            if self.cache_info:
+                turn_data["semantic_cache"] = self.cache_info
+            if speculative_stats:
+                turn_data["speculative_asr"] = speculative_stats
 
-            self.logger.log_turn(turn_data)
             # =====================================================
 
-            await self.set_furhat_emotion(response_emotion)
+            with timer.span("set_furhat_emotion"):
+                await self.set_furhat_emotion(response_emotion)
 
+            with timer.span("make_tts"):
+                url = await self.make_tts(spoken_text, lang, cancel_tts)
 
-            url = self.make_tts(spoken_text)
+            await self.wait_for_filler()
 
-            await self.furhat.request_speak_audio(
-                url=url,
-                abort=True
-            )
+            # The turn is logged on speak.end so playback time is included.
+            self.finish_pending_turn()
+            self.pending_turn = (turn_data, timer)
+            timer.begin("speak")
+
+            if url is None:
+                # Piper failed: Furhat's own voice is better than silence.
+                print("[TTS] Synthesis failed, using Furhat TTS")
+                turn_data["tts_fallback"] = True
+                await self.furhat.request_speak_text(
+                    text=spoken_text,
+                    abort=True
+                )
+            else:
+                await self.furhat.request_speak_audio(
+                    url=url,
+                    abort=True
+                )
+
+        except asyncio.CancelledError:
+            cancel_tts.set()
+            if self.pending_turn and self.pending_turn[0]["turn_id"] == turn_id:
+                self.pending_turn = None
+            # Only this turn's utterance: a newer one may be speculating.
+            utterance.cancel()
+            self.log_cancelled_turn(turn_id, turn_start, timer, text)
+            raise
 
         except Exception as e:
             print("[ERROR] handle_turn:", e)
             await self.start_listening()
 
+    def log_cancelled_turn(self, turn_id, turn_start, timer, text):
+        latency = timer.to_dict()
+        wasted_ms = latency["stages"]["total"]["duration_ms"]
+        print(f"[Turn] Discarded {wasted_ms:.0f} ms of work")
+
+        self.logger.log_turn({
+            "turn_id": turn_id,
+            "timestamp": turn_start,
+            "status": "cancelled",
+            "cancel_reason": self.turns.cancel_reason(),
+            "wasted_ms": wasted_ms,
+            "user": {
+                "asr_text": text
+            },
+            "latency": latency
+        })
+
     # ========================
     # ASR ROUTING
     # ========================
 
-    async def get_user_text(self, event):
+    async def get_user_text(self, event, audio, utterance):
         if self.asr_mode == "furhat":
             return self.transcribe_furhat(event)
-        if self.asr_mode == "whisper":
-            return await self.transcribe_whisper()
-        if self.asr_mode == "luxasr":
-            text, wav_path = await self.transcribe_luxasr()
-            return text, wav_path
+        if self.asr_mode in EXTERNAL_ASR_MODES:
+            return await self.transcribe_external(audio, event, utterance)
 
         return "", None
 
     def transcribe_furhat(self, event):
         return event.get("text", "").strip(), None
 
-    async def transcribe_whisper(self):
-        wav_path = os.path.join(AUDIO_DIR, f"user_{uuid.uuid4()}.wav")
-        wav_path = self.mic.stop_and_save(wav_path)
-
-        if not wav_path:
-            return "", None
-
-        async with aiohttp.ClientSession() as session:
-            with open(wav_path, "rb") as f:
-                data = aiohttp.FormData()
-                data.add_field("audio", f, filename=os.path.basename(wav_path), content_type="audio/wav")
+    def encode_upload(self, audio):
+        # FLAC is lossless at about half the size of WAV; Opus is much
+        # smaller but lossy.
+        return encode_audio(audio, SAMPLE_RATE, self.upload_format)
 
-                async with session.post(WHISPER_SERVER, data=data) as resp:
-                    if resp.status != 200:
-                        print("[Whisper] Server error:", resp.status)
-                        return "", None
-                    result = await resp.json()
-                    return result.get("text", "").strip(), wav_path
+    async def request_whisper(self, audio_bytes, filename="audio.wav", content_type="audio/wav"):
+        data = aiohttp.FormData()
+        data.add_field("audio", audio_bytes, filename=filename, content_type=content_type)
 
-    async def transcribe_luxasr(self):
-        wav_path = os.path.join(AUDIO_DIR, f"user_{uuid.uuid4()}.wav")
-        wav_path = self.mic.stop_and_save(wav_path)
-
-        if not wav_path:
-            return "", None
+        async with self.shared.http.post(WHISPER_SERVER, data=data) as resp:
+            if resp.status != 200:
+                print("[Whisper] Server error:", resp.status)
+                return None
+            result = await resp.json()
+            return result.get("text", "").strip()
 
+    async def request_luxasr(self, audio_bytes, filename="audio.wav", content_type="audio/wav"):
         url = "https://luxasr.uni.lu/v2/asr"
         params = {"diarization": "Enabled", "outfmt": "text"}
         headers = {"accept": "application/json"}
 
-        async with aiohttp.ClientSession() as session:
-            with open(wav_path, "rb") as audio_file:
-                data = aiohttp.FormData()
-                data.add_field("audio_file", audio_file, filename=os.path.basename(wav_path), content_type="audio/wav")
+        data = aiohttp.FormData()
+        data.add_field("audio_file", audio_bytes, filename=filename, content_type=content_type)
 
-                async with session.post(url, params=params, headers=headers, data=data) as resp:
-                    if resp.status != 200:
-                        print("[LuxASR] Server error:", resp.status)
-                        return "", None
+        async with self.shared.http.post(url, params=params, headers=headers, data=data) as resp:
+            if resp.status != 200:
+                print("[LuxASR] Server error:", resp.status)
+                return None
 
-                    text = await resp.text()
-                    text = re.sub(r"\[.*?\]\s*SPEAKER_\d+:\s*", "", text)
-                    return text.strip(), wav_path
+            text = await resp.text()
+            text = re.sub(r"\[.*?\]\s*SPEAKER_\d+:\s*", "", text)
+            return text.strip()
 
-    # ========================
-    # GPT
-    # ========================
-    def build_system_prompt(self):
-        base_prompt = """
-You are Furhat, a friendly, attentive, human-like conversational partner
-engaging in face-to-face spoken interaction.
-
-Your task has three steps:
-1) Infer the emotional tone of the USER’s last utterance.
-2) Decide the appropriate emotional tone for YOUR response, as a human would.
-3) Respond naturally using that response emotion.
-
-Human emotion alignment rules:  
-- If the user sounds Happy, respond in a similarly Happy and upbeat way.
-- If the user sounds Calm or Neutral, respond calmly and naturally.
-- If the user sounds Sad, respond with empathy and a calm, supportive tone.
-- If the user sounds Angry or frustrated, respond calmly and de-escalate.
-  Acknowledge feelings, avoid confrontation, and be apologetic if appropriate.
-
-Do NOT explicitly name emotions in the spoken text.
-Adapt only your wording, tone, and conversational strategy.
-
-Spoken dialogue rules:
-- Keep replies concise and easy to listen to.
-- Avoid long explanations or monologues.
-- Use natural, spoken phrasing.
-
-
-Language rules:
-- Detect the user’s language and reply in the same language.
-- Always prepend the spoken response with the ISO language code and a colon.
-
-Examples:
-lb: Moien! Wéi geet et dir?
-en: Hello! How can I help?
-fr: Bonjour ! Comment puis-je aider ?
-
-Conversation memory rules:
-- You remember the recent conversation and use it to respond naturally.
-- Maintain topic continuity unless the user clearly changes topic.
-- Use prior user information when relevant.
-- Do not repeat information unnecessarily.
-- If the context is unclear, ask a short clarification question.
-- If the user gives a brief or closing response (e.g., “okay”, “fine”, “thanks”),
-respond briefly and naturally continue or shift the topic.
-
-
-Emotion tags (MANDATORY):
-At the very end of your response, add EXACTLY TWO tags,
-in this exact order and format:
-
-<user_emotion=Happy|Sad|Angry|Calm>
-<response_emotion=Happy|Sad|Angry|Calm>
-
-Rules:
-- Choose the user_emotion based on the user’s emotional tone.
-- Choose the response_emotion based on appropriate human conversational behavior.
-- Do not explain the emotions.
-- Do not add anything after the second tag.
-- Each tag must appear exactly once.
+    async def asr_luxasr(self, audio, event=None):
+        if audio is None:
+            return None
+        return await self.request_luxasr(*self.encode_upload(audio))
 
-Context:
-The user has just finished work and is looking for a relaxed evening near the city center.
-You are a social robot offering suggestions, not personal advice.
+    async def asr_whisper(self, audio, event=None):
+        if audio is None:
+            return None
+        return await self.request_whisper(*self.encode_upload(audio))
 
-Guidelines:
-- There is no single correct answer.
-- Frame suggestions as gentle ideas, not recommendations.
-- Avoid emotional counseling or lifestyle judgment.
-- If the user asks for personal opinions, keep responses neutral and light.
+    async def asr_furhat(self, audio, event):
+        return self.transcribe_furhat(event)[0]
 
-It is acceptable if the user decides that a robot is not suitable for this task.
-Your goal is to explore the request respectfully without overstepping.
+    async def transcribe_audio(self, audio, event=None, utterance=None):
+        order = utterance.asr_route if utterance else None
+        text, info = await self.asr.transcribe(audio, event, order=order)
+        if utterance:
+            utterance.asr_info = info
+        return text
 
-You are speaking through a physical social robot.
-Your goal is to make the interaction feel natural, emotionally aligned,
-and comfortable, like a real human conversation.
-    """.strip()
+    # ========================
+    # LANGUAGE ROUTING (--auto-asr)
+    # ========================
+
+    async def detect_language(self, audio):
+        data = aiohttp.FormData()
+        audio_bytes, filename, content_type = self.encode_upload(audio)
+        data.add_field("audio", audio_bytes, filename=filename, content_type=content_type)
+
+        url = WHISPER_SERVER.rsplit("/", 1)[0] + "/detect_language"
+        async with self.shared.http.post(url, data=data) as resp:
+            if resp.status != 200:
+                print("[LID] Server error:", resp.status)
+                return None
+            result = await resp.json()
+            return result["language"], result["probability"]
+
+    def start_language_id(self, utterance):
+        audio = self.mic.snapshot()
+        utterance.lid_start = len(audio) if audio is not None else 0
+        utterance.lid_task = asyncio.create_task(self.early_language_id(utterance))
+
+    async def early_language_id(self, utterance, poll=0.05):
+        # Runs as soon as one second of speech is buffered, so the decision
+        # is usually made before hear.end (and speculative prefixes after it
+        # already go to the chosen backend).
+        router = self.language_router
+        start = utterance.lid_start
+        while utterance.recording:
+            audio = self.mic.snapshot()
+            if router.ready(audio, start):
+                result = await router.route(router.segment(audio, start))
+                utterance.asr_route = self.route_order(result[0])
+                return result
+            await asyncio.sleep(poll)
+        return None
+
+    def route_order(self, backend):
+        return [backend] + [b for b in self.asr.order if b != backend]
+
+    async def route_utterance(self, audio, utterance):
+        task, utterance.lid_task = utterance.lid_task, None
+        result = None
+        if task:
+            # A cancelled task comes back as an exception instead of
+            # cancelling this turn.
+            result = (await asyncio.gather(task, return_exceptions=True))[0]
+            if isinstance(result, BaseException):
+                result = None
+        early = result is not None
+        if not early:
+            # Utterance shorter than the window, or hear.start was missed.
+            router = self.language_router
+            result = await router.route(router.segment(audio, utterance.lid_start))
+        backend, info = result
+        utterance.route_info = {**info, "early": early}
+        utterance.asr_route = self.route_order(backend)
+        print(f"[LID] {info['language']} ({info['probability']}) -> {backend} "
+              f"in {info['lid_ms']:.0f} ms{' (early)' if early else ''}")
+
+    async def transcribe_external(self, audio, event, utterance):
+        wav_path = os.path.join(AUDIO_DIR, f"user_{uuid.uuid4()}.wav")
+
+        if audio is None:
+            utterance.cancel()
+            return "", None
 
-        task_prompt = TASK_PROMPTS.get(self.task_id)
+        sf.write(wav_path, audio, SAMPLE_RATE)
 
-        if task_prompt:
-            return base_prompt + "\n\n" + task_prompt.strip()
+        if self.language_router:
+            await self.route_utterance(audio, utterance)
 
-        return base_prompt
+        speculative = utterance.speculative
+        if speculative:
+            text = await speculative.finish(audio)
+            print("[SpecASR]", speculative.stats)
+            return text, wav_path
 
+        text = await self.transcribe_audio(audio, event, utterance)
+        if text is None:
+            return "", None
+        return text, wav_path
 
-    async def ask_gpt(self, text):
+    # ========================
+    # GPT
+    # ========================
+    def build_system_prompt(self):
+        return self.prompts.system_prompt(self.task_id)
 
-        system_prompt = self.build_system_prompt()
+    async def ask_gpt(self, text, first_token=None):
 
-        messages = [{"role": "system", "content": system_prompt}]
-        messages.extend(self.dialogue_history)
-        messages.append({"role": "user", "content": text})
+        messages, stats = self.prompts.openai_messages(
+            self.task_id, self.dialogue_history, text
+        )
+        self.prompt_stats["openai"] = stats
 
-        res = await self.openai.chat.completions.create(
+        # Streamed so the router can see the first token and hedge on it.
+        stream = await self.openai.chat.completions.create(
             model=MODEL_NAME,
-            messages = messages
-
+            messages = messages,
+            stream=True,
+            stream_options={"include_usage": True}
         )
 
-        return res.choices[0].message.content.strip()
+        parts = []
+        parser = ResponseParser()
+        async with stream:
+            async for chunk in stream:
+                if chunk.usage:
+                    details = chunk.usage.prompt_tokens_details
+                    stats["usage_prompt_tokens"] = chunk.usage.prompt_tokens
+                    stats["usage_cached_tokens"] = details.cached_tokens if details else None
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    # First speakable word, not the language prefix or a tag.
+                    if parser.feed(delta) and first_token:
+                        first_token.set()
+
+        parser.close()
+        if not parser.result().text:
+            return ""
+        return "".join(parts).strip()
 
     def build_luxllama_prompt(self, user_text):
-        # I have added this because we might need to have different prompts for openAI and luxLLama.
-        prompt = "<system>\n"
-        prompt += """
-You are Furhat, a friendly, attentive, human-like conversational partner
-engaging in face-to-face spoken interaction.
-
-Your task has three steps:
-1) Infer the emotional tone of the USER’s last utterance.
-2) Decide the appropriate emotional tone for YOUR response, as a human would.
-3) Respond naturally using that response emotion.
-
-Human emotion alignment rules:
-- If the user sounds Happy, respond in a similarly Happy and upbeat way.
-- If the user sounds Calm or Neutral, respond calmly and naturally.
-- If the user sounds Sad, respond with empathy and a calm, supportive tone.
-- If the user sounds Angry or frustrated, respond calmly and de-escalate.
-  Acknowledge feelings, avoid confrontation, and be apologetic if appropriate.
-
-Do NOT explicitly name emotions in the spoken text.
-Adapt only your wording, tone, and conversational strategy.
-
-Spoken dialogue rules:
-- Keep replies concise and easy to listen to.
-- Avoid long explanations or monologues.
-- Use natural, spoken phrasing.
-- Short replies like "Gutt", "Gutt merci", "Jo", "Nee", "Okay" ARE valid answers.
-- Do NOT say you did not understand unless the input is truly nonsense.
-- If the user gives a short answer, respond naturally and continue the topic.
-- If the user input is a short greeting or well-being question
-(e.g., “Moien”, “Wéi geet et?”, “Ça va?”),
-respond with a short, natural spoken reply (one sentence max),
-and mirror the conversational tone.
-
-
-Language rules:
-IMPORTANT:
-- You MUST respond ONLY in Luxembourgish (lb).
-- Always start your response with "lb:".
-
-Examples:
-lb: Moien! Wéi geet et dir?
-
-Conversation memory rules:
-- You remember the recent conversation and use it to respond naturally.
-- Maintain topic continuity unless the user clearly changes topic.
-- Use prior user information when relevant.
-- Do not repeat information unnecessarily.
-- If the context is unclear, ask a short clarification question.
-- If the user gives a brief or closing response (e.g., “okay”, “fine”, “thanks”),
-respond briefly and naturally continue or shift the topic.
-
-Emotion tags (MANDATORY):
-At the very end of your response, add EXACTLY TWO tags,
-in this exact order and format:
-
-<user_emotion=Happy|Sad|Angry|Calm>
-<response_emotion=Happy|Sad|Angry|Calm>
-
-Rules:
-- Choose the user_emotion based on the user’s emotional tone.
-- Choose the response_emotion based on appropriate human conversational behavior.
-- Do not explain the emotions.
-- Do not add anything after the second tag.
-- Each tag must appear exactly once.
-
-IMPORTANT GENERATION RULES:
-- Produce ONLY the assistant’s next reply.
-- Do NOT generate user messages.
-- Do NOT continue the conversation.
-- Stop immediately after the response.
-
-CRITICAL:
-You must generate exactly ONE assistant reply.
-You must NOT simulate future turns.
-You must stop immediately after the second emotion tag.
-
-IMPORTANT:
-Do NOT repeatedly ask “Wéi kann ech Iech hëllefen?”.
-Only ask this if the user explicitly asks for help or gives no topic at all.
-For greetings or small talk, respond naturally without offering help.
-
-You are speaking through a physical social robot.
-Your goal is to make the interaction feel natural, emotionally aligned,
-and comfortable, like a real human conversation.
-    """.strip()
-        prompt += "\n</system>\n\n"
-
-        for turn in self.dialogue_history:
-            if turn["role"] == "user":
-                prompt += f"<user>\n{turn['content']}\n</user>\n\n"
-            elif turn["role"] == "assistant":
-                prompt += f"<assistant>\n{turn['content']}\n</assistant>\n\n"
-
-        prompt += f"<user>\n{user_text}\n</user>\n\n"
-        prompt += (
-    "<assistant>\n"
-
-)
-
-
+        # LuxLLaMA uses its own prompt format and rules (see prompting.py).
+        prompt, stats = self.prompts.luxllama_prompt(self.dialogue_history, user_text)
+        self.prompt_stats["luxllama"] = stats
         return prompt
 
-    async def ask_luxllama(self, text):
+    async def ask_luxllama(self, text, first_token=None):
         prompt = self.build_luxllama_prompt(text)
 
         payload = {
@@ -776,84 +1142,157 @@ and comfortable, like a real human conversation.
             "max_tokens": 128
         }
 
-        async with aiohttp.ClientSession() as session:
-            async with session.post(LUXLLAMA_URL, json=payload) as resp:
-                if resp.status != 200:
-                    print("[LuxLLaMA] Error:", resp.status)
-                    return "", None
-
-                data = await resp.json()
-                full_text = data.get("text", "")
-
-            #    full_text = data.get("text", "")
-
-                # --- STEP 1: Extract emotion tags STRICTLY ---
-                user_emotion = "Calm"
-                response_emotion = "Calm"
-
-                user_match = re.search(r"<user_emotion\s*=\s*(Happy|Sad|Angry|Calm)\s*>", full_text, re.I)
-                resp_match = re.search(r"<response_emotion\s*=\s*(Happy|Sad|Angry|Calm)\s*>", full_text, re.I)
-
-                if user_match:
-                    user_emotion = user_match.group(1).capitalize()
-                if resp_match:
-                    response_emotion = resp_match.group(1).capitalize()
-
-                # --- STEP 2: Remove EVERYTHING after first emotion tag ---
-                cut = re.split(r"<user_emotion\s*=", full_text, flags=re.I)
-                text = cut[0]
-
-                # --- STEP 3: Keep only last assistant block ---
-                text = text.split("<assistant>")[-1]
-
-                # --- STEP 4: Remove trailing language prefixes ---
-                text = re.sub(r"(?:\b(lb|en|fr):\s*)+$", "", text, flags=re.I)
-
-                # --- STEP 5: Final cleanup ---
-                text = re.sub(r"[<>\s]*$", "", text)
-                text = text.strip()
-
-                # --- STEP 6: Reattach clean emotion tags ---
-                text = (
-                    f"{text} "
-                    f"<user_emotion={user_emotion}>"
-                    f"<response_emotion={response_emotion}>"
-                )
-
-                return text
+        # A cancelled request (hedging, barge-in) closes the connection, which
+        # also stops generation on the server.
+        async with self.shared.http.post(
+            LUXLLAMA_URL,
+            json=payload,
+            headers={"X-Request-Deadline": str(LUXLLAMA_DEADLINE)},
+            timeout=aiohttp.ClientTimeout(total=LUXLLAMA_DEADLINE + 1.0),
+        ) as resp:
+            if resp.status != 200:
+                print("[LuxLLaMA] Error:", resp.status)
+                return ""
+
+            data = await resp.json()
+            if first_token:
+                # No streaming on the server: the whole reply is the first token.
+                first_token.set()
+            full_text = data.get("text", "")
+
+        # LuxLLaMA is prompted to answer in Luxembourgish only.
+        parsed = parse_response(full_text)
+        if not parsed.text:
+            # Tags alone are not a reply; let the router try the next backend.
+            return ""
+        return format_response(parsed, default_lang="lb")
 
+    async def ask_llm(self, text):
+        self.cache_info = None
+        if not self.cache:
+            return await self.llm_router.ask(text)
+
+        # Language detection and embedding are CPU work; keep them off the event loop.
+        loop = asyncio.get_running_loop()
+        language = await loop.run_in_executor(None, utterance_language, text)
+        key = context_key(self.task_id, language)
+        cached, self.cache_info = await loop.run_in_executor(None, self.cache.lookup, key, text)
+        if cached:
+            print(f"[Cache] Hit ({self.cache_info['similarity']}): {self.cache_info['matched']}")
+            seconds = round(self.cache_info["lookup_ms"] / 1000, 4)
+            return cached, {
+                "primary": "cache", "backend": "cache", "hedged": False, "cancelled": [], "failed": [],
+                "first_token_s": {"cache": seconds}, "latency_s": {"cache": seconds}, "total_s": seconds,
+            }
 
+        reply, info = await self.llm_router.ask(text)
+        if reply:
+            stored = format_response(parse_response(reply), user_emotion=False)
+            # Not awaited: the turn goes on while the reply is embedded.
+            store = loop.run_in_executor(None, self.cache.store, key, text, stored)
+            store.add_done_callback(self.log_cache_store)
+        return reply, info
+
+    def log_cache_store(self, store):
+        if not store.cancelled() and store.exception():
+            print("[Cache] Could not store reply:", store.exception())
+
+    async def ask_llm_with_filler(self, text, timer):
+        llm = asyncio.ensure_future(self.ask_llm(text))
+        filler = None
+        try:
+            if self.filler_after is not None:
+                done, _ = await asyncio.wait({llm}, timeout=self.filler_after)
+                if not done:
+                    timer.begin("filler")
+                    filler = await self.speak_phrase("filler", self.last_lang)
+                    timer.end("filler")
+            reply, llm_info = await llm
+        finally:
+            llm.cancel()
+        return reply, llm_info, filler
+
+    async def speak_phrase(self, kind, lang, abort=False):
+        picked = self.shared.phrase_bank.pick(kind, lang)
+        if picked is None:
+            return None
+        phrase, name, seconds = picked
 
+        print(f"[Phrases] Playing {kind}: {phrase}")
+        if kind == "filler":
+            self.filler_playing = True
+            self.filler_done.clear()
+            self.filler_ends_at = time.monotonic() + seconds
+        try:
+            await self.furhat.request_speak_audio(url=f"{self.base_url}/audio/{name}", abort=abort)
+        except Exception as e:
+            print("[Phrases] Failed:", e)
+            self.filler_playing = False
+            return None
+        return phrase
 
-    async def ask_llm(self, text):
-        if self.llm_backend == "luxllama":
-            return await self.ask_luxllama(text)
-        return await self.ask_gpt(text)
+    async def wait_for_filler(self):
+        # Let a filler finish instead of aborting it, so its speak.end is
+        # not mistaken for the end of the reply.
+        if not self.filler_playing:
+            return
+        remaining = max(0.0, self.filler_ends_at - time.monotonic())
+        try:
+            await asyncio.wait_for(self.filler_done.wait(), timeout=remaining + 1.0)
+        except asyncio.TimeoutError:
+            self.filler_playing = False
 
     # ========================
     # TTS
     # ========================
 
-    def make_tts(self, text):
-        parts = text.split(":", 1)
-        if len(parts) == 2:
-            lang, content = parts
+    async def make_tts(self, text, lang=None, cancel=None):
+        if lang is None:
+            parsed = parse_response(text)
+            lang, content = parsed.lang or "en", parsed.text
         else:
-            lang, content = "en", text
+            content = text
 
-        voice = PIPER_VOICES.get(lang, PIPER_VOICES["en"])
+        voices = self.shared.voices
+        voice = voices.get(lang, voices["en"])
+        cancel = cancel or threading.Event()
 
         name = f"{uuid.uuid4()}.wav"
-        path = os.path.join(AUDIO_DIR, name)
-
-        with wave.open(path, "wb") as f:
-            f.setnchannels(1)
-            f.setsampwidth(2)
-            f.setframerate(voice.config.sample_rate)
-            for chunk in voice.synthesize(content):
-                f.writeframes(chunk.audio_int16_bytes)
+        clip = self.audio_store.create(name)
+        clip.append(wav_header(voice.config.sample_rate))
+        loop = asyncio.get_running_loop()
+        done = loop.create_future()
+
+        def finish(failed):
+            clip.finish(failed)
+            if not done.done():
+                done.set_result(None)
+
+        # Synthesis runs on the shared TTS workers, one sentence at a time and
+        # round-robin across robots; cancel stops it at the next sentence.
+        self.shared.tts.submit(
+            self.host,
+            synthesize_chunks(voice, content),
+            on_chunk=lambda data: loop.call_soon_threadsafe(clip.append, data),
+            on_done=lambda failed: loop.call_soon_threadsafe(finish, failed),
+            cancel=cancel,
+        )
+        try:
+            if self.stream_tts:
+                # Furhat can start fetching as soon as there is audio.
+                await clip.wait(WAV_HEADER_SIZE + 1)
+            else:
+                await done
+        except asyncio.CancelledError:
+            cancel.set()
+            self.audio_store.discard(name)
+            raise
+
+        if clip.failed:
+            self.audio_store.discard(name)
+            return None
 
-        return f"{BASE_URL}/audio/{name}"
+        return f"{self.base_url}/audio/{name}"
 
     # ========================
     # LISTEN
@@ -876,12 +1315,35 @@ and comfortable, like a real human conversation.
     # MAIN
     # ========================
 
-    async def run(self):
+    def report_startup(self):
+        # Spans overlap: voices/phrase_bank load while connecting.
+        report = {"imports_ms": round(IMPORT_SECONDS * 1000, 1), **self.startup.to_dict()}
+        if not self.owns_shared:
+            report["shared"] = self.shared.startup.to_dict()
+        print(f"[Startup] {'imports':<12} {report['imports_ms']:8.1f} ms")
+        for stage, span in report["stages"].items():
+            print(f"[Startup] {stage:<12} {span['duration_ms']:8.1f} ms (at {span['start_ms']:.1f} ms)")
+        return report
+
+    async def run(self, install_signals=True):
+
+        if install_signals:
+            self.setup_signals()
+
+        # Voices, phrases and the audio server load while connecting.
+        shared = self.shared.start()
+
+        print(f"Connecting to {self.host}...")
+        with self.startup.span("connect"):
+            await self.furhat.connect()
 
-        self.setup_signals()
+        await shared
 
-        print("Connecting...")
-        await self.furhat.connect()
+        self.logger.start_session(
+            participant_id=self.participant_id,
+            task_id=self.task_id,
+            config={**self.session_config, "startup": self.report_startup()},
+        )
 
         self.furhat.add_handler(Events.response_listen_start, self.on_listen_start)
         self.furhat.add_handler(Events.response_hear_start, self.on_hear_start)
@@ -889,13 +1351,32 @@ and comfortable, like a real human conversation.
         self.furhat.add_handler(Events.response_speak_end, self.on_speak_end)
 
         await self.furhat.request_attend_user()
-        await self.furhat.request_speak_text("Hello! How can I help you?")
+        if not await self.speak_phrase("greeting", "en"):
+            await self.furhat.request_speak_text("Hello! How can I help you?")
         await self.start_listening()
 
         while self.running:
             await asyncio.sleep(1)
 
 
+# ============================
+# MULTI-ROBOT
+# ============================
+
+async def run_robots(clients, shared):
+    """Run several robot sessions on one loop; Ctrl+C ends all of them."""
+
+    def handler(sig, frame):
+        for client in clients:
+            asyncio.create_task(client.shutdown())
+    signal.signal(signal.SIGINT, handler)
+
+    try:
+        await asyncio.gather(*(client.run(install_signals=False) for client in clients))
+    finally:
+        await shared.stop()
+
+
 # ============================
 # CLI
 # ============================
@@ -903,10 +1384,45 @@ and comfortable, like a real human conversation.
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--host", default=FURHAT_HOST)
+    parser.add_argument("--hosts", default=None,
+                        help="Comma-separated robot hosts to drive from this process")
+    parser.add_argument("--mic-devices", default=None,
+                        help="Comma-separated sounddevice inputs, one per robot in --hosts")
     parser.add_argument("--whisper", action="store_true")
     parser.add_argument("--furhat", action="store_true")
     parser.add_argument("--luxasr", action="store_true")
+    parser.add_argument("--auto-asr", action="store_true",
+                        help="Send each utterance to LuxASR (lb/de) or Whisper (en/fr) by its spoken language")
     parser.add_argument("--llm", choices=["openai", "luxllama"], default="openai")
+    parser.add_argument("--asr-fallback", default=None,
+                        help="Comma-separated ASR fallbacks (luxasr, whisper, furhat); 'none' disables failover")
+    parser.add_argument("--upload-format", choices=["wav", "flac", "opus"], default="wav",
+                        help="Encoding of the utterance uploaded to Whisper/LuxASR")
+    parser.add_argument("--asr-timeout", type=float, default=5.0,
+                        help="Seconds before an ASR request counts as failed")
+    parser.add_argument("--hedge", type=float, default=None, metavar="SECONDS",
+                        help="Also fire the other LLM backend if --llm has no first token after SECONDS")
+    parser.add_argument("--history-tokens", type=int, default=150,
+                        help="Token budget for dialogue history in the LLM prompt")
+    parser.add_argument("--barge-in", action="store_true",
+                        help="Keep listening while the reply is prepared; new speech cancels it")
+    parser.add_argument("--stream-tts", action="store_true",
+                        help="Let Furhat fetch the reply audio while it is still being synthesized")
+    parser.add_argument("--filler-after", type=float, default=None, metavar="SECONDS",
+                        help="Play a pre-rendered filler if the LLM has not answered after SECONDS")
+    parser.add_argument("--semantic-cache", action="store_true",
+                        help="Reuse the reply to a near-identical earlier question of the same task")
+    parser.add_argument("--cache-model", default=DEFAULT_CACHE_MODEL,
+                        help="sentence-transformers model for --semantic-cache "
+                             "('hash' = word n-grams, for testing only)")
+    parser.add_argument("--cache-threshold", type=float, default=None,
+                        help="Cosine similarity needed for a cache hit (default depends on --cache-model)")
+    parser.add_argument("--cache-ttl", type=float, default=1800.0,
+                        help="Seconds a cached reply stays valid")
+    parser.add_argument("--speculative-asr", action="store_true",
+                        help="Transcribe partial audio while the user is speaking (--whisper/--luxasr)")
+    parser.add_argument("--speculative-interval", type=float, default=0.8,
+                        help="Seconds of new speech between speculative ASR requests")
 
     args = parser.parse_args()
 
@@ -915,13 +1431,67 @@ def main():
         asr_mode = "whisper"
     elif args.luxasr:
         asr_mode = "luxasr"
+    elif args.auto_asr:
+        asr_mode = "auto"
 
     if not OPENAI_API_KEY:
         print("Set OPENAI_API_KEY")
         return
 
-    client = SimpleFurhatClient(args.host, asr_mode=asr_mode, llm_backend=args.llm)
-    asyncio.run(client.run())
+    asr_fallback = None
+    if args.asr_fallback:
+        asr_fallback = [] if args.asr_fallback == "none" else args.asr_fallback.split(",")
+        unknown = set(asr_fallback) - {"luxasr", "whisper", "furhat"}
+        if unknown:
+            print("Unknown ASR fallback:", ", ".join(sorted(unknown)))
+            return
+
+    semantic_cache = None
+    embedder = load_embedder(args.cache_model) if args.semantic_cache else None
+    if embedder:
+        semantic_cache = SemanticCache(embedder, threshold=args.cache_threshold, ttl=args.cache_ttl)
+        print(f"[Cache] Semantic cache ENABLED ({semantic_cache.embedder.name}, "
+              f"threshold {semantic_cache.threshold})")
+    elif args.semantic_cache:
+        print("[Cache] Semantic cache DISABLED: no embedding model")
+
+    options = dict(
+        asr_mode=asr_mode,
+        asr_fallback=asr_fallback,
+        asr_timeout=args.asr_timeout,
+        upload_format=args.upload_format,
+        llm_backend=args.llm,
+        speculative_asr=args.speculative_asr,
+        speculative_interval=args.speculative_interval,
+        hedge_deadline=args.hedge,
+        history_tokens=args.history_tokens,
+        barge_in=args.barge_in,
+        stream_tts=args.stream_tts,
+        filler_after=args.filler_after,
+    )
+
+    if not args.hosts:
+        client = SimpleFurhatClient(args.host, semantic_cache=semantic_cache, **options)
+        asyncio.run(client.run())
+        return
+
+    hosts = [h.strip() for h in args.hosts.split(",") if h.strip()]
+    devices = [None] * len(hosts)
+    if args.mic_devices:
+        devices = [int(d) if d.strip().isdigit() else d.strip() for d in args.mic_devices.split(",")]
+        if len(devices) != len(hosts):
+            print("--mic-devices needs one device per host")
+            return
+
+    async def start():
+        shared = SharedServices(semantic_cache=semantic_cache)
+        clients = [
+            SimpleFurhatClient(host, shared=shared, mic_device=device, **options)
+            for host, device in zip(hosts, devices)
+        ]
+        await run_robots(clients, shared)
+
+    asyncio.run(start())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,223 @@
+"""Simulated Furhat robot and microphone for replaying recorded sessions"""
+
+import asyncio
+import collections
+import struct
+import time
+
+import aiohttp
+from furhat_realtime_api import Events
+
+
+# Seconds per word for request_speak_text (Furhat's own TTS)
+SPEAK_TEXT_RATE = 0.35
+
+Utterance = collections.namedtuple("Utterance", ["text", "audio", "reply", "llm", "gap"])
+
+
+# ============================
+# REPLAY MICROPHONE
+# ============================
+
+class ReplayMic:
+    """
+    LocalMicRecorder stand-in: `play` makes a recording "arrive" at the
+    replay pace, so `snapshot` (speculative ASR) sees a growing prefix.
+    """
+
+    def __init__(self, samplerate=16000, speed=1.0):
+        self.samplerate = samplerate
+        self.speed = speed
+        self.audio = None
+        self.played_at = None
+        self.recording = False
+
+    def start_stream(self):
+        pass
+
+    def start_recording(self):
+        self.recording = True
+
+    def play(self, audio):
+        self.audio = audio
+        self.played_at = time.monotonic()
+
+    def snapshot(self):
+        if not self.recording or self.audio is None:
+            return None
+        if not self.speed:
+            return self.audio
+        n = int((time.monotonic() - self.played_at) * self.speed * self.samplerate)
+        return self.audio[:n] if n > 0 else None
+
+    def stop(self):
+        # hear.end comes after the whole utterance has been played.
+        audio = self.audio if self.recording else None
+        self.recording = False
+        self.audio = None
+        return audio
+
+
+# ============================
+# FAKE FURHAT
+# ============================
+
+class FakeFurhat:
+    """
+    AsyncFurhatClient stand-in that plays a user from a script of
+    utterances. Each utterance starts `gap` seconds after listening starts
+    (hear.start, its audio, hear.end with the recorded text); speak requests
+    fetch the audio URL like the robot does and emit speak.end after the
+    clip's duration. All simulated waits are divided by `speed` (0 = no waits).
+
+    `finished` is set once the last utterance has been spoken; the client
+    may still be answering it.
+    """
+
+    def __init__(self, script, speed=1.0, mic=None, name="fake"):
+        self.script = collections.deque(script)
+        self.speed = speed
+        self.mic = mic
+        self.name = name
+
+        self.handlers = collections.defaultdict(list)
+        self.session = None
+        self.current = None
+        self.user_task = None
+        self.in_speech = False
+        self.playback = None
+        self.listen_args = {}
+        self.finished = asyncio.Event()
+
+        self.requests = collections.Counter()
+        self.fetches = []   # {"url", "first_byte_s", "total_s", "bytes"}
+
+    def _sleep(self, seconds):
+        return asyncio.sleep(seconds / self.speed if self.speed else 0)
+
+    # ========================
+    # CLIENT API
+    # ========================
+
+    async def connect(self):
+        self.session = aiohttp.ClientSession()
+
+    async def disconnect(self):
+        for task in (self.user_task, self.playback):
+            if task and not task.done():
+                task.cancel()
+        if self.session:
+            await self.session.close()
+            self.session = None
+
+    def add_handler(self, event, handler):
+        self.handlers[event].append(handler)
+
+    def emit(self, event, **data):
+        for handler in self.handlers[event]:
+            asyncio.create_task(handler({"type": event, **data}))
+
+    async def request_attend_user(self, **kwargs):
+        self.requests["attend_user"] += 1
+
+    async def request_gesture_start(self, **kwargs):
+        self.requests["gesture"] += 1
+
+    async def request_listen_start(self, **kwargs):
+        self.requests["listen_start"] += 1
+        self.listen_args = kwargs
+        self.emit(Events.response_listen_start)
+        if self.user_task and not self.user_task.done():
+            return
+        if not self.script:
+            self.finished.set()
+            return
+        self.current = self.script.popleft()
+        self.user_task = asyncio.create_task(self._user_turn(self.current))
+
+    async def request_listen_stop(self, **kwargs):
+        self.requests["listen_stop"] += 1
+        self._stop_listening()
+
+    async def request_speak_text(self, text, abort=False, **kwargs):
+        self.requests["speak_text"] += 1
+        self._speak(len(text.split()) * SPEAK_TEXT_RATE, abort)
+
+    async def request_speak_audio(self, url, abort=False, **kwargs):
+        self.requests["speak_audio"] += 1
+        seconds = await self._fetch(url)
+        self._speak(seconds, abort)
+
+    # ========================
+    # SIMULATION
+    # ========================
+
+    def _stop_listening(self):
+        # Only a user who has not started talking yet can be cut off.
+        if self.user_task and not self.user_task.done() and not self.in_speech:
+            self.user_task.cancel()
+            self.script.appendleft(self.current)
+
+    async def _user_turn(self, utt):
+        await self._sleep(utt.gap)
+        self.in_speech = True
+        try:
+            self.emit(Events.response_hear_start)
+            seconds = 0.0
+            if utt.audio is not None:
+                seconds = len(utt.audio) / 16000
+                if self.mic:
+                    self.mic.play(utt.audio)
+            await self._sleep(seconds)
+            self.emit(Events.response_hear_end, text=utt.text)
+            if not self.script:
+                self.finished.set()
+        finally:
+            self.in_speech = False
+
+    def _speak(self, seconds, abort):
+        if self.listen_args.get("stop_robot_start"):
+            self._stop_listening()
+        previous = self.playback
+        if abort and previous and not previous.done():
+            previous.cancel()
+            previous = None
+        self.playback = asyncio.create_task(self._play(seconds, previous))
+
+    async def _play(self, seconds, previous):
+        if previous:
+            await asyncio.shield(previous)
+        await self._sleep(seconds)
+        self.emit(Events.response_speak_end)
+
+    async def _fetch(self, url):
+        # Download the clip like the robot would and derive its duration.
+        t0 = time.monotonic()
+        first_byte = None
+        data = bytearray()
+        try:
+            async with self.session.get(url) as resp:
+                resp.raise_for_status()
+                async for chunk in resp.content.iter_any():
+                    if first_byte is None:
+                        first_byte = time.monotonic() - t0
+                    data.extend(chunk)
+        except (aiohttp.ClientError, TypeError) as e:
+            print(f"[FakeFurhat:{self.name}] Could not fetch {url}: {e}")
+            return 0.0
+
+        self.fetches.append({
+            "url": url,
+            "first_byte_s": round(first_byte or 0.0, 4),
+            "total_s": round(time.monotonic() - t0, 4),
+            "bytes": len(data),
+        })
+        return wav_seconds(data)
+
+
+def wav_seconds(data):
+    if len(data) < 44 or data[:4] != b"RIFF":
+        return 0.0
+    channels, rate = struct.unpack("<HI", bytes(data[22:28]))
+    width = struct.unpack("<H", bytes(data[34:36]))[0] // 8
+    return (len(data) - 44) / float(rate * channels * width or 1)
@@ -0,0 +1,206 @@
+"""Append-only interaction logging (one JSON line per record)"""
+
+# python interaction_logger.py compact logs/P03_task5_<session>.jsonl
+import argparse
+import json
+import os
+import queue
+import threading
+import uuid
+from datetime import datetime
+
+from latency import summarize_turns
+
+
+_STOP = object()
+
+
+# ============================
+# INTERACTION LOGGER
+# ============================
+
+class InteractionLogger:
+    """
+    Streams the session to `<participant>_task<task>_<session>.jsonl`: a
+    `session` header line, one `turn` line per turn and an `end` line.
+    Lines are written by a background thread in batches so `log_turn` never
+    touches the disk or blocks, and a crash loses at most the last unflushed
+    batch. If the writer falls behind, records are dropped and counted.
+    The `end` line carries the p50/p95 per stage of the session.
+
+    `end_session` waits for the writer, so async callers should run it in an
+    executor. The usual session JSON is written by `compact` (the CLI below),
+    or at `end_session` with `compact_on_end=True`.
+    """
+
+    def __init__(self, base_dir="logs", batch_size=32, flush_interval=0.5,
+                 max_queue=1024, compact_on_end=False):
+        self.base_dir = base_dir
+        os.makedirs(self.base_dir, exist_ok=True)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.compact_on_end = compact_on_end
+
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.session = None
+        self.path = None
+        self.stages = []
+        self.dropped = 0
+        self.writer = None
+
+    def start_session(self, participant_id, task_id, config):
+        self.session = {
+            "session_id": str(uuid.uuid4()),
+            "participant_id": participant_id,
+            "task_id": task_id,
+            "config": config,
+            "start_time": datetime.utcnow().isoformat(),
+        }
+        self.stages = []
+        self.dropped = 0
+
+        fname = (
+            f"{self.session['participant_id']}_"
+            f"task{self.session['task_id']}_"
+            f"{self.session['session_id']}.jsonl"
+        )
+        self.path = os.path.join(self.base_dir, fname)
+
+        self.writer = threading.Thread(target=self._write_loop, args=(self.path,), daemon=True)
+        self.writer.start()
+        self._put({"type": "session", **self.session})
+
+    def log_turn(self, turn_data):
+        if self.session:
+            # Only what the end summary needs stays in memory.
+            self.stages.append({"status": turn_data.get("status"), "latency": turn_data.get("latency")})
+            self._put({"type": "turn", "turn": turn_data})
+
+    def end_session(self, completed=True, notes=None):
+        if not self.session:
+            return
+
+        # Blocking puts: the end record and the stop marker must not be dropped.
+        self.queue.put({
+            "type": "end",
+            "end_time": datetime.utcnow().isoformat(),
+            "completed": completed,
+            "notes": notes,
+            "dropped_records": self.dropped,
+            "latency": summarize_turns(self.stages),
+        })
+        self.queue.put(_STOP)
+        self.writer.join()
+        self.session = None
+
+        print(f"[LOG] Interaction streamed to {self.path}")
+        if self.compact_on_end:
+            path = compact(self.path)
+            print(f"[LOG] Interaction saved to {path}")
+
+    def _put(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            print("[LOG] Writer queue full, dropped a record")
+
+    def _write_loop(self, path):
+        with open(path, "a", encoding="utf-8") as f:
+            stop = False
+            while not stop:
+                try:
+                    batch = [self.queue.get(timeout=self.flush_interval)]
+                except queue.Empty:
+                    continue
+
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self.queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                if _STOP in batch:
+                    batch.remove(_STOP)
+                    stop = True
+
+                if batch:
+                    f.write("".join(
+                        json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n"
+                        for r in batch
+                    ))
+                    f.flush()
+
+            os.fsync(f.fileno())
+
+
+# ============================
+# COMPACTION
+# ============================
+
+def read_session(path):
+    session = {"turns": [], "end_time": None, "summary": {}}
+    end = None
+
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Torn last line after a crash
+                continue
+
+            kind = record.pop("type", None)
+            if kind == "session":
+                session.update(record)
+            elif kind == "turn":
+                session["turns"].append(record["turn"])
+            elif kind == "end":
+                end = record
+
+    cancelled = [t for t in session["turns"] if t.get("status") == "cancelled"]
+    session["summary"] = {
+        "num_turns": len(session["turns"]),
+        "cancelled_turns": len(cancelled),
+        "wasted_ms": round(sum(t.get("wasted_ms", 0) for t in cancelled), 1),
+        "completed": end["completed"] if end else False,
+        "notes": end["notes"] if end else "Session log ended without end record",
+        # The end record also counts turns whose lines were dropped.
+        "latency": (end or {}).get("latency") or summarize_turns(session["turns"]),
+    }
+    if end:
+        session["end_time"] = end["end_time"]
+        if end.get("dropped_records"):
+            session["summary"]["dropped_records"] = end["dropped_records"]
+    return session
+
+
+def compact(path, out_path=None):
+    session = read_session(path)
+    out_path = out_path or os.path.splitext(path)[0] + ".json"
+
+    keys = ["session_id", "participant_id", "task_id", "config",
+            "start_time", "end_time", "turns", "summary"]
+    ordered = {k: session[k] for k in keys if k in session}
+
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(ordered, f, indent=2, ensure_ascii=False)
+    return out_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Interaction log tools")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("compact", help="Write the session JSON for streamed .jsonl logs")
+    p.add_argument("paths", nargs="+")
+    args = parser.parse_args()
+
+    for path in args.paths:
+        print(f"[LOG] {path} -> {compact(path)}")
+
+
+if __name__ == "__main__":
+    main()
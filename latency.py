@@ -0,0 +1,177 @@
+"""Per-stage turn latency: spans, session summaries and a logs/ report"""
+
+# python latency.py logs/
+import argparse
+import glob
+import json
+import os
+import time
+
+
+STAGES = [
+    "get_user_text",
+    "show_thinking",
+    "ask_llm",
+    "set_furhat_emotion",
+    "make_tts",
+    "speak",
+    "total",
+]
+
+
+# ============================
+# TURN TIMER
+# ============================
+
+class TurnTimer:
+    """Monotonic-clock spans for one turn, relative to the start of the turn."""
+
+    def __init__(self):
+        self.t0 = time.monotonic()
+        self.spans = {}
+
+    def begin(self, stage):
+        self.spans[stage] = [time.monotonic(), None]
+
+    def end(self, stage):
+        if stage in self.spans and self.spans[stage][1] is None:
+            self.spans[stage][1] = time.monotonic()
+
+    def span(self, stage):
+        return _Span(self, stage)
+
+    def to_dict(self):
+        end = time.monotonic()
+        stages = {}
+        for stage, (t_start, t_end) in self.spans.items():
+            stages[stage] = {
+                "start_ms": round((t_start - self.t0) * 1000, 1),
+                "duration_ms": round(((t_end or end) - t_start) * 1000, 1),
+                "complete": t_end is not None,
+            }
+        stages["total"] = {
+            "start_ms": 0.0,
+            "duration_ms": round((end - self.t0) * 1000, 1),
+            "complete": True,
+        }
+        return {"clock": "monotonic", "stages": stages}
+
+
+class _Span:
+    def __init__(self, timer, stage):
+        self.timer = timer
+        self.stage = stage
+
+    def __enter__(self):
+        self.timer.begin(self.stage)
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.end(self.stage)
+        return False
+
+
+# ============================
+# SUMMARIES
+# ============================
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    k = (len(values) - 1) * q / 100
+    lo = int(k)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def summarize_turns(turns):
+    durations = {}
+    for turn in turns:
+        if turn.get("status") == "cancelled":
+            continue
+        stages = (turn.get("latency") or {}).get("stages", {})
+        for stage, span in stages.items():
+            if span.get("complete", True):
+                durations.setdefault(stage, []).append(span["duration_ms"])
+
+    order = STAGES + sorted(set(durations) - set(STAGES))
+    summary = {}
+    for stage in order:
+        values = durations.get(stage)
+        if not values:
+            continue
+        summary[stage] = {
+            "count": len(values),
+            "p50_ms": round(percentile(values, 50), 1),
+            "p95_ms": round(percentile(values, 95), 1),
+            "max_ms": round(max(values), 1),
+        }
+    return summary
+
+
+def load_turns(path):
+    with open(path, encoding="utf-8") as f:
+        if not path.endswith(".jsonl"):
+            return json.load(f).get("turns", [])
+
+        turns = []
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("type") == "turn":
+                turns.append(record["turn"])
+        return turns
+
+
+def find_logs(log_dir):
+    # Streamed sessions that were never compacted only exist as .jsonl
+    paths = sorted(glob.glob(os.path.join(log_dir, "*.json")))
+    compacted = {os.path.splitext(p)[0] for p in paths}
+    for path in sorted(glob.glob(os.path.join(log_dir, "*.jsonl"))):
+        if os.path.splitext(path)[0] not in compacted:
+            paths.append(path)
+    return paths
+
+
+def print_summary(summary):
+    print(f"{'stage':<20}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for stage, s in summary.items():
+        print(f"{stage:<20}{s['count']:>6}{s['p50_ms']:>10}{s['p95_ms']:>10}{s['max_ms']:>10}")
+
+
+# ============================
+# CLI
+# ============================
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate per-stage turn latency over interaction logs")
+    parser.add_argument("logs", nargs="?", default="logs", help="Log directory or session file")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    args = parser.parse_args()
+
+    if os.path.isdir(args.logs):
+        paths = find_logs(args.logs)
+    else:
+        paths = [args.logs]
+
+    turns = []
+    for path in paths:
+        try:
+            turns.extend(load_turns(path))
+        except (OSError, ValueError) as e:
+            print(f"[Latency] Skipping {path}: {e}")
+
+    summary = summarize_turns(turns)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+
+    print(f"[Latency] {len(turns)} turns from {len(paths)} session(s)")
+    print_summary(summary)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""Hedged routing across LLM backends"""
+
+import asyncio
+import collections
+import statistics
+import time
+
+
+# ============================
+# BACKEND STATS
+# ============================
+
+class BackendStats:
+    def __init__(self, window=20, prior_latency=2.0):
+        self.latencies = collections.deque(maxlen=window)
+        self.outcomes = collections.deque(maxlen=window)
+        # How long requests that lost a hedge had run when they were
+        # cancelled: not latencies, only lower bounds on them.
+        self.lost_after = collections.deque(maxlen=window)
+        self.prior_latency = prior_latency
+
+    def record(self, latency, ok):
+        self.latencies.append(latency)
+        self.outcomes.append(ok)
+
+    def record_lost(self, elapsed):
+        self.lost_after.append(elapsed)
+
+    def error_rate(self):
+        if not self.outcomes:
+            return 0.0
+        return 1.0 - sum(self.outcomes) / len(self.outcomes)
+
+    def expected_latency(self):
+        # Median of the rolling window, inflated by the failure rate so a
+        # backend that keeps erroring out drops behind a slower healthy one.
+        # A backend that keeps losing is at least as slow as it ran before
+        # being cancelled, so it cannot stay primary on old samples.
+        if not self.latencies:
+            median = self.prior_latency
+        else:
+            median = statistics.median(self.latencies)
+        if self.lost_after:
+            median = max(median, statistics.median(self.lost_after))
+        return median / max(1.0 - self.error_rate(), 0.05)
+
+    def snapshot(self):
+        return {
+            "samples": len(self.latencies),
+            "median_s": round(statistics.median(self.latencies), 3) if self.latencies else None,
+            "error_rate": round(self.error_rate(), 3),
+            "lost": len(self.lost_after),
+        }
+
+
+# ============================
+# ROUTER
+# ============================
+
+class LLMRouter:
+    """
+    Sends a turn to the backend with the lowest rolling latency. If it has
+    not produced its first token within `hedge_deadline` seconds (or fails),
+    the next backend is started as well; the first non-empty reply wins and
+    the other request is cancelled.
+
+    Backends are async callables `fn(text, first_token)` returning the reply
+    text and setting the `first_token` event as soon as output starts.
+    """
+
+    def __init__(self, backends, order, hedge_deadline=2.0, window=20):
+        self.backends = backends
+        self.order = list(order)
+        self.hedge_deadline = hedge_deadline
+        self.stats = {name: BackendStats(window) for name in self.order}
+
+    def ranked(self):
+        return sorted(
+            self.order,
+            key=lambda name: (self.stats[name].expected_latency(), self.order.index(name)),
+        )
+
+    async def _run(self, name, text, first_token):
+        return await self.backends[name](text, first_token)
+
+    async def ask(self, text):
+        start = time.monotonic()
+        queue = self.ranked()
+        info = {
+            "primary": queue[0],
+            "backend": None,
+            "hedged": False,
+            "cancelled": [],
+            "failed": [],
+            "first_token_s": {},
+            "latency_s": {},
+        }
+
+        running = {}   # task -> name
+        waiters = {}   # first-token waiter -> name
+        started = {}   # name -> launch time
+        hedge_at = None
+
+        def launch():
+            name = queue.pop(0)
+            first_token = asyncio.Event()
+            task = asyncio.create_task(self._run(name, text, first_token))
+            running[task] = name
+            started[name] = time.monotonic()
+            waiters[asyncio.create_task(first_token.wait())] = name
+            return name
+
+        launch()
+        if self.hedge_deadline is not None:
+            hedge_at = time.monotonic() + self.hedge_deadline
+        reply = ""
+
+        try:
+            while running:
+                # Hedge only while nothing running has produced a token yet.
+                silent = not any(n in info["first_token_s"] for n in running.values())
+                timeout = None
+                if queue and silent and hedge_at is not None:
+                    timeout = max(0.0, hedge_at - time.monotonic())
+
+                done, _ = await asyncio.wait(
+                    set(running) | set(waiters),
+                    timeout=timeout,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+
+                for waiter in [w for w in done if w in waiters]:
+                    name = waiters.pop(waiter)
+                    info["first_token_s"][name] = round(time.monotonic() - started[name], 3)
+
+                for task in [t for t in done if t in running]:
+                    name = running.pop(task)
+                    elapsed = time.monotonic() - started[name]
+                    info["latency_s"][name] = round(elapsed, 3)
+
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        print(f"[LLM] {name} failed:", e)
+                        result = ""
+
+                    ok = bool(result and result.strip())
+                    self.stats[name].record(elapsed, ok)
+                    if not ok:
+                        info["failed"].append(name)
+                    elif not info["backend"]:
+                        info["backend"] = name
+                        reply = result
+
+                if info["backend"]:
+                    break
+                if not queue:
+                    continue
+
+                deadline_passed = hedge_at is not None and time.monotonic() >= hedge_at
+                if not running or (silent and deadline_passed):
+                    name = launch()
+                    info["hedged"] = True
+                    if self.hedge_deadline is not None:
+                        hedge_at = time.monotonic() + self.hedge_deadline
+                    print(f"[LLM] Hedging with {name}")
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+            for task, name in running.items():
+                task.cancel()
+                info["cancelled"].append(name)
+                self.stats[name].record_lost(time.monotonic() - started[name])
+
+        info["total_s"] = round(time.monotonic() - start, 3)
+        info["stats"] = {name: s.snapshot() for name, s in self.stats.items()}
+        return reply, info
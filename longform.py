@@ -0,0 +1,106 @@
+"""Splitting long audio into Whisper windows and stitching the transcripts"""
+
+import re
+
+import numpy as np
+
+
+WINDOW_S = 30.0      # Whisper's input window
+SEARCH_S = 6.0       # look this far back from a window's end for a pause
+OVERLAP_S = 2.0      # overlap when no pause was found
+FRAME_S = 0.03
+SILENCE_RATIO = 0.1  # frame RMS below this fraction of the clip's median RMS is a pause
+
+
+# ============================
+# WINDOWS
+# ============================
+
+def frame_rms(audio, samplerate, frame_s=FRAME_S):
+    n = int(frame_s * samplerate)
+    frames = len(audio) // n
+    if frames == 0:
+        return np.zeros(0, dtype=np.float32), n
+    x = audio[:frames * n].reshape(frames, n)
+    return np.sqrt(np.mean(np.square(x), axis=1)), n
+
+
+def split_windows(audio, samplerate=16000, window_s=WINDOW_S, search_s=SEARCH_S,
+                  overlap_s=OVERLAP_S):
+    """
+    (start, end, overlapped) sample ranges of at most `window_s`. Each cut is
+    placed at the quietest frame in the last `search_s` of the window; if
+    that frame is not silent the next window starts `overlap_s` earlier so
+    a word cut in half is heard whole once (see `stitch`).
+    """
+    window = int(window_s * samplerate)
+    if len(audio) <= window:
+        return [(0, len(audio), False)]
+
+    rms, frame = frame_rms(audio, samplerate)
+    nonzero = rms[rms > 0]
+    threshold = (np.median(nonzero) if len(nonzero) else 0.0) * SILENCE_RATIO
+    search = int(search_s * samplerate)
+    overlap = int(overlap_s * samplerate)
+
+    windows = []
+    start, overlapped = 0, False
+    while start < len(audio):
+        end = start + window
+        if end >= len(audio):
+            windows.append((start, len(audio), overlapped))
+            break
+
+        lo, hi = (end - search) // frame, end // frame
+        quietest = lo + int(np.argmin(rms[lo:hi])) if hi > lo else hi
+        if rms[quietest] <= threshold:
+            # Cut in the middle of the pause.
+            cut = quietest * frame + frame // 2
+            windows.append((start, cut, overlapped))
+            start, overlapped = cut, False
+        else:
+            windows.append((start, end, overlapped))
+            start, overlapped = end - overlap, True
+    return windows
+
+
+# ============================
+# STITCHING
+# ============================
+
+_WORD = re.compile(r"[^\w']+")
+
+
+def _norm(word):
+    return _WORD.sub("", word.lower())
+
+
+def stitch(texts, overlapped, max_overlap_words=20, min_match=2):
+    """
+    Join window transcripts. Where a window overlaps the previous one, the
+    longest run of words that ends the previous transcript and starts this
+    one (ignoring case and punctuation) is dropped from this one.
+    """
+    words = []
+    for text, overlap in zip(texts, overlapped):
+        new = text.split()
+        if overlap and words and new:
+            tail = [_norm(w) for w in words[-max_overlap_words:]]
+            head = [_norm(w) for w in new[:max_overlap_words]]
+            # The previous window may end on a half-heard word: also try
+            # matching without its last word (and drop that word).
+            for cut in (0, 1):
+                k = _overlap(tail[:len(tail) - cut], head, min_match)
+                if k:
+                    del words[len(words) - cut:]
+                    new = new[k:]
+                    break
+        words.extend(new)
+    return " ".join(words)
+
+
+def _overlap(tail, head, min_match):
+    for k in range(min(len(tail), len(head)), min_match - 1, -1):
+        if tail[-k:] == head[:k]:
+            return k
+    return 0
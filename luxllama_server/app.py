@@ -1,10 +1,24 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Optional
+
 import torch
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, Request
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from transformers import AutoTokenizer, AutoModelForCausalLM
+from transformers import AutoTokenizer, AutoModelForCausalLM, StoppingCriteria, StoppingCriteriaList
 
 MODEL_ID = "aiplanet/LuxLlama"
 
+# Seconds allowed to a request that carries no deadline; unset = no limit,
+# as before deadlines existed.
+_default_deadline = os.environ.get("LUXLLAMA_DEFAULT_DEADLINE")
+DEFAULT_DEADLINE_S = float(_default_deadline) if _default_deadline else None
+# How often a running request checks whether its client is still connected
+DISCONNECT_POLL_S = 0.1
+
 # ----------------------------
 # Load tokenizer
 # ----------------------------
@@ -36,35 +50,142 @@ app = FastAPI(title="LuxLLaMA GPU Server")
 class GenerateRequest(BaseModel):
     prompt: str
     max_tokens: int = 256
+    # Seconds the client is willing to wait (the X-Request-Deadline header
+    # takes precedence)
+    deadline_s: Optional[float] = None
 
 class GenerateResponse(BaseModel):
     text: str
 
 
+# One generate() at a time; requests wait here in arrival order.
+gpu_lock = threading.Lock()
+
+metrics = {
+    "requests": 0,
+    "completed": 0,
+    "aborted_deadline": 0,
+    "aborted_disconnect": 0,
+    "expired_in_queue": 0,
+    "tokens_generated": 0,
+    "tokens_saved": 0,
+    "queue_wait_s": 0.0,
+    "generate_s": 0.0,
+}
+metrics_lock = threading.Lock()
+
+
+def count(**values):
+    with metrics_lock:
+        for key, value in values.items():
+            metrics[key] += value
+
+
+class AbortCriteria(StoppingCriteria):
+    """Stops generation at the next token once the deadline passes or the client is gone."""
+
+    def __init__(self, deadline, disconnected):
+        self.deadline = deadline
+        self.disconnected = disconnected
+        self.reason = None
+
+    def __call__(self, input_ids, scores, **kwargs):
+        if self.disconnected.is_set():
+            self.reason = "disconnect"
+        elif time.monotonic() >= self.deadline:
+            self.reason = "deadline"
+        return torch.full((input_ids.shape[0],), self.reason is not None,
+                          dtype=torch.bool, device=input_ids.device)
+
+
+def run_generate(req, deadline, disconnected):
+    queued = time.monotonic()
+    with gpu_lock:
+        count(queue_wait_s=time.monotonic() - queued)
+        # Gave up (or left) while waiting for the GPU: do not start at all.
+        if disconnected.is_set() or time.monotonic() >= deadline:
+            count(expired_in_queue=1, tokens_saved=req.max_tokens)
+            return None, "disconnect" if disconnected.is_set() else "deadline"
+
+        # Tokenize
+        inputs = tokenizer(req.prompt.strip(), return_tensors="pt")
+
+        # 🔑 MOVE INPUTS TO GPU
+        inputs = {k: v.to(model.device) for k, v in inputs.items()}
+
+        abort = AbortCriteria(deadline, disconnected)
+        started = time.monotonic()
+        with torch.no_grad():
+            outputs = model.generate(
+                **inputs,
+                max_new_tokens=req.max_tokens,
+                do_sample=True,
+                temperature=0.7,
+                top_p=0.9,
+                eos_token_id=tokenizer.eos_token_id,
+                stopping_criteria=StoppingCriteriaList([abort]),
+            )
+
+        # 🔑 Decode ONLY new tokens
+        generated_ids = outputs[0][inputs["input_ids"].shape[-1]:]
+        text = tokenizer.decode(generated_ids, skip_special_tokens=True).strip()
+        generated = len(generated_ids)
+
+        # Drop the sequence and its KV cache before the next request runs.
+        del outputs, inputs
+        if abort.reason:
+            torch.cuda.empty_cache()
+
+    count(generate_s=time.monotonic() - started, tokens_generated=generated)
+    if abort.reason:
+        count(**{f"aborted_{abort.reason}": 1, "tokens_saved": max(req.max_tokens - generated, 0)})
+    else:
+        count(completed=1)
+    return text, abort.reason
+
+
+async def watch_disconnect(request, disconnected):
+    while not disconnected.is_set():
+        if await request.is_disconnected():
+            disconnected.set()
+            return
+        await asyncio.sleep(DISCONNECT_POLL_S)
+
+
 @app.post("/generate")
-def generate(req: GenerateRequest):
-    prompt = req.prompt.strip()
-    if not prompt:
+async def generate(req: GenerateRequest, request: Request,
+                   x_request_deadline: Optional[float] = Header(None)):
+    if not req.prompt.strip():
         return {"text": ""}
+    count(requests=1)
 
-    # Tokenize
-    inputs = tokenizer(prompt, return_tensors="pt")
+    budget = x_request_deadline if x_request_deadline is not None else req.deadline_s
+    if budget is None:
+        budget = DEFAULT_DEADLINE_S
+    deadline = time.monotonic() + budget if budget is not None else float("inf")
 
-    # 🔑 MOVE INPUTS TO GPU
-    inputs = {k: v.to(model.device) for k, v in inputs.items()}
-
-    with torch.no_grad():
-        outputs = model.generate(
-            **inputs,
-            max_new_tokens=req.max_tokens,
-            do_sample=True,
-            temperature=0.7,
-            top_p=0.9,
-            eos_token_id=tokenizer.eos_token_id,
+    disconnected = threading.Event()
+    watcher = asyncio.create_task(watch_disconnect(request, disconnected))
+    try:
+        text, reason = await asyncio.get_running_loop().run_in_executor(
+            None, run_generate, req, deadline, disconnected
         )
+    finally:
+        # Also covers the handler itself being cancelled.
+        disconnected.set()
+        watcher.cancel()
+
+    if reason == "deadline":
+        # The client has given up by now; a truncated reply is of no use.
+        return JSONResponse({"error": "deadline exceeded"}, status_code=504)
+    return {"text": text or ""}
 
-    # 🔑 Decode ONLY new tokens
-    generated_ids = outputs[0][inputs["input_ids"].shape[-1]:]
-    text = tokenizer.decode(generated_ids, skip_special_tokens=True).strip()
 
-    return {"text": text}
\ No newline at end of file
+@app.get("/metrics")
+def get_metrics():
+    with metrics_lock:
+        snapshot = dict(metrics)
+    snapshot["queue_wait_s"] = round(snapshot["queue_wait_s"], 3)
+    snapshot["generate_s"] = round(snapshot["generate_s"], 3)
+    snapshot["gpu_busy"] = gpu_lock.locked()
+    return snapshot
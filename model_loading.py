@@ -0,0 +1,191 @@
+"""
+Model weight loading that lets processes share pages.
+
+In `mmap` mode the Whisper safetensors and Piper ONNX weights are read through
+read-only (copy-on-write) file mappings instead of being copied into each
+process, so every worker on a machine uses the same page-cache pages:
+
+* Whisper: the model is built on the meta device and its parameters are
+  assigned tensors that view the mapped safetensors files (CPU only; on a GPU
+  the weights are copied to device memory either way). Half-precision
+  checkpoints are converted once to a float32 copy in `.mmap/`, which is
+  what gets mapped: CPU inference runs in float32, like from_pretrained.
+* Piper: the ONNX model is converted once to external-data format (in a
+  `.mmap/` directory next to it); onnxruntime maps external initializers on
+  CPU instead of reading them into its own buffers.
+
+`copy` is the ordinary from_pretrained / PiperVoice.load path.
+"""
+
+import glob
+import json
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+
+LOADING_MODES = ("copy", "mmap")
+
+_SAFETENSORS_DTYPES = {
+    "F64": "float64", "F32": "float32", "F16": "float16", "BF16": "bfloat16",
+    "I64": "int64", "I32": "int32", "I16": "int16", "I8": "int8", "U8": "uint8", "BOOL": "bool",
+}
+
+
+# ============================
+# SAFETENSORS
+# ============================
+
+def _safetensors_header(path):
+    with open(path, "rb") as f:
+        header_size = struct.unpack("<Q", f.read(8))[0]
+        return header_size, json.loads(f.read(header_size))
+
+
+def _cache_key(path):
+    st = os.stat(path)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return f"{stem}-{st.st_size}-{int(st.st_mtime)}"
+
+
+def mmap_safetensors(path):
+    """name -> CPU tensor viewing a private read-only mapping of `path` (no copy)."""
+    import torch
+
+    header_size, header = _safetensors_header(path)
+    with open(path, "rb") as f:
+        # ACCESS_COPY: pages come from the page cache and stay shared unless
+        # something writes to them (inference never does).
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    base = 8 + header_size
+    tensors = {}
+    for name, info in header.items():
+        if name == "__metadata__":
+            continue
+        dtype = getattr(torch, _SAFETENSORS_DTYPES[info["dtype"]])
+        start, end = info["data_offsets"]
+        count = (end - start) // dtype.itemsize
+        if count:
+            tensor = torch.frombuffer(mapped, dtype=dtype, count=count, offset=base + start)
+        else:
+            tensor = torch.empty(0, dtype=dtype)
+        tensors[name] = tensor.reshape(info["shape"])
+    return tensors
+
+
+def float32_safetensors(path, cache_dir=None):
+    """`path`, or a float32 copy of it (converted once) if it holds half-precision tensors."""
+    _, header = _safetensors_header(path)
+    half = any(info["dtype"] in ("F16", "BF16") for name, info in header.items() if name != "__metadata__")
+    if not half:
+        return path
+
+    cache_dir = cache_dir or os.path.join(os.path.dirname(path), ".mmap")
+    out = os.path.join(cache_dir, _cache_key(path) + ".safetensors")
+    if os.path.exists(out):
+        return out
+
+    import torch
+    from safetensors.torch import save_file
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tensors = {
+        name: t.to(torch.float32, copy=True) if t.is_floating_point() else t.clone()
+        for name, t in mmap_safetensors(path).items()
+    }
+    # Written next to the target and moved into place, as for the ONNX models.
+    fd, scratch = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    os.close(fd)
+    try:
+        save_file(tensors, scratch, metadata=header.get("__metadata__"))
+        os.replace(scratch, out)
+    finally:
+        if os.path.exists(scratch):
+            os.remove(scratch)
+    return out
+
+
+def load_whisper(model_dir, device, mode="copy"):
+    """(processor, model) for a local Whisper checkpoint."""
+    from transformers import WhisperProcessor, WhisperForConditionalGeneration
+
+    processor = WhisperProcessor.from_pretrained(model_dir)
+    if mode == "mmap" and device.type == "cpu":
+        try:
+            return processor, _mmap_whisper(model_dir)
+        except Exception as e:
+            print(f"[Models] Cannot map {model_dir} ({e}), loading a private copy")
+    model = WhisperForConditionalGeneration.from_pretrained(model_dir).to(device)
+    return processor, model
+
+
+def _mmap_whisper(model_dir):
+    import torch
+    from transformers import GenerationConfig, WhisperConfig, WhisperForConditionalGeneration
+
+    files = sorted(glob.glob(os.path.join(model_dir, "*.safetensors")))
+    if not files:
+        raise FileNotFoundError("no .safetensors files")
+    state = {}
+    for path in files:
+        state.update(mmap_safetensors(float32_safetensors(path)))
+
+    with torch.device("meta"):
+        model = WhisperForConditionalGeneration(WhisperConfig.from_pretrained(model_dir))
+    # assign=True keeps the mapped tensors instead of copying into new ones.
+    model.load_state_dict(state, strict=False, assign=True)
+    model.tie_weights()
+
+    unset = [name for name, t in list(model.named_parameters()) + list(model.named_buffers()) if t.is_meta]
+    if unset:
+        raise RuntimeError(f"{len(unset)} tensors missing from the checkpoint, e.g. {unset[0]}")
+
+    try:
+        model.generation_config = GenerationConfig.from_pretrained(model_dir)
+    except OSError:
+        pass
+    return model.eval()
+
+
+# ============================
+# ONNX (PIPER)
+# ============================
+
+def external_data_model(path, cache_dir=None):
+    """Copy of an ONNX model with its weights in a separate file (converted once)."""
+    cache_dir = cache_dir or os.path.join(os.path.dirname(path), ".mmap")
+    key = _cache_key(path)
+    out = os.path.join(cache_dir, key + ".onnx")
+    if os.path.exists(out):
+        return out
+
+    import onnx
+
+    os.makedirs(cache_dir, exist_ok=True)
+    # Written to a scratch directory and moved into place, so workers that
+    # start together never load a half-written model.
+    scratch = tempfile.mkdtemp(dir=cache_dir)
+    try:
+        onnx.save_model(
+            onnx.load(path), os.path.join(scratch, key + ".onnx"),
+            save_as_external_data=True, all_tensors_to_one_file=True,
+            location=key + ".onnx.data", size_threshold=1024,
+        )
+        os.replace(os.path.join(scratch, key + ".onnx.data"), out + ".data")
+        os.replace(os.path.join(scratch, key + ".onnx"), out)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    return out
+
+
+def load_piper_voice(path, mode="copy"):
+    from piper.voice import PiperVoice
+
+    if mode == "mmap":
+        try:
+            return PiperVoice.load(external_data_model(path), config_path=f"{path}.json")
+        except Exception as e:
+            print(f"[Models] Cannot map {path} ({e}), loading a private copy")
+    return PiperVoice.load(path)
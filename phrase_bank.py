@@ -0,0 +1,111 @@
+"""Pre-rendered TTS audio for greetings, back-channels and thinking fillers"""
+
+import hashlib
+import io
+import itertools
+import os
+import wave
+
+from piper_synthesis import synthesize_chunks
+
+
+# ============================
+# PHRASES
+# ============================
+
+PHRASES = {
+    "greeting": {
+        "en": ["Hello! How can I help you?"],
+        "lb": ["Moien! Wéi kann ech Iech hëllefen?"],
+    },
+    "filler": {
+        "en": ["Hmm, let me think.", "One moment, please.", "Let me see."],
+        "lb": ["Hmm, ee Moment.", "Looss mech iwwerleeën.", "Ee Moment w.e.g."],
+    },
+    "backchannel": {
+        "en": ["Okay.", "I see.", "Mhm."],
+        "lb": ["Jo.", "Aha.", "Ok."],
+    },
+}
+
+
+# ============================
+# PHRASE BANK
+# ============================
+
+class PhraseBank:
+    """
+    Renders every configured phrase once per Piper voice and keeps the WAV
+    bytes in a pinned AudioStore clip. Renders are persisted in `cache_dir`,
+    keyed by voice model file and text, so later sessions start without
+    synthesizing anything.
+    """
+
+    def __init__(self, voices, voice_paths, cache_dir="tts_cache", phrases=PHRASES):
+        self.voices = voices
+        self.voice_paths = voice_paths
+        self.cache_dir = cache_dir
+        self.phrases = phrases
+        self.rendered = {}   # (kind, lang) -> [(text, name, wav_bytes, seconds)]
+        self.cycles = {}
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _key(self, lang, text):
+        path = self.voice_paths.get(lang, "")
+        try:
+            st = os.stat(path)
+            stamp = f"{st.st_size}:{int(st.st_mtime)}"
+        except OSError:
+            stamp = ""
+        return hashlib.sha1(f"{path}|{stamp}|{text}".encode("utf-8")).hexdigest()[:16]
+
+    def _render(self, voice, text):
+        buf = io.BytesIO()
+        with wave.open(buf, "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(voice.config.sample_rate)
+            for data in synthesize_chunks(voice, text):
+                f.writeframes(data)
+        return buf.getvalue()
+
+    def build(self):
+        """Load or synthesize all phrases (blocking; run in an executor)."""
+        synthesized = cached = 0
+        for kind, by_lang in self.phrases.items():
+            for lang, texts in by_lang.items():
+                voice = self.voices.get(lang)
+                if voice is None:
+                    continue
+                entries = []
+                for text in texts:
+                    key = self._key(lang, text)
+                    path = os.path.join(self.cache_dir, f"{key}.wav")
+                    if os.path.exists(path):
+                        with open(path, "rb") as f:
+                            data = f.read()
+                        cached += 1
+                    else:
+                        data = self._render(voice, text)
+                        with open(path, "wb") as f:
+                            f.write(data)
+                        synthesized += 1
+                    seconds = (len(data) - 44) / (2 * voice.config.sample_rate)
+                    entries.append((text, f"phrase_{kind}_{lang}_{key}.wav", data, seconds))
+                self.rendered[(kind, lang)] = entries
+                self.cycles[(kind, lang)] = itertools.cycle(entries)
+
+        print(f"[Phrases] {cached} cached, {synthesized} synthesized")
+
+    def load_into(self, store):
+        for entries in self.rendered.values():
+            for _, name, data, _ in entries:
+                store.put(name, data, pinned=True)
+
+    def pick(self, kind, lang):
+        """Next (text, clip name, seconds) for `kind` in `lang`, rotating through variants."""
+        cycle = self.cycles.get((kind, lang)) or self.cycles.get((kind, "en"))
+        if cycle is None:
+            return None
+        text, name, _, seconds = next(cycle)
+        return text, name, seconds
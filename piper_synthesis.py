@@ -0,0 +1,44 @@
+"""Piper synthesis that is safe to run from several threads"""
+
+import threading
+
+import numpy as np
+
+
+# espeak-ng keeps global state (the current voice), so phonemization is
+# serialized across every thread in the process; the ONNX inference after it
+# runs in parallel.
+PHONEMIZE_LOCK = threading.Lock()
+
+
+def synthesize_chunks(voice, text, lock=PHONEMIZE_LOCK):
+    """
+    int16 bytes per sentence, the same audio as `voice.synthesize(text)`
+    (including Piper's peak normalization) but with only the phonemize step
+    under `lock`. Lazy, like Piper: nothing runs until the first chunk is
+    requested.
+    """
+    if not (hasattr(voice, "phonemize") and hasattr(voice, "phoneme_ids_to_audio")):
+        # Not a PiperVoice (stand-ins in benchmarks): the whole call is locked.
+        with lock:
+            chunks = [chunk.audio_int16_bytes for chunk in voice.synthesize(text)]
+        yield from chunks
+        return
+
+    with lock:
+        sentences = voice.phonemize(text)
+    for phonemes in sentences:
+        audio = np.asarray(voice.phoneme_ids_to_audio(voice.phonemes_to_ids(phonemes)), dtype=np.float32)
+        yield float_to_int16(normalize(audio)).tobytes()
+
+
+def normalize(audio):
+    """Piper's default: scale to a peak of 1.0 (silence stays silent)."""
+    peak = float(np.max(np.abs(audio))) if len(audio) else 0.0
+    if peak < 1e-8:
+        return np.zeros_like(audio)
+    return audio / peak
+
+
+def float_to_int16(audio):
+    return (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
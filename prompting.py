@@ -0,0 +1,330 @@
+"""Prompt assembly: compiled system prompts and token-budgeted history"""
+
+import functools
+
+
+# ============================
+# BASE PROMPTS
+# ============================
+
+OPENAI_BASE_PROMPT = """
+You are Furhat, a friendly, attentive, human-like conversational partner
+engaging in face-to-face spoken interaction.
+
+Your task has three steps:
+1) Infer the emotional tone of the USER’s last utterance.
+2) Decide the appropriate emotional tone for YOUR response, as a human would.
+3) Respond naturally using that response emotion.
+
+Human emotion alignment rules:  
+- If the user sounds Happy, respond in a similarly Happy and upbeat way.
+- If the user sounds Calm or Neutral, respond calmly and naturally.
+- If the user sounds Sad, respond with empathy and a calm, supportive tone.
+- If the user sounds Angry or frustrated, respond calmly and de-escalate.
+  Acknowledge feelings, avoid confrontation, and be apologetic if appropriate.
+
+Do NOT explicitly name emotions in the spoken text.
+Adapt only your wording, tone, and conversational strategy.
+
+Spoken dialogue rules:
+- Keep replies concise and easy to listen to.
+- Avoid long explanations or monologues.
+- Use natural, spoken phrasing.
+
+
+Language rules:
+- Detect the user’s language and reply in the same language.
+- Always prepend the spoken response with the ISO language code and a colon.
+
+Examples:
+lb: Moien! Wéi geet et dir?
+en: Hello! How can I help?
+fr: Bonjour ! Comment puis-je aider ?
+
+Conversation memory rules:
+- You remember the recent conversation and use it to respond naturally.
+- Maintain topic continuity unless the user clearly changes topic.
+- Use prior user information when relevant.
+- Do not repeat information unnecessarily.
+- If the context is unclear, ask a short clarification question.
+- If the user gives a brief or closing response (e.g., “okay”, “fine”, “thanks”),
+respond briefly and naturally continue or shift the topic.
+
+
+Emotion tags (MANDATORY):
+At the very end of your response, add EXACTLY TWO tags,
+in this exact order and format:
+
+<user_emotion=Happy|Sad|Angry|Calm>
+<response_emotion=Happy|Sad|Angry|Calm>
+
+Rules:
+- Choose the user_emotion based on the user’s emotional tone.
+- Choose the response_emotion based on appropriate human conversational behavior.
+- Do not explain the emotions.
+- Do not add anything after the second tag.
+- Each tag must appear exactly once.
+
+Context:
+The user has just finished work and is looking for a relaxed evening near the city center.
+You are a social robot offering suggestions, not personal advice.
+
+Guidelines:
+- There is no single correct answer.
+- Frame suggestions as gentle ideas, not recommendations.
+- Avoid emotional counseling or lifestyle judgment.
+- If the user asks for personal opinions, keep responses neutral and light.
+
+It is acceptable if the user decides that a robot is not suitable for this task.
+Your goal is to explore the request respectfully without overstepping.
+
+You are speaking through a physical social robot.
+Your goal is to make the interaction feel natural, emotionally aligned,
+and comfortable, like a real human conversation.
+    """.strip()
+
+# Kept separate because LuxLLaMA needs stricter generation rules and is
+# forced to answer in Luxembourgish.
+LUXLLAMA_BASE_PROMPT = """
+You are Furhat, a friendly, attentive, human-like conversational partner
+engaging in face-to-face spoken interaction.
+
+Your task has three steps:
+1) Infer the emotional tone of the USER’s last utterance.
+2) Decide the appropriate emotional tone for YOUR response, as a human would.
+3) Respond naturally using that response emotion.
+
+Human emotion alignment rules:
+- If the user sounds Happy, respond in a similarly Happy and upbeat way.
+- If the user sounds Calm or Neutral, respond calmly and naturally.
+- If the user sounds Sad, respond with empathy and a calm, supportive tone.
+- If the user sounds Angry or frustrated, respond calmly and de-escalate.
+  Acknowledge feelings, avoid confrontation, and be apologetic if appropriate.
+
+Do NOT explicitly name emotions in the spoken text.
+Adapt only your wording, tone, and conversational strategy.
+
+Spoken dialogue rules:
+- Keep replies concise and easy to listen to.
+- Avoid long explanations or monologues.
+- Use natural, spoken phrasing.
+- Short replies like "Gutt", "Gutt merci", "Jo", "Nee", "Okay" ARE valid answers.
+- Do NOT say you did not understand unless the input is truly nonsense.
+- If the user gives a short answer, respond naturally and continue the topic.
+- If the user input is a short greeting or well-being question
+(e.g., “Moien”, “Wéi geet et?”, “Ça va?”),
+respond with a short, natural spoken reply (one sentence max),
+and mirror the conversational tone.
+
+
+Language rules:
+IMPORTANT:
+- You MUST respond ONLY in Luxembourgish (lb).
+- Always start your response with "lb:".
+
+Examples:
+lb: Moien! Wéi geet et dir?
+
+Conversation memory rules:
+- You remember the recent conversation and use it to respond naturally.
+- Maintain topic continuity unless the user clearly changes topic.
+- Use prior user information when relevant.
+- Do not repeat information unnecessarily.
+- If the context is unclear, ask a short clarification question.
+- If the user gives a brief or closing response (e.g., “okay”, “fine”, “thanks”),
+respond briefly and naturally continue or shift the topic.
+
+Emotion tags (MANDATORY):
+At the very end of your response, add EXACTLY TWO tags,
+in this exact order and format:
+
+<user_emotion=Happy|Sad|Angry|Calm>
+<response_emotion=Happy|Sad|Angry|Calm>
+
+Rules:
+- Choose the user_emotion based on the user’s emotional tone.
+- Choose the response_emotion based on appropriate human conversational behavior.
+- Do not explain the emotions.
+- Do not add anything after the second tag.
+- Each tag must appear exactly once.
+
+IMPORTANT GENERATION RULES:
+- Produce ONLY the assistant’s next reply.
+- Do NOT generate user messages.
+- Do NOT continue the conversation.
+- Stop immediately after the response.
+
+CRITICAL:
+You must generate exactly ONE assistant reply.
+You must NOT simulate future turns.
+You must stop immediately after the second emotion tag.
+
+IMPORTANT:
+Do NOT repeatedly ask “Wéi kann ech Iech hëllefen?”.
+Only ask this if the user explicitly asks for help or gives no topic at all.
+For greetings or small talk, respond naturally without offering help.
+
+You are speaking through a physical social robot.
+Your goal is to make the interaction feel natural, emotionally aligned,
+and comfortable, like a real human conversation.
+    """.strip()
+
+
+# ============================
+# TOKEN COUNTING
+# ============================
+
+class TokenCounter:
+    """
+    Counts tokens with the backend's real tokenizer when it is installed
+    (tiktoken for OpenAI, the Hugging Face tokenizer for LuxLLaMA) and falls
+    back to a ~4 characters per token estimate otherwise.
+    """
+
+    def __init__(self, encode=None, name="estimate"):
+        self.encode = encode
+        self.name = name
+        self.count = functools.lru_cache(maxsize=4096)(self._count)
+
+    def _count(self, text):
+        if not text:
+            return 0
+        if self.encode is None:
+            return max(1, len(text) // 4)
+        return len(self.encode(text))
+
+    @classmethod
+    def for_openai(cls, model):
+        try:
+            import tiktoken
+        except ImportError:
+            print("[Prompt] tiktoken not installed, estimating OpenAI tokens")
+            return cls()
+
+        try:
+            try:
+                enc = tiktoken.encoding_for_model(model)
+            except KeyError:
+                enc = tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            # The encoding files are downloaded on first use.
+            print(f"[Prompt] No tiktoken encoding for {model} ({e}), estimating OpenAI tokens")
+            return cls()
+        return cls(enc.encode, f"tiktoken:{enc.name}")
+
+    @classmethod
+    def for_hf(cls, model_id):
+        # Only a tokenizer already in the local Hugging Face cache: no
+        # download at start-up, and no repository code is executed.
+        try:
+            from transformers import AutoTokenizer
+            tok = AutoTokenizer.from_pretrained(model_id, local_files_only=True)
+        except Exception as e:
+            print(f"[Prompt] No cached tokenizer for {model_id} ({e}), estimating tokens")
+            return cls()
+        return cls(lambda text: tok.encode(text, add_special_tokens=False), f"hf:{model_id}")
+
+
+# ============================
+# HISTORY
+# ============================
+
+# Role/framing tokens added per chat message by the OpenAI chat format.
+MESSAGE_OVERHEAD = 4
+
+
+def trim_history(history, budget, count, overhead=MESSAGE_OVERHEAD):
+    """
+    Newest messages that fit in `budget` tokens, oldest dropped first.
+    Consecutive duplicates (same role and content) are sent once. Only the
+    messages that end up in the window are counted.
+    """
+    kept = []
+    used = 0
+    newer = None
+    for turn in reversed(history):
+        if newer and turn["role"] == newer["role"] and turn["content"] == newer["content"]:
+            continue
+        newer = turn
+        cost = count(turn["content"]) + overhead
+        if used + cost > budget:
+            break
+        kept.append(turn)
+        used += cost
+    kept.reverse()
+
+    # Never start the window on an orphaned assistant reply.
+    while kept and kept[0]["role"] != "user":
+        used -= count(kept[0]["content"]) + overhead
+        kept.pop(0)
+    return kept, used
+
+
+# ============================
+# ASSEMBLY
+# ============================
+
+class PromptAssembler:
+    """
+    Builds the per-turn LLM input. System prompts are compiled once per task
+    id and always come first, followed by the trimmed history and the new
+    user message, so consecutive turns share the longest possible prefix
+    (which is what provider-side prompt caching keys on).
+    """
+
+    def __init__(self, task_prompts, history_budget=150, openai_counter=None,
+                 luxllama_counter=None):
+        self.task_prompts = task_prompts
+        self.history_budget = history_budget
+        self.openai_counter = openai_counter or TokenCounter()
+        self.luxllama_counter = luxllama_counter or TokenCounter()
+        self.system_prompt = functools.lru_cache(maxsize=None)(self._system_prompt)
+
+    def _system_prompt(self, task_id):
+        task_prompt = self.task_prompts.get(task_id)
+        if task_prompt:
+            return OPENAI_BASE_PROMPT + "\n\n" + task_prompt.strip()
+        return OPENAI_BASE_PROMPT
+
+    @functools.cached_property
+    def luxllama_header(self):
+        return "<system>\n" + LUXLLAMA_BASE_PROMPT + "\n</system>\n\n"
+
+    def _stats(self, counter, system, history, kept, sent, user_text):
+        # Token counts are cached per message, so this is a lookup per turn.
+        untrimmed = sum(counter.count(t["content"]) for t in history) + MESSAGE_OVERHEAD * len(history)
+        system_tokens = counter.count(system)
+        user_tokens = counter.count(user_text) + MESSAGE_OVERHEAD
+        return {
+            "tokenizer": counter.name,
+            "history_messages": len(history),
+            "history_messages_sent": len(kept),
+            "input_tokens_before": system_tokens + untrimmed + user_tokens,
+            "input_tokens_after": system_tokens + sent + user_tokens,
+        }
+
+    def openai_messages(self, task_id, history, user_text):
+        system = self.system_prompt(task_id)
+        counter = self.openai_counter
+        kept, sent = trim_history(history, self.history_budget, counter.count)
+
+        messages = [{"role": "system", "content": system}]
+        messages.extend(kept)
+        messages.append({"role": "user", "content": user_text})
+        return messages, self._stats(counter, system, history, kept, sent, user_text)
+
+    def luxllama_prompt(self, history, user_text):
+        counter = self.luxllama_counter
+        kept, sent = trim_history(history, self.history_budget, counter.count)
+
+        parts = [self.luxllama_header]
+        for turn in kept:
+            if turn["role"] == "user":
+                parts.append(f"<user>\n{turn['content']}\n</user>\n\n")
+            elif turn["role"] == "assistant":
+                parts.append(f"<assistant>\n{turn['content']}\n</assistant>\n\n")
+        parts.append(f"<user>\n{user_text}\n</user>\n\n")
+        parts.append("<assistant>\n")
+
+        stats = self._stats(counter, self.luxllama_header, history, kept, sent, user_text)
+        return "".join(parts), stats
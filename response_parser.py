@@ -0,0 +1,328 @@
+"""Incremental parser for LLM replies (language prefix, emotion tags, speakable text)"""
+
+import collections
+import functools
+import re
+
+
+EMOTIONS = ("Happy", "Sad", "Angry", "Calm")
+DEFAULT_EMOTION = "Calm"
+
+# Tags that mean the model has started simulating the next turn.
+STOP_TAGS = ("user", "/user", "assistant", "/assistant", "system", "/system")
+
+# Language prefixes the parser accepts; also dropped when the model repeats
+# them inside or after the reply.
+LANG_CODES = ("lb", "en", "fr", "de")
+
+MAX_TAG_LEN = 64
+
+_TAG_STOP = re.compile(r"[>\n<]")
+# A complete `xx:` prefix at the start of a delta (the common case).
+_PREFIX = re.compile(r"\s*([^\W\d_]{2})\s*:")
+# A complete tag, consumed in one step instead of character by character.
+_TAG = re.compile(r"<([^<>\n]{0,%d})>" % MAX_TAG_LEN)
+
+ParsedResponse = collections.namedtuple(
+    "ParsedResponse", ["lang", "text", "user_emotion", "response_emotion"]
+)
+
+
+def format_response(parsed, default_lang=None, user_emotion=True):
+    """
+    Canonical `lang: text <user_emotion=..><response_emotion=..>` form.
+    `user_emotion=False` leaves out the tag that describes the utterance
+    rather than the reply.
+    """
+    lang = parsed.lang or default_lang
+    text = f"{lang}: {parsed.text}" if lang else parsed.text
+    tag = f"<user_emotion={parsed.user_emotion}>" if user_emotion else ""
+    return f"{text} {tag}<response_emotion={parsed.response_emotion}>"
+
+
+def parse_response(text):
+    parser = ResponseParser()
+    parser.feed(text)
+    parser.close()
+    return parser.result()
+
+
+@functools.lru_cache(maxsize=256)
+def _tag(body):
+    """(lowercase name, emotion value or None) of a tag body."""
+    name, _, value = body.partition("=")
+    name = name.strip().lower()
+    if name not in ("user_emotion", "response_emotion"):
+        return name, None
+    value = value.strip().capitalize()
+    return name, value if value in EMOTIONS else DEFAULT_EMOTION
+
+
+# ============================
+# PARSER
+# ============================
+
+class ResponseParser:
+    """
+    State machine fed with text deltas (a streamed reply or a whole one).
+
+    * PREFIX: leading `xx:` (or `XX:`) for a code in `codes`; reported through
+      `lang` (and `on_lang`) as soon as it is recognised, otherwise the text
+      is kept ("So: this is it" is text).
+    * TEXT: speakable text, returned from `feed` word by word. Stray
+      language codes (`lb:` in the middle or at the end) are dropped and
+      whitespace is collapsed to single spaces.
+    * TAG: `<...>`; emotion tags are recorded, other tags are removed. A `<`
+      without `>` on the same line is kept as text.
+    * DONE: after `<user_emotion=...>` or a simulated turn (`<user>`,
+      `</assistant>`, ...) no more text is emitted, only emotion tags are
+      still picked up.
+
+    The first occurrence of each emotion tag wins; unknown values fall back
+    to Calm.
+    """
+
+    PREFIX, TEXT, TAG, DONE = range(4)
+
+    def __init__(self, on_lang=None, codes=LANG_CODES):
+        self.on_lang = on_lang
+        self.codes = frozenset(codes)
+        self.state = self.PREFIX
+        self.lang = None
+        self.user_emotion = None
+        self.response_emotion = None
+
+        self.prefix = []
+        self.tag = []
+        self.word = []
+        self.pending_space = False
+        self.out = []
+        self.closed = False
+        self.resume = self.PREFIX
+
+    # ------------------------
+    # Public API
+    # ------------------------
+
+    def feed(self, delta):
+        start = len(self.out)
+        i, n = 0, len(delta)
+
+        if self.state == self.PREFIX and not self.prefix:
+            m = _PREFIX.match(delta)
+            if m and self._is_code(m.group(1)):
+                self.prefix = [m.group(0)]
+                self._resolve_prefix(True)
+                i = m.end()
+
+        # Runs of plain text, whole tags and tag bodies are consumed in bulk;
+        # the per-character path handles partial prefixes, tags split across
+        # deltas and state transitions.
+        TEXT, DONE, TAG = self.TEXT, self.DONE, self.TAG
+        while i < n:
+            state = self.state
+            if state == TEXT or state == DONE:
+                j = delta.find("<", i)
+                if j < 0:
+                    j = n
+                if j > i and state == TEXT:
+                    self._text_run(delta[i:j])
+                i = j
+                if i == n:
+                    break
+                m = _TAG.match(delta, i)
+                if m:
+                    self.resume = state
+                    self._end_tag(m.group(1))
+                    i = m.end()
+                    continue
+            elif state == TAG:
+                m = _TAG_STOP.search(delta, i)
+                j = m.start() if m else n
+                if len(self.tag) + (j - i) < MAX_TAG_LEN:
+                    self.tag.extend(delta[i:j])
+                    i = j
+                    if i == n:
+                        break
+            self._step(delta[i])
+            i += 1
+        return "".join(self.out[start:])
+
+    def close(self):
+        if self.closed:
+            return ""
+        self.closed = True
+        start = len(self.out)
+
+        if self.state == self.TAG:
+            # Unterminated tag: literal text, like a `<` without `>`.
+            self._unwind_tag()
+        if self.state == self.PREFIX:
+            self._resolve_prefix(False)
+        self._flush_word()
+        return "".join(self.out[start:])
+
+    @property
+    def text(self):
+        return "".join(self.out)
+
+    def result(self):
+        return ParsedResponse(
+            self.lang,
+            self.text.strip(),
+            self.user_emotion or DEFAULT_EMOTION,
+            self.response_emotion or DEFAULT_EMOTION,
+        )
+
+    # ------------------------
+    # States
+    # ------------------------
+
+    def _step(self, ch):
+        if self.state == self.TAG:
+            self._step_tag(ch)
+        elif ch == "<":
+            self.resume = self.state
+            self.state = self.TAG
+            self.tag = []
+        elif self.state == self.PREFIX:
+            self._step_prefix(ch)
+        elif self.state == self.TEXT:
+            self._step_text(ch)
+
+    def _step_prefix(self, ch):
+        self.prefix.append(ch)
+        head = "".join(self.prefix).lstrip()
+        if not head:
+            self.prefix = []
+            return
+
+        if head.endswith(":") and self._is_code(head[:-1].rstrip()):
+            self._resolve_prefix(True)
+            return
+
+        # Still a possible "x", "xx" or "xx " waiting for its colon?
+        letters = head.rstrip()
+        if self._is_code(letters) or (head == letters and self._starts_code(letters)):
+            return
+        self._resolve_prefix(False)
+
+    def _is_code(self, letters):
+        # "lb" and "LB", but not "Lb" (a capitalised word)
+        return (letters.islower() or letters.isupper()) and letters.lower() in self.codes
+
+    def _starts_code(self, letters):
+        return len(letters) == 1 and any(code.startswith(letters.lower()) for code in self.codes)
+
+    def _resolve_prefix(self, matched):
+        head = "".join(self.prefix).lstrip()
+        self.prefix = []
+        self.state = self.TEXT
+
+        if matched:
+            self.lang = head[:-1].strip().lower()
+            if self.on_lang:
+                self.on_lang(self.lang)
+            return
+
+        if head:
+            self._text_run(head)
+
+    def _text_run(self, run):
+        words = run.split()
+        if not words:
+            self._step_text(" ")
+            return
+        if run[0].isspace():
+            self._step_text(" ")
+        # The last word may continue in the next delta.
+        tail = None if run[-1].isspace() else words.pop()
+
+        if words:
+            if self.word:
+                self.word.append(words[0])
+                words[0] = "".join(self.word)
+                self.word = []
+            # Same as _flush_word + _step_text(" ") per word, in one append.
+            codes = self.codes
+            words = [w for w in words if w[-1] != ":" or w[:-1].lower() not in codes]
+            if words:
+                text = " ".join(words)
+                self.out.append(" " + text if self.pending_space else text)
+            self.pending_space = bool(self.out)
+
+        if tail is not None:
+            self.word.append(tail)
+
+    def _step_text(self, ch):
+        if ch.isspace():
+            self._flush_word()
+            if self.out:
+                self.pending_space = True
+            return
+        self.word.append(ch)
+
+    def _flush_word(self):
+        if not self.word:
+            return
+        word = "".join(self.word)
+        self.word = []
+
+        if self._is_stray_code(word):
+            return
+
+        if self.pending_space:
+            self.out.append(" ")
+            self.pending_space = False
+        self.out.append(word)
+
+    def _is_stray_code(self, word):
+        return word[-1] == ":" and word[:-1].lower() in self.codes
+
+    def _step_tag(self, ch):
+        if ch == ">":
+            self._end_tag("".join(self.tag))
+            return
+        if ch == "\n" or ch == "<" or len(self.tag) >= MAX_TAG_LEN:
+            self._unwind_tag()
+            self._step(ch)
+            return
+        self.tag.append(ch)
+
+    def _unwind_tag(self):
+        literal = "<" + "".join(self.tag)
+        self.state = self.resume
+        self.tag = []
+
+        if self.state == self.DONE:
+            return
+        if self.state == self.PREFIX:
+            self._resolve_prefix(False)
+        self._text_run(literal)
+
+    def _end_tag(self, body):
+        self.state = self.resume
+        self.tag = []
+
+        name, value = _tag(body)
+        if value:
+            if name == "user_emotion" and self.user_emotion is None:
+                self.user_emotion = value
+            elif name == "response_emotion" and self.response_emotion is None:
+                self.response_emotion = value
+            if name == "user_emotion":
+                self._finish_text()
+            return
+
+        if name in STOP_TAGS:
+            # A leading <assistant> is the model echoing the prompt framing.
+            if name == "assistant" and not self.out and not self.word:
+                return
+            self._finish_text()
+
+    def _finish_text(self):
+        if self.state == self.PREFIX:
+            self._resolve_prefix(False)
+        if self.state != self.DONE:
+            self._flush_word()
+            self.state = self.DONE
@@ -0,0 +1,227 @@
+"""Semantic cache of LLM replies for recurring user questions, per dialogue context"""
+
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+
+
+# ============================
+# EMBEDDERS
+# ============================
+
+class HashingEmbedder:
+    """
+    Dependency-free stand-in for tests and benchmarks: character n-grams of
+    each word hashed into a fixed-size vector. It scores word overlap, not
+    meaning ("What can I do tonight?" vs "What can I eat tonight?" is above
+    the threshold), so the client only uses it when asked to explicitly.
+    """
+
+    name = "hash"
+    # Cosine similarity above which two questions count as the same
+    threshold = 0.9
+
+    def __init__(self, dim=1024, n=3):
+        self.dim = dim
+        self.n = n
+
+    def _grams(self, text):
+        for word in re.findall(r"\w+", text.lower()):
+            word = f"<{word}>"
+            if len(word) <= self.n:
+                yield word
+                continue
+            for i in range(len(word) - self.n + 1):
+                yield word[i:i + self.n]
+
+    def embed(self, text):
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for gram in self._grams(text):
+            vec[zlib.crc32(gram.encode("utf-8")) % self.dim] += 1.0
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+
+class SentenceEmbedder:
+    """Small multilingual sentence-transformers model on CPU."""
+
+    threshold = 0.92
+
+    def __init__(self, model_name="sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"):
+        from sentence_transformers import SentenceTransformer
+        self.name = model_name
+        self.model = SentenceTransformer(model_name, device="cpu")
+
+    def embed(self, text):
+        return self.model.encode(text, normalize_embeddings=True).astype(np.float32)
+
+
+DEFAULT_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+
+
+def load_embedder(name=DEFAULT_MODEL):
+    """A sentence-transformers model name, or `hash`; None if the model cannot be loaded."""
+    if name == "hash":
+        return HashingEmbedder()
+    try:
+        return SentenceEmbedder(name)
+    except Exception as e:
+        print(f"[Cache] Cannot load {name}: {e}")
+        return None
+
+
+def utterance_language(text):
+    """Language code guessed from the text alone (langdetect), or `unknown`."""
+    from langdetect import DetectorFactory, LangDetectException, detect
+
+    DetectorFactory.seed = 0   # deterministic guesses
+    try:
+        return detect(text)
+    except LangDetectException:
+        return "unknown"
+
+
+def context_key(task_id, language):
+    """
+    Cache partition for an utterance: replies are only reused for the same
+    task and in the same language. The dialogue so far is not part of the
+    key (it would almost never repeat); the threshold and `min_words` keep
+    out short follow-ups that only make sense in their conversation.
+    """
+    return (task_id, language)
+
+
+# ============================
+# CACHE
+# ============================
+
+class _Index:
+    def __init__(self, dim):
+        self.vectors = np.zeros((0, dim), dtype=np.float32)
+        self.entries = []   # [query, reply, created, last_used, hits]
+
+    def remove(self, keep):
+        self.vectors = self.vectors[keep]
+        self.entries = [e for e, k in zip(self.entries, keep) if k]
+
+
+class SemanticCache:
+    """
+    Replies keyed by the embedding of the user utterance, with one index per
+    context key (see `context_key`). A lookup is a hit when the most similar
+    stored question in the same context reaches the threshold. Entries
+    expire after `ttl` seconds; beyond `max_entries` per context the least
+    recently used one is dropped.
+
+    Utterances shorter than `min_words` ("yes", "and on Sunday?") are
+    neither looked up nor stored.
+    """
+
+    def __init__(self, embedder, threshold=None, ttl=1800.0, max_entries=256, min_words=3):
+        self.embedder = embedder
+        self.threshold = embedder.threshold if threshold is None else threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.min_words = min_words
+        self.indexes = {}
+        self.last_sweep = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Lookups run in executors, possibly for several robots at once.
+        self.lock = threading.Lock()
+
+    def cacheable(self, text):
+        return len(text.split()) >= self.min_words
+
+    def _index(self, key, dim):
+        if key not in self.indexes:
+            self.indexes[key] = _Index(dim)
+        return self.indexes[key]
+
+    def _sweep(self, now):
+        # Drop contexts (a task no longer run, a misdetected language) once
+        # their entries have expired.
+        if now - self.last_sweep < self.ttl / 4:
+            return
+        self.last_sweep = now
+        for key, index in list(self.indexes.items()):
+            self._expire(index, now)
+            if not index.entries:
+                del self.indexes[key]
+
+    def _expire(self, index, now):
+        if not index.entries:
+            return
+        keep = [now - e[2] < self.ttl for e in index.entries]
+        if not all(keep):
+            self.evictions += keep.count(False)
+            index.remove(keep)
+
+    def lookup(self, key, text):
+        """(reply or None, info) for the turn log."""
+        t0 = time.perf_counter()
+        info = {"hit": False, "similarity": None, "matched": None}
+        if not self.cacheable(text):
+            info["skipped"] = True
+            return None, info
+
+        vec = self.embedder.embed(text)
+        reply = None
+        with self.lock:
+            now = time.monotonic()
+            index = self.indexes.get(key)
+            if index is not None:
+                self._expire(index, now)
+            if index is not None and index.entries:
+                scores = index.vectors @ vec
+                best = int(np.argmax(scores))
+                info["similarity"] = round(float(scores[best]), 3)
+                if scores[best] >= self.threshold:
+                    entry = index.entries[best]
+                    entry[3] = now
+                    entry[4] += 1
+                    reply = entry[1]
+                    info["hit"] = True
+                    info["matched"] = entry[0]
+            if reply is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        info["lookup_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+        info.update(self.stats())
+        return reply, info
+
+    def store(self, key, text, reply):
+        if not reply or not self.cacheable(text):
+            return
+        vec = self.embedder.embed(text)
+        with self.lock:
+            now = time.monotonic()
+            self._sweep(now)
+            index = self._index(key, len(vec))
+            # A near-duplicate already answers this question.
+            if index.entries and float(np.max(index.vectors @ vec)) >= self.threshold:
+                return
+            if len(index.entries) >= self.max_entries:
+                lru = min(range(len(index.entries)), key=lambda i: index.entries[i][3])
+                index.remove([i != lru for i in range(len(index.entries))])
+                self.evictions += 1
+            index.vectors = np.vstack([index.vectors, vec[None, :]])
+            index.entries.append([text, reply, now, now, 0])
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "embedder": self.embedder.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "contexts": len(self.indexes),
+            "entries": sum(len(i.entries) for i in self.indexes.values()),
+            "evictions": self.evictions,
+        }
@@ -1,29 +1,35 @@
 """Local Whisper + Piper Flask Server"""
 
-from transformers import WhisperProcessor, WhisperForConditionalGeneration
 import torchaudio
 import numpy as np
-import threading
-import tempfile
+import io
 import torch
 import os
 import wave
 import traceback
-from flask import Flask, request, jsonify, send_file, send_from_directory
+from flask import Flask, Response, request, jsonify, send_file, send_from_directory, stream_with_context
 from flask_cors import CORS
 from huggingface_hub import login
-from piper.voice import PiperVoice
 from langdetect import detect, DetectorFactory
 import uuid
 import warnings
 import socket
+from concurrent.futures import ThreadPoolExecutor
+from response_parser import parse_response
+from audio_codec import decode_audio, wav_header
+from longform import WINDOW_S, split_windows, stitch
+from model_loading import load_piper_voice, load_whisper
+from piper_synthesis import float_to_int16, synthesize_chunks
 # -------------------------------------------------------------
 # Configuration
 # -------------------------------------------------------------
 DetectorFactory.seed = 0
 HF_TOKEN = "<HF TOKEN>"  # Replace with your own
-login(HF_TOKEN)
 local_ip = socket.gethostbyname(socket.gethostname())
+PORT = int(os.getenv("PORT", "9000"))
+
+UPLOAD_FOLDER = "static/audio"
+os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
 # Automatically pick GPU (NVIDIA CUDA / AMD DirectML) or CPU
 if torch.cuda.is_available():
@@ -38,22 +44,56 @@ print(f"✅ Using device: {device}")
 # -------------------------------------------------------------
 # Load Models
 # -------------------------------------------------------------
-print("🔄 Loading Whisper model...")
-whisper_processor = WhisperProcessor.from_pretrained("models/whisper")
-whisper_model = WhisperForConditionalGeneration.from_pretrained("models/whisper").to(device)
-
-print("🔄 Loading Piper voices...")
-PIPER_VOICES = {
-    "en": PiperVoice.load("models/piper/en_US_lessac/en_US-lessac-medium.onnx"),
-    "lb": PiperVoice.load("models/piper/lb_LU/lb_LU-marylux-medium.onnx")
-}
-print("✅ Models loaded successfully.")
+# SPEECH_SERVER_MODELS=none imports this module without loading anything
+# (benchmarks install stand-ins with use_models()).
+MODEL_MODE = os.getenv("SPEECH_SERVER_MODELS", "load")
+# copy: private weights per process; mmap: weights shared between server
+# processes through read-only file mappings (see model_loading.py)
+MODEL_LOADING = os.getenv("MODEL_LOADING", "copy")
+
+whisper_processor = None
+whisper_model = None
+PIPER_VOICES = {}
+# Mixed-language replies are stitched at the highest voice sample rate
+OUTPUT_RATE = None
+
+
+def use_models(processor, model, voices):
+    global whisper_processor, whisper_model, OUTPUT_RATE
+    whisper_processor, whisper_model = processor, model
+    PIPER_VOICES.clear()
+    PIPER_VOICES.update(voices)
+    OUTPUT_RATE = max(v.config.sample_rate for v in PIPER_VOICES.values())
+
+
+def load_models():
+    login(HF_TOKEN)
+    print(f"🔄 Loading Whisper model ({MODEL_LOADING})...")
+    processor, model = load_whisper("models/whisper", device, MODEL_LOADING)
+
+    print(f"🔄 Loading Piper voices ({MODEL_LOADING})...")
+    voices = {
+        "en": load_piper_voice("models/piper/en_US_lessac/en_US-lessac-medium.onnx", MODEL_LOADING),
+        "lb": load_piper_voice("models/piper/lb_LU/lb_LU-marylux-medium.onnx", MODEL_LOADING)
+    }
+    use_models(processor, model, voices)
+    print("✅ Models loaded successfully.")
+
+
+if MODEL_MODE != "none":
+    load_models()
+
+VOICE_WORKERS = 4
+# Segments are phonemized one at a time (piper_synthesis.PHONEMIZE_LOCK);
+# the ONNX inference after it runs in parallel.
+voice_pool = ThreadPoolExecutor(max_workers=VOICE_WORKERS, thread_name_prefix="voice")
 
 # -------------------------------------------------------------
 # Helper Functions
 # -------------------------------------------------------------
-def load_audio_whisper(audio_path, target_sr=16000):
-    waveform, sample_rate = torchaudio.load(audio_path)
+def load_audio_whisper(source, target_sr=16000):
+    # source: path or file-like object
+    waveform, sample_rate = torchaudio.load(source)
     if waveform.shape[0] > 1:
         waveform = waveform.mean(dim=0)
     if sample_rate != target_sr:
@@ -61,17 +101,87 @@ def load_audio_whisper(audio_path, target_sr=16000):
     return waveform.squeeze().numpy().astype(np.float32)
 
 
-def transcribe_whisper(audio_path):
-    audio_np = load_audio_whisper(audio_path)
+def decode_upload(data, target_sr=16000):
+    """Uploaded WAV/FLAC/Ogg-Opus bytes -> mono float32 at target_sr, without temp files."""
+    try:
+        audio, sample_rate = decode_audio(data)
+    except RuntimeError:
+        # Formats libsndfile cannot read (e.g. MP3 on old builds)
+        return load_audio_whisper(io.BytesIO(data), target_sr)
+    if sample_rate != target_sr:
+        audio = torchaudio.functional.resample(
+            torch.from_numpy(audio), orig_freq=sample_rate, new_freq=target_sr
+        ).numpy()
+    return audio.astype(np.float32)
+
+
+# Windows per generate() call in long-form mode
+LONGFORM_BATCH_SIZE = 8
+# A full 30 s window can need more than the 128 tokens used for short turns
+# (Whisper's decoder allows 448 positions including the prompt).
+LONGFORM_MAX_NEW_TOKENS = 440
+
+
+def transcribe_whisper(audio, batch_size=LONGFORM_BATCH_SIZE):
+    # audio: path or mono float32 samples at 16 kHz
+    audio_np = load_audio_whisper(audio) if isinstance(audio, str) else audio
+    if len(audio_np) > WINDOW_S * 16000:
+        return transcribe_long(audio_np, batch_size)
+
     inputs = whisper_processor(audio_np, sampling_rate=16000, return_tensors="pt")
-    inputs = {k: v.to(device) for k, v in inputs.items()}
+    features = inputs.input_features.to(device, dtype=whisper_model.dtype)
     with torch.no_grad():
         generated_ids = whisper_model.generate(
-            **inputs, num_beams=1, do_sample=False, max_new_tokens=128, return_timestamps=False
+            input_features=features, num_beams=1, do_sample=False, max_new_tokens=128, return_timestamps=False
         )
     return whisper_processor.decode(generated_ids[0], skip_special_tokens=True)
 
 
+_language_tokens = None
+
+
+def detect_language(audio_np, top_k=5):
+    """Whisper's language-ID head: {language: probability} for the top_k languages."""
+    global _language_tokens
+    if _language_tokens is None:
+        from transformers.models.whisper.tokenization_whisper import LANGUAGES
+        tokenizer = whisper_processor.tokenizer
+        ids = {code: tokenizer.convert_tokens_to_ids(f"<|{code}|>") for code in LANGUAGES}
+        # Older checkpoints lack the newest language tokens.
+        _language_tokens = {code: i for code, i in ids.items() if i != tokenizer.unk_token_id}
+
+    inputs = whisper_processor(audio_np, sampling_rate=16000, return_tensors="pt")
+    features = inputs.input_features.to(device, dtype=whisper_model.dtype)
+    start = torch.tensor([[whisper_model.generation_config.decoder_start_token_id]], device=device)
+    # One decoder step after <|startoftranscript|>: the next token is the language.
+    with torch.no_grad():
+        logits = whisper_model(input_features=features, decoder_input_ids=start).logits[0, -1]
+
+    codes = list(_language_tokens)
+    probs = torch.softmax(logits[list(_language_tokens.values())].float(), dim=-1)
+    top = torch.topk(probs, min(top_k, len(codes)))
+    return {codes[i]: round(float(p), 4) for p, i in zip(top.values.tolist(), top.indices.tolist())}
+
+
+def transcribe_long(audio_np, batch_size=LONGFORM_BATCH_SIZE):
+    """Audio longer than one window: split at pauses, batch the windows, stitch."""
+    windows = split_windows(audio_np, 16000)
+    texts = []
+    for i in range(0, len(windows), batch_size):
+        batch = [audio_np[start:end] for start, end, _ in windows[i:i + batch_size]]
+        inputs = whisper_processor(batch, sampling_rate=16000, return_tensors="pt")
+        features = inputs.input_features.to(device, dtype=whisper_model.dtype)
+        with torch.no_grad():
+            generated_ids = whisper_model.generate(
+                input_features=features, num_beams=1, do_sample=False,
+                max_new_tokens=LONGFORM_MAX_NEW_TOKENS, return_timestamps=False,
+            )
+        texts += [t.strip() for t in whisper_processor.batch_decode(generated_ids, skip_special_tokens=True)]
+
+    print(f"🧩 Long-form: {len(audio_np) / 16000:.1f}s in {len(windows)} windows")
+    return stitch(texts, [overlapped for _, _, overlapped in windows])
+
+
 def split_by_language(text):
     import re
     segments = re.split(r'(?<=[.!?])\s+', text)
@@ -88,16 +198,55 @@ def split_by_language(text):
     return lang_blocks
 
 
+def synthesize_to_file(text):
+    """Speak `text` (optionally prefixed with `lb:`/`en:`) into UPLOAD_FOLDER; returns the file name."""
+    parsed = parse_response(text)
+    lang_code, clean_text = parsed.lang or "en", parsed.text
+    voice = PIPER_VOICES.get(lang_code, PIPER_VOICES["en"])
+
+    filename = f"{uuid.uuid4()}.wav"
+    file_path = os.path.join(UPLOAD_FOLDER, filename)
+    with wave.open(file_path, "wb") as out_wav:
+        out_wav.setnchannels(1)
+        out_wav.setsampwidth(2)
+        out_wav.setframerate(voice.config.sample_rate)
+        # Called from several threads by the ASGI server; only one
+        # phonemizes at a time.
+        for data in synthesize_chunks(voice, clean_text):
+            out_wav.writeframes(data)
+    return filename
+
+
+def synthesize_segment(voice, text, out_rate=None):
+    """Synthesize one segment and resample it to `out_rate` (int16 bytes)."""
+    out_rate = out_rate or OUTPUT_RATE
+    # Normalized like /tts, so both endpoints speak at the same loudness.
+    data = b"".join(synthesize_chunks(voice, text))
+
+    rate = voice.config.sample_rate
+    if rate == out_rate or not data:
+        return data
+    audio = np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32767.0
+    audio = torchaudio.functional.resample(torch.from_numpy(audio), rate, out_rate).numpy()
+    return float_to_int16(audio).tobytes()
+
+
+def submit_multilang(text, voices_dict, out_rate=None):
+    """Start synthesizing every language segment; futures are in text order."""
+    return [
+        voice_pool.submit(synthesize_segment, voices_dict.get(lang, voices_dict["en"]), segment, out_rate)
+        for lang, segment in split_by_language(text)
+    ]
+
+
 def speak_multilang(text, voices_dict, output_path="final_output.wav"):
-    segments = split_by_language(text)
+    futures = submit_multilang(text, voices_dict)
     with wave.open(output_path, "wb") as out_wav:
         out_wav.setnchannels(1)
         out_wav.setsampwidth(2)
-        out_wav.setframerate(voices_dict["en"].config.sample_rate)
-        for lang, segment in segments:
-            voice = voices_dict.get(lang, voices_dict["en"])
-            for chunk in voice.synthesize(segment):
-                out_wav.writeframes(chunk.audio_int16_bytes)
+        out_wav.setframerate(OUTPUT_RATE)
+        for future in futures:
+            out_wav.writeframes(future.result())
     return output_path
 
 
@@ -107,9 +256,6 @@ def speak_multilang(text, voices_dict, output_path="final_output.wav"):
 app = Flask(__name__)
 CORS(app)
 
-UPLOAD_FOLDER = "static/audio"
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-
 
 @app.route("/")
 def index():
@@ -124,20 +270,35 @@ def transcribe():
     if "audio" not in request.files:
         return jsonify({"error": "No audio file uploaded"}), 400
     file = request.files["audio"]
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
-        file.save(tmp.name)
-        audio_path = tmp.name
+    # batch_size=1 decodes long-form windows one by one (for benchmarks)
+    batch_size = request.form.get("batch_size", LONGFORM_BATCH_SIZE, type=int)
 
     try:
-        text = transcribe_whisper(audio_path)
+        audio_np = decode_upload(file.read())
+        text = transcribe_whisper(audio_np, batch_size=max(batch_size, 1))
         print(f"📝 Transcribed: {text}")
         return jsonify({"text": text})
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
-    finally:
-        if os.path.exists(audio_path):
-            os.remove(audio_path)
+
+
+# -------------------------------------------------------------
+# Language Identification Endpoint
+# -------------------------------------------------------------
+@app.route("/detect_language", methods=["POST"])
+def detect_language_endpoint():
+    if "audio" not in request.files:
+        return jsonify({"error": "No audio file uploaded"}), 400
+
+    try:
+        probabilities = detect_language(decode_upload(request.files["audio"].read()))
+        language = max(probabilities, key=probabilities.get)
+        return jsonify({"language": language, "probability": probabilities[language],
+                        "probabilities": probabilities})
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
 
 
 # -------------------------------------------------------------
@@ -154,27 +315,10 @@ def tts():
         if not text:
             return jsonify({"error": "Missing 'text' in request"}), 400
 
-        # Determine language code
-        parts = text.split(":", 1)
-        if len(parts) == 2:
-            lang_code, clean_text = parts[0].strip(), parts[1].strip()
-        else:
-            lang_code, clean_text = "en", text
-
-        voice = PIPER_VOICES.get(lang_code, PIPER_VOICES["en"])
-
-        filename = f"{uuid.uuid4()}.wav"
-        file_path = os.path.join(UPLOAD_FOLDER, filename)
-
-        with wave.open(file_path, "wb") as out_wav:
-            out_wav.setnchannels(1)
-            out_wav.setsampwidth(2)
-            out_wav.setframerate(voice.config.sample_rate)
-            for chunk in voice.synthesize(clean_text):
-                out_wav.writeframes(chunk.audio_int16_bytes)
+        filename = synthesize_to_file(text)
 
         # public_url = f"http://127.0.0.1:9000/{UPLOAD_FOLDER}/{filename}"
-        public_url = f"http://{local_ip}:9000/{UPLOAD_FOLDER}/{filename}"
+        public_url = f"http://{local_ip}:{PORT}/{UPLOAD_FOLDER}/{filename}"
         return jsonify({"url": public_url})
         # return send_file(file_path, mimetype="audio/wav", as_attachment=False)
     except Exception as e:
@@ -182,6 +326,37 @@ def tts():
         return jsonify({"error": str(e)}), 500
 
 
+# -------------------------------------------------------------
+# Mixed-Language Text-to-Speech Endpoint
+# -------------------------------------------------------------
+@app.route("/tts_multilang", methods=["GET", "POST"])
+def tts_multilang():
+    # GET ?text=... lets a robot fetch the audio URL directly
+    if request.method == "GET":
+        text = request.args.get("text", "")
+    else:
+        data = request.get_json(force=True, silent=True) or {}
+        text = data.get("text", "")
+    text = parse_response(text.strip()).text
+    if not text:
+        return jsonify({"error": "Missing 'text' in request"}), 400
+
+    futures = submit_multilang(text, PIPER_VOICES)
+
+    def generate():
+        try:
+            yield wav_header(OUTPUT_RATE)
+            # Each segment goes out once it and every earlier one are done.
+            for future in futures:
+                yield future.result()
+        finally:
+            # Client went away: drop the segments that have not started.
+            for future in futures:
+                future.cancel()
+
+    return Response(stream_with_context(generate()), mimetype="audio/wav")
+
+
 @app.route("/static/audio/<filename>")
 def serve_audio(filename):
     return send_from_directory(UPLOAD_FOLDER, filename)
@@ -193,4 +368,4 @@ def serve_audio(filename):
 if __name__ == "__main__":
     warnings.filterwarnings("ignore")
     # print("🚀 Starting Flask server on http://127.0.0.1:9000 ...")
-    app.run(host="0.0.0.0", port=9000, debug=False, use_reloader=False)
+    app.run(host="0.0.0.0", port=PORT, debug=False, use_reloader=False)
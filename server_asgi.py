@@ -0,0 +1,153 @@
+"""
+ASGI (FastAPI) version of the Whisper + Piper speech server.
+
+Same endpoints as server.py, but inference runs on dedicated executors so the
+event loop keeps answering health checks and static audio while a long
+transcription is in progress.
+
+    uvicorn server_asgi:app --host 0.0.0.0 --port 9000
+"""
+
+import asyncio
+import traceback
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import FastAPI, File, Form, Request, UploadFile
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.staticfiles import StaticFiles
+
+import server
+from audio_codec import wav_header
+from response_parser import parse_response
+from server import (
+    LONGFORM_BATCH_SIZE, PIPER_VOICES, PORT, UPLOAD_FOLDER, decode_upload, detect_language,
+    local_ip, submit_multilang, synthesize_to_file, transcribe_whisper,
+)
+
+# One Whisper generate() at a time: concurrent calls only compete for the GPU.
+ASR_WORKERS = 1
+# Piper's ONNX inference releases the GIL, so a couple of voices can run at once.
+TTS_WORKERS = 2
+
+asr_executor = ThreadPoolExecutor(max_workers=ASR_WORKERS, thread_name_prefix="asr")
+# Language ID is one short forward pass; it must not wait behind a long transcription.
+lid_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="lid")
+tts_executor = ThreadPoolExecutor(max_workers=TTS_WORKERS, thread_name_prefix="tts")
+
+
+# -------------------------------------------------------------
+# FastAPI App Setup
+# -------------------------------------------------------------
+app = FastAPI(title="Whisper + Piper Speech Server")
+app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+
+# Served from the event loop with async file reads, Content-Length, ETag and Range
+app.mount("/static/audio", StaticFiles(directory=UPLOAD_FOLDER), name="audio")
+
+
+async def run_in(executor, fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+
+@app.get("/")
+async def index():
+    return "Hello from Whisper + Piper Local Server!"
+
+
+# -------------------------------------------------------------
+# Transcription Endpoint
+# -------------------------------------------------------------
+@app.post("/transcribe")
+async def transcribe(audio: UploadFile = File(None), batch_size: int = Form(LONGFORM_BATCH_SIZE)):
+    if audio is None:
+        return JSONResponse({"error": "No audio file uploaded"}, status_code=400)
+    data = await audio.read()
+
+    try:
+        audio_np = await run_in(asr_executor, decode_upload, data)
+        text = await run_in(asr_executor, transcribe_whisper, audio_np, max(batch_size, 1))
+        print(f"📝 Transcribed: {text}")
+        return {"text": text}
+    except Exception as e:
+        traceback.print_exc()
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+@app.post("/detect_language")
+async def detect_language_endpoint(audio: UploadFile = File(None)):
+    if audio is None:
+        return JSONResponse({"error": "No audio file uploaded"}, status_code=400)
+    data = await audio.read()
+
+    try:
+        audio_np = await run_in(lid_executor, decode_upload, data)
+        probabilities = await run_in(lid_executor, detect_language, audio_np)
+        language = max(probabilities, key=probabilities.get)
+        return {"language": language, "probability": probabilities[language], "probabilities": probabilities}
+    except Exception as e:
+        traceback.print_exc()
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+# -------------------------------------------------------------
+# Text-to-Speech Endpoints
+# -------------------------------------------------------------
+@app.post("/tts")
+async def tts(request: Request):
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    if not data:
+        return JSONResponse({"error": "No JSON body provided"}, status_code=400)
+
+    text = data.get("text", "").strip()
+    if not text:
+        return JSONResponse({"error": "Missing 'text' in request"}, status_code=400)
+
+    try:
+        filename = await run_in(tts_executor, synthesize_to_file, text)
+        return {"url": f"http://{local_ip}:{PORT}/{UPLOAD_FOLDER}/{filename}"}
+    except Exception as e:
+        traceback.print_exc()
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+@app.api_route("/tts_multilang", methods=["GET", "POST"])
+async def tts_multilang(request: Request, text: str = ""):
+    if request.method == "POST":
+        try:
+            text = (await request.json() or {}).get("text", "")
+        except ValueError:
+            text = ""
+    text = parse_response(text.strip()).text
+    if not text:
+        return JSONResponse({"error": "Missing 'text' in request"}, status_code=400)
+
+    futures = submit_multilang(text, PIPER_VOICES)
+
+    async def generate():
+        try:
+            # Read per request: use_models() can replace the voices after import.
+            yield wav_header(server.OUTPUT_RATE)
+            for future in futures:
+                yield await asyncio.wrap_future(future)
+        finally:
+            # Client went away: drop the segments that have not started.
+            for future in futures:
+                future.cancel()
+
+    return StreamingResponse(generate(), media_type="audio/wav")
+
+
+# -------------------------------------------------------------
+# Run Server
+# -------------------------------------------------------------
+if __name__ == "__main__":
+    import uvicorn
+
+    warnings.filterwarnings("ignore")
+    # One worker: every worker process would load its own copy of the models.
+    uvicorn.run(app, host="0.0.0.0", port=PORT)
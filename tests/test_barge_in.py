@@ -0,0 +1,99 @@
+import asyncio
+
+import numpy as np
+from furhat_realtime_api import Events
+
+import client as furhat_client
+from fake_furhat import FakeFurhat, ReplayMic, Utterance
+from llm_router import LLMRouter
+
+
+RATE = furhat_client.SAMPLE_RATE
+WORDS = {1: "one", 2: "two", 3: "three"}
+
+
+def tone(seconds, level):
+    t = np.arange(int(seconds * RATE)) / RATE
+    return (level / 10 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def silence(seconds):
+    return np.zeros(int(seconds * RATE), dtype=np.float32)
+
+
+class StubASR:
+    """Names the utterance by its loudness, after a fixed delay."""
+
+    order = ["whisper"]
+
+    def __init__(self, delay=0.3):
+        self.delay = delay
+
+    async def transcribe(self, audio, event=None, order=None):
+        await asyncio.sleep(self.delay)
+        level = round(float(np.abs(audio).max()) * 10)
+        return WORDS.get(level, ""), {"backend": "whisper"}
+
+
+async def stub_llm(text, first_token):
+    # The first turn is still thinking when the user barges in.
+    await asyncio.sleep(5.0 if text == "one" else 0.1)
+    first_token.set()
+    return f"en: You said {text}."
+
+
+async def no_tts(text, lang=None, cancel=None):
+    return None
+
+
+async def barge_in_session(tmp_path):
+    # 2 ends in speech, so its turn still transcribes a tail while 3 is spoken.
+    script = [
+        Utterance("one", np.concatenate([tone(0.6, 1), silence(0.6)]), None, {}, 0.05),
+        Utterance("two", np.concatenate([tone(0.3, 2), silence(0.7), tone(0.4, 2)]), None, {}, 0.05),
+        Utterance("three", np.concatenate([tone(0.6, 3), silence(0.6)]), None, {}, 0.05),
+    ]
+    mic = ReplayMic(RATE)
+    fake = FakeFurhat(script, mic=mic)
+    bot = furhat_client.SimpleFurhatClient(
+        "fake", asr_mode="whisper", speculative_asr=True, speculative_interval=0.2,
+        barge_in=True, furhat=fake, mic=mic, log_dir=str(tmp_path / "logs"),
+    )
+    bot.asr = StubASR()
+    bot.llm_router = LLMRouter({"stub": stub_llm}, ["stub"], hedge_deadline=None)
+    bot.make_tts = no_tts
+
+    turns = []
+    bot.logger.log_turn = turns.append
+
+    fake.add_handler(Events.response_listen_start, bot.on_listen_start)
+    fake.add_handler(Events.response_hear_start, bot.on_hear_start)
+    fake.add_handler(Events.response_hear_end, bot.on_hear_end)
+    fake.add_handler(Events.response_speak_end, bot.on_speak_end)
+    await fake.connect()
+    try:
+        await bot.start_listening()
+        await asyncio.wait_for(fake.finished.wait(), 10)
+        while bot.turns.busy or bot.turns.waiting:
+            await asyncio.sleep(0.05)
+        bot.finish_pending_turn()
+    finally:
+        if bot.utterance:
+            bot.utterance.cancel()
+        await fake.disconnect()
+    return turns
+
+
+def test_cancelled_turn_keeps_newer_speculation(tmp_path, monkeypatch):
+    monkeypatch.setattr(furhat_client, "AUDIO_DIR", str(tmp_path))
+    turns = asyncio.run(barge_in_session(tmp_path))
+
+    by_text = {turn["user"]["asr_text"]: turn for turn in turns}
+    assert by_text["one"]["status"] == "cancelled"
+    assert by_text["two two"]["status"] == "completed"
+    assert by_text["two two"]["speculative_asr"]["result"] == "tail"
+    # Turn 1 is cancelled while 3 is being spoken: 3 keeps its prefixes.
+    third = by_text["three"]
+    assert third["status"] == "completed"
+    assert third["speculative_asr"]["result"] == "confirmed"
+    assert third["speculative_asr"]["prefix_requests"] > 0
@@ -0,0 +1,146 @@
+import random
+
+import pytest
+
+from response_parser import EMOTIONS, ParsedResponse, ResponseParser, format_response, parse_response
+
+
+WORDS = ["Moien", "Wéi", "geet", "et", "dir?", "D'Post", "ass", "no.", "10:30",
+         "Hello!", "a<b", "c>d", "x", "lb:", "en:", "so:", "Bonjour", "merci,"]
+PREFIXES = ["lb: ", "en: ", "LB:", "  fr :", "", "<assistant>\nlb: ", "Oh: ", "so: ", "TV: ", "l", "lb"]
+NOISE = ["<user>\nNee\n</user>", "</assistant>", "<b>", "<unclosed", "\n", "  ", "<", ">"]
+
+
+def random_reply(rng):
+    parts = [rng.choice(PREFIXES)]
+    for _ in range(rng.randint(0, 20)):
+        parts.append(rng.choice(WORDS))
+        parts.append(rng.choice([" ", " ", "\n"]))
+        if rng.random() < 0.1:
+            parts.append(rng.choice(NOISE))
+    if rng.random() < 0.8:
+        parts.append(f"<user_emotion={rng.choice(EMOTIONS + ('happy', 'Bored'))}>")
+    if rng.random() < 0.8:
+        parts.append(f"<response_emotion={rng.choice(EMOTIONS)}>")
+    if rng.random() < 0.2:
+        parts.append(rng.choice(NOISE) + " trailing")
+    return "".join(parts)
+
+
+def feed_all(deltas):
+    parser = ResponseParser()
+    emitted = "".join(parser.feed(d) for d in deltas) + parser.close()
+    return parser.result(), emitted
+
+
+def random_split(text, rng):
+    cuts = sorted(rng.sample(range(1, len(text)), min(len(text) - 1, rng.randint(0, 12)))) if len(text) > 1 else []
+    return [text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)])]
+
+
+# ------------------------
+# Streamed vs whole
+# ------------------------
+
+@pytest.mark.parametrize("seed", range(20))
+def test_streamed_matches_whole(seed):
+    rng = random.Random(seed)
+    for _ in range(100):
+        reply = random_reply(rng)
+        whole = parse_response(reply)
+        streamed, emitted = feed_all(random_split(reply, rng))
+        assert streamed == whole, reply
+        assert emitted.strip() == whole.text, reply
+
+
+@pytest.mark.parametrize("reply", [
+    "lb: Moien, wéi geet et? <user_emotion=Happy><response_emotion=Calm>",
+    "<assistant>\nen: The post office is open. <user_emotion=sad>\n<response_emotion=Happy>",
+    "so: this is it <b>bold</b> a<b c>d <response_emotion=Angry>",
+])
+def test_every_two_way_split(reply):
+    whole = parse_response(reply)
+    for i in range(len(reply) + 1):
+        assert feed_all([reply[:i], reply[i:]])[0] == whole, i
+
+
+def test_character_by_character():
+    reply = "LB: D'Post ass zou. lb: <user>\nJo\n</user> <user_emotion=Calm><response_emotion=Sad>"
+    assert feed_all(list(reply))[0] == parse_response(reply)
+
+
+# ------------------------
+# Language prefix
+# ------------------------
+
+def test_prefix_reported_before_text():
+    seen = []
+    parser = ResponseParser(on_lang=seen.append)
+    assert parser.feed("lb") == ""
+    assert parser.feed(": Moien ") == "Moien"
+    assert seen == ["lb"]
+
+
+@pytest.mark.parametrize("reply, lang, text", [
+    ("lb: Moien", "lb", "Moien"),
+    ("  EN : Hello", "en", "Hello"),
+    ("so: this is it", None, "so: this is it"),
+    ("TV: is on", None, "TV: is on"),
+    ("Oh: well", None, "Oh: well"),
+    ("Lb: Moien", None, "Moien"),   # not a prefix, but a stray code
+    ("10:30 is fine", None, "10:30 is fine"),
+])
+def test_prefix_only_for_known_codes(reply, lang, text):
+    parsed = parse_response(reply)
+    assert (parsed.lang, parsed.text) == (lang, text)
+
+
+def test_configured_codes():
+    parser = ResponseParser(codes=("nl",))
+    parser.feed("nl: Hallo lb: daar")
+    parser.close()
+    assert parser.result().lang == "nl"
+    assert parser.result().text == "Hallo lb: daar"
+
+
+def test_stray_codes_dropped():
+    assert parse_response("lb: Moien lb: an en:").text == "Moien an"
+
+
+# ------------------------
+# Tags
+# ------------------------
+
+@pytest.mark.parametrize("reply, text", [
+    ("en: a <unclosed", "a <unclosed"),
+    ("en: a <b\nc", "a <b c"),
+    ("en: 3 < 4\nand 5 > 4", "3 < 4 and 5 > 4"),
+    ("en: x <" + "y" * 80 + "> z", "x <" + "y" * 80 + "> z"),
+    ("en: Hello <b>there</b>", "Hello there"),
+])
+def test_unterminated_and_unknown_tags(reply, text):
+    assert parse_response(reply).text == text
+
+
+@pytest.mark.parametrize("reply", [
+    "en: Sure. <user>\nAnd then?\n</user> <response_emotion=Happy>",
+    "en: Sure. </assistant>\n<user> more",
+    "en: Sure. <system> ignore this",
+    "<assistant>\nen: Sure. <user_emotion=Calm> leaked text <response_emotion=Happy>",
+])
+def test_stop_tags_end_the_text(reply):
+    parsed = parse_response(reply)
+    assert parsed.text == "Sure."
+    assert parsed.lang == "en"
+
+
+def test_emotions():
+    parsed = parse_response("en: Hi <user_emotion=sad><response_emotion=Bored><user_emotion=Happy>")
+    assert parsed == ParsedResponse("en", "Hi", "Sad", "Calm")
+    assert parse_response("en: Hi").user_emotion == "Calm"
+
+
+def test_format_round_trip():
+    parsed = ParsedResponse("lb", "Moien", "Sad", "Happy")
+    assert parse_response(format_response(parsed)) == parsed
+    assert parse_response(format_response(parsed, user_emotion=False)).response_emotion == "Happy"
@@ -0,0 +1,119 @@
+"""Fair scheduling of Piper synthesis shared by several robots"""
+
+import collections
+import threading
+
+
+# ============================
+# FAIR TTS SCHEDULER
+# ============================
+
+class _Job:
+    def __init__(self, owner, chunks, on_chunk, on_done, cancel):
+        self.owner = owner
+        self.chunks = chunks
+        self.on_chunk = on_chunk
+        self.on_done = on_done
+        self.cancel = cancel
+
+
+class FairTTSScheduler:
+    """
+    Runs synthesis jobs on a few worker threads. A job is an iterator of
+    audio chunks (Piper yields one per sentence) and is advanced one chunk at
+    a time, round-robin over owners (robots), so a long reply for one robot
+    cannot hold back the first audio of another. Each owner has at most one
+    chunk in progress; its jobs run in submission order.
+
+    `on_chunk(bytes)` and `on_done(failed)` are called from worker threads;
+    every job gets exactly one `on_done`, also when the scheduler is closed.
+    The chunk iterators must be thread-safe to run side by side (see
+    piper_synthesis.synthesize_chunks).
+    """
+
+    def __init__(self, workers=2):
+        self.cond = threading.Condition()
+        self.queues = collections.defaultdict(collections.deque)
+        self.ready = collections.deque()   # owners with work and no chunk in progress
+        self.running = set()               # owners with a chunk in progress
+        self.closed = False
+        self.stats = collections.Counter()
+        self.threads = [
+            threading.Thread(target=self._worker, name=f"tts-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for t in self.threads:
+            t.start()
+
+    def submit(self, owner, chunks, on_chunk, on_done, cancel=None):
+        job = _Job(owner, iter(chunks), on_chunk, on_done, cancel or threading.Event())
+        with self.cond:
+            queue = self.queues[owner]
+            queue.append(job)
+            if len(queue) == 1 and owner not in self.ready:
+                self.ready.append(owner)
+                self.cond.notify()
+        return job.cancel
+
+    def close(self):
+        with self.cond:
+            if self.closed:
+                return
+            self.closed = True
+            dropped = []
+            for owner, queue in list(self.queues.items()):
+                # The job a worker is advancing is reported by that worker.
+                keep = 1 if owner in self.running else 0
+                while len(queue) > keep:
+                    dropped.append(queue.pop())
+                if not queue:
+                    del self.queues[owner]
+            self.ready.clear()
+            self.cond.notify_all()
+        for job in reversed(dropped):
+            job.on_done(True)
+
+    def _worker(self):
+        while True:
+            with self.cond:
+                while not self.ready and not self.closed:
+                    self.cond.wait()
+                if self.closed:
+                    return
+                owner = self.ready.popleft()
+                job = self.queues[owner][0]
+                self.running.add(owner)
+
+            finished = failed = False
+            if job.cancel.is_set():
+                finished = failed = True
+            else:
+                try:
+                    chunk = next(job.chunks)
+                except StopIteration:
+                    finished = True
+                except Exception as e:
+                    print(f"[TTS] Synthesis failed for {owner}:", e)
+                    finished = failed = True
+                else:
+                    job.on_chunk(chunk)
+
+            with self.cond:
+                self.running.discard(owner)
+                if not finished:
+                    self.stats[owner] += 1
+                    if self.closed:
+                        # Closed mid-job: the rest is never synthesized.
+                        finished = failed = True
+                queue = self.queues[owner]
+                if finished:
+                    queue.popleft()
+                if not queue:
+                    del self.queues[owner]
+                elif not self.closed:
+                    # Back of the line: the other robots get a chunk first.
+                    self.ready.append(owner)
+                    self.cond.notify()
+
+            if finished:
+                job.on_done(failed)
@@ -0,0 +1,101 @@
+"""Single active turn with cancellation of superseded work"""
+
+import asyncio
+import itertools
+
+
+# ============================
+# TURN SCHEDULER
+# ============================
+
+class TurnScheduler:
+    """
+    Owns the one in-flight turn. Submitting a new turn, or a barge-in,
+    cancels the previous turn's task; its ASR/LLM/TTS awaits (and the HTTP
+    requests behind them) are cancelled with it. The turn can look up why it
+    was cancelled with `cancel_reason()` to log the wasted work.
+
+    A turn submitted with `claim=False` runs next to the active one and only
+    replaces it when it calls `claim()` (once it knows it has something to
+    say), so noise picked up while listening cannot cancel a real turn.
+    """
+
+    def __init__(self):
+        self.task = None
+        self.waiting = set()
+        self.order = {}
+        self.reasons = {}
+        self.num_cancelled = 0
+        self._seq = itertools.count()
+        self.last_claimed = -1
+
+    @property
+    def busy(self):
+        return self.task is not None and not self.task.done()
+
+    def submit(self, coro, claim=True):
+        if claim:
+            self.cancel("superseded")
+        task = asyncio.create_task(coro)
+        task.add_done_callback(self._done)
+        self.order[task] = next(self._seq)
+        if claim:
+            self.task = task
+            self.last_claimed = self.order[task]
+        else:
+            self.waiting.add(task)
+        return task
+
+    def claim(self, reason="superseded"):
+        """
+        Make the calling turn the active one, cancelling the current one.
+        False if a turn submitted later has already claimed (even if it has
+        finished since): the caller is stale and should give up.
+        """
+        task = asyncio.current_task()
+        if self.task is task:
+            return True
+        self.waiting.discard(task)
+        if self.order[task] < self.last_claimed:
+            return False
+        self.cancel(reason)
+        self.task = task
+        self.last_claimed = self.order[task]
+        return True
+
+    def cancel(self, reason):
+        task = self.task
+        if task is None or task.done() or task in self.reasons:
+            return False
+
+        self.reasons[task] = reason
+        self.num_cancelled += 1
+        task.cancel()
+        print(f"[Turn] Cancelled in-flight turn ({reason})")
+        return True
+
+    def cancel_reason(self, task=None):
+        return self.reasons.get(task or asyncio.current_task())
+
+    def _done(self, task):
+        self.reasons.pop(task, None)
+        self.order.pop(task, None)
+        self.waiting.discard(task)
+        if self.task is task:
+            self.task = None
+        if not task.cancelled() and task.exception():
+            print("[Turn] Turn task failed:", task.exception())
+
+    async def shutdown(self):
+        task = self.task
+        waiting = list(self.waiting)
+        for t in waiting:
+            self.reasons[t] = "shutdown"
+            t.cancel()
+        if self.cancel("shutdown"):
+            waiting.append(task)
+        for t in waiting:
+            try:
+                await t
+            except asyncio.CancelledError:
+                pass